@@ -0,0 +1,100 @@
+"""
+bench_date_parsing.py
+Micro-benchmark of publish date parsing: the regex + dateutil path
+(correct_time_components + handle_time_str) against the learned per-source
+strptime fast path (parse_published).
+
+Usage (from apps/backend):
+    python -m benchmarks.bench_date_parsing [--xml-dir DIR] [--entries N]
+
+With --xml-dir, dates are taken from recorded feeds saved as
+DIR/<topic>/<publisher>.xml. Otherwise samples are generated in the date
+format each publisher of utils/feeds.yaml uses.
+"""
+
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import feedparser
+
+from src.aggregator.feed_parser import FeedParser
+
+# Date format of each publisher's feeds
+SOURCE_DATE_FORMATS = {
+    "Times of India": "%a, %d %b %Y %H:%M:%S +0530",
+    "NDTV": "%a, %d %b %Y %H:%M:%S +0530",
+    "Firstpost": "%a, %d %b %Y %H:%M:%S +0530",
+    "India Today": "%a, %d %b %Y %H:%M:%S +0530",
+    "Hindustan Times": "%a, %d %b %Y %H:%M:%S GMT",
+    "India TV": "%a, %d %b %Y %H:%M:%S +0530",
+    "Zee News": "%a, %d %b %Y %H:%M:%S GMT +5:30",
+    "DNA India": "%Y-%m-%dT%H:%M:%S+05:30",
+    "News18": "%a, %d %b %Y %H:%M:%S +0530",
+    "CNBCTV18": "%a, %d %b %Y %H:%M:%S +0530",
+}
+
+
+def generated_samples(n: int) -> list:
+    """(source, date string) samples spread over the last week, in each source's format."""
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    sources = list(SOURCE_DATE_FORMATS)
+    samples = []
+    for _ in range(n):
+        source = rng.choice(sources)
+        dt = now - timedelta(seconds=rng.randint(0, 7 * 86400))
+        samples.append((source, dt.strftime(SOURCE_DATE_FORMATS[source])))
+    return samples
+
+
+def recorded_samples(xml_dir: Path, n: int) -> list:
+    """(source, date string) samples of recorded feeds, repeated up to n entries."""
+    samples = []
+    for path in sorted(xml_dir.glob("*/*.xml")):
+        feed = feedparser.parse(path.read_text(encoding="utf-8", errors="replace"))
+        samples.extend((path.stem, entry.published)
+                       for entry in feed.entries if entry.get("published"))
+    if not samples:
+        raise SystemExit(f"No dated entries found under {xml_dir}")
+    return (samples * (n // len(samples) + 1))[:n]
+
+
+def slow_path(source: str, dt_str: str):
+    return FeedParser.handle_time_str(FeedParser.correct_time_components(dt_str))
+
+
+def run(label: str, parse, samples: list):
+    start = time.perf_counter()
+    results = [parse(source, dt_str) for source, dt_str in samples]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {len(samples) / elapsed:>12,.0f} entries/s")
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--xml-dir", type=Path,
+                            help="Directory of recorded feeds (<topic>/<publisher>.xml)")
+    arg_parser.add_argument("--entries", type=int, default=50_000)
+    args = arg_parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    if args.xml_dir:
+        samples = recorded_samples(args.xml_dir, args.entries)
+    else:
+        samples = generated_samples(args.entries)
+
+    before = run("regex + dateutil (before)", slow_path, samples)
+    after = run("learned strptime (after)", FeedParser.parse_published, samples)
+    mismatches = sum(1 for b, a in zip(before, after) if b != a)
+    print(f"learned formats: {FeedParser._date_formats}")
+    print(f"mismatching results: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
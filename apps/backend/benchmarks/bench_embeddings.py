@@ -0,0 +1,116 @@
+"""
+bench_embeddings.py
+Benchmark of the SBERT backends (PyTorch, ONNX Runtime FP32, ONNX Runtime
+int8): title throughput in ingestion-sized batches, single query latency,
+and the cosine similarity of each backend's vectors to the PyTorch ones.
+
+Usage (from apps/backend):
+    python -m benchmarks.bench_embeddings [--xml-dir DIR] [--titles N]
+        [--batch-size N] [--queries N] [--backends torch,onnx,onnx-int8]
+
+With --xml-dir, titles are taken from recorded feeds saved as
+DIR/<topic>/<publisher>.xml. Otherwise generic headlines are generated.
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from pathlib import Path
+
+import feedparser
+import numpy as np
+
+from src.aggregator.model import SBERT, SBERT_BACKENDS
+
+_SUBJECTS = ["RBI", "Sensex", "India", "Monsoon", "Apple", "Government",
+             "Supreme Court", "ISRO", "Delhi Police", "Election Commission"]
+_EVENTS = ["announces", "delays", "rejects", "unveils", "reviews", "launches",
+           "warns against", "wins", "cuts", "extends"]
+_OBJECTS = ["new policy on digital payments", "rate decision", "final of the series",
+            "budget for the fiscal year", "mission to the moon", "plan for metro expansion",
+            "probe into the data leak", "guidelines for exams", "record quarterly profit",
+            "deadline for tax filing"]
+
+
+def generated_titles(n: int) -> list:
+    rng = random.Random(0)
+    return [f"{rng.choice(_SUBJECTS)} {rng.choice(_EVENTS)} {rng.choice(_OBJECTS)}"
+            for _ in range(n)]
+
+
+def recorded_titles(xml_dir: Path, n: int) -> list:
+    titles = []
+    for path in sorted(xml_dir.glob("*/*.xml")):
+        feed = feedparser.parse(path.read_text(encoding="utf-8", errors="replace"))
+        titles.extend(entry.title for entry in feed.entries if entry.get("title"))
+    if not titles:
+        raise SystemExit(f"No titles found under {xml_dir}")
+    return (titles * (n // len(titles) + 1))[:n]
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run(backend: str, titles: list, batch_size: int, queries: int, reference: np.ndarray):
+    start = time.perf_counter()
+    sbert = SBERT(backend)
+    load_seconds = time.perf_counter() - start
+    model, device = sbert.model, sbert.device
+
+    # Warm up, then encode every title in ingestion-sized batches
+    model.encode(titles[:batch_size], device=device)
+    start = time.perf_counter()
+    vectors = np.concatenate([model.encode(titles[i:i + batch_size], device=device)
+                              for i in range(0, len(titles), batch_size)])
+    throughput = len(titles) / (time.perf_counter() - start)
+
+    latencies = []
+    for query in titles[:queries]:
+        start = time.perf_counter()
+        model.encode([query], device=device)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+
+    line = (f"{backend:<10} load {load_seconds:>6.1f}s {throughput:>9,.0f} titles/s "
+            f"query p50 {statistics.median(latencies):>6.2f} ms p95 {p95:>6.2f} ms")
+    if reference is not None:
+        cosine = np.sum(normalized(vectors) * normalized(reference), axis=1)
+        line += f"  cosine vs torch min {cosine.min():.4f} mean {cosine.mean():.4f}"
+    print(line)
+    return vectors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--xml-dir", type=Path,
+                            help="Directory of recorded feeds (<topic>/<publisher>.xml)")
+    arg_parser.add_argument("--titles", type=int, default=5_000)
+    arg_parser.add_argument("--batch-size", type=int, default=64,
+                            help="Titles per encode call, like the ingestion micro-batches")
+    arg_parser.add_argument("--queries", type=int, default=200,
+                            help="Single query encodes timed for the latency")
+    arg_parser.add_argument("--backends", default=",".join(SBERT_BACKENDS))
+    args = arg_parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.xml_dir:
+        titles = recorded_titles(args.xml_dir, args.titles)
+    else:
+        titles = generated_titles(args.titles)
+
+    reference = None
+    backends = args.backends.split(",")
+    # PyTorch first: its vectors are the reference of the others
+    for backend in sorted(backends, key=lambda b: b != "torch"):
+        vectors = run(backend, titles, args.batch_size, args.queries, reference)
+        if backend == "torch":
+            reference = vectors
+
+
+if __name__ == "__main__":
+    main()
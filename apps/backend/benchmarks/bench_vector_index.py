@@ -0,0 +1,183 @@
+"""
+bench_vector_index.py
+Recall against exact search, and latency, of the vector index types
+(ivfflat, hnsw) over a range of query settings (ivfflat.probes,
+hnsw.ef_search), on a synthetic corpus, to pick the index and its
+operating point.
+
+Usage (from apps/backend):
+    python -m benchmarks.bench_vector_index [--rows N] [--dims N]
+        [--clusters N] [--queries N] [--k N] [--types ivfflat,hnsw]
+        [--lists N] [--probes 1,5,10,20] [--m N] [--ef-construction N]
+        [--ef-search 40,100,200,400]
+
+The corpus is a mixture of Gaussian clusters of unit vectors (news titles
+cluster by story and topic); queries are perturbed corpus vectors. k is
+the number of neighbours retrieved, the number of vector candidates of
+search. Indexes are built with the DDL of src.database.vector_index on a
+scratch table (bench_vector_index) of DATABASE_URL, dropped at the end:
+point it to a scratch database.
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from src.database.base import engine
+from src.database.vector_index import (
+    HNSW_EF_CONSTRUCTION,
+    HNSW_M,
+    IVFFLAT_LISTS,
+    VECTOR_INDEX_TYPES,
+    create_index_sql,
+)
+
+TABLE = "bench_vector_index"
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def synthetic_corpus(rows: int, dims: int, clusters: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = normalized(rng.standard_normal((clusters, dims)))
+    assignment = rng.integers(0, clusters, rows)
+    # Noise of norm ~1.3: vectors of a cluster have a cosine similarity of
+    # ~0.6 with its center, like titles of one topic
+    corpus = normalized(centers[assignment] + rng.standard_normal((rows, dims)) * 1.3 / np.sqrt(dims))
+    picks = rng.integers(0, rows, queries)
+    query_vectors = normalized(corpus[picks] + rng.standard_normal((queries, dims)) * 0.5 / np.sqrt(dims))
+    return corpus.astype(np.float32), query_vectors.astype(np.float32)
+
+
+def exact_neighbours(corpus: np.ndarray, query_vectors: np.ndarray, k: int) -> list:
+    """Ids (1-based, like the table's) of the k nearest rows of each query by cosine distance."""
+    neighbours = []
+    for query in query_vectors:
+        similarity = corpus @ query
+        top = np.argpartition(-similarity, k)[:k]
+        neighbours.append(set((top + 1).tolist()))
+    return neighbours
+
+
+def vector_literal(vector) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def load(corpus: np.ndarray, batch: int = 5000):
+    with engine.connect() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, "
+                          f"embedding vector({corpus.shape[1]}) NOT NULL)"))
+        # One array parameter per batch, whatever the driver; ids follow the corpus order
+        for start in range(0, len(corpus), batch):
+            conn.execute(
+                text(f"INSERT INTO {TABLE} (embedding) SELECT CAST(v AS vector) "
+                     f"FROM unnest(CAST(:vectors AS text[])) WITH ORDINALITY AS t(v, n) ORDER BY n"),
+                {"vectors": [vector_literal(vector) for vector in corpus[start:start + batch]]})
+        conn.execute(text(f"ANALYZE {TABLE}"))
+        conn.commit()
+
+
+def build(index_type: str, options: dict) -> float:
+    """Build the index and return its build time in seconds."""
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {TABLE}_embedding"))
+        start = time.perf_counter()
+        conn.execute(text(create_index_sql(f"{TABLE}_embedding", "embedding", TABLE,
+                                           index_type, options)))
+        conn.commit()
+        return time.perf_counter() - start
+
+
+def measure(query_vectors: np.ndarray, exact: list, k: int, settings: dict) -> tuple:
+    """Mean recall@k, p50 and p95 latency in ms of index scans with the settings."""
+    recalls, latencies = [], []
+    with engine.connect() as conn:
+        for name, value in settings.items():
+            conn.execute(text(f"SET {name} = {int(value)}"))
+        for query, expected in zip(query_vectors, exact):
+            start = time.perf_counter()
+            ids = conn.execute(
+                text(f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:query AS vector) LIMIT :k"),
+                {"query": vector_literal(query), "k": k}).scalars().all()
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected.intersection(ids)) / k)
+        conn.rollback()
+    latencies.sort()
+    return (statistics.mean(recalls), statistics.median(latencies),
+            latencies[int(len(latencies) * 0.95) - 1])
+
+
+def exact_latency(query_vectors: np.ndarray, k: int) -> float:
+    """p50 latency in ms of exact search (sequential scan)."""
+    latencies = []
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {TABLE}_embedding"))
+        conn.commit()
+        for query in query_vectors[:20]:
+            start = time.perf_counter()
+            conn.execute(
+                text(f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:query AS vector) LIMIT :k"),
+                {"query": vector_literal(query), "k": k}).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def int_list(value: str) -> list:
+    return [int(x) for x in value.split(",")]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    arg_parser.add_argument("--dims", type=int, default=384)
+    arg_parser.add_argument("--clusters", type=int, default=500)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--k", type=int, default=100,
+                            help="Neighbours retrieved per query (recall@k)")
+    arg_parser.add_argument("--types", default=",".join(VECTOR_INDEX_TYPES))
+    arg_parser.add_argument("--lists", type=int, default=IVFFLAT_LISTS)
+    arg_parser.add_argument("--probes", type=int_list, default=[1, 5, 10, 20, 40])
+    arg_parser.add_argument("--m", type=int, default=HNSW_M)
+    arg_parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION)
+    arg_parser.add_argument("--ef-search", type=int_list, default=[40, 100, 200, 400])
+    args = arg_parser.parse_args()
+
+    corpus, query_vectors = synthetic_corpus(args.rows, args.dims, args.clusters, args.queries)
+    exact = exact_neighbours(corpus, query_vectors, args.k)
+    start = time.perf_counter()
+    load(corpus)
+    print(f"corpus: {args.rows:,} x {args.dims} vectors in {args.clusters} clusters, "
+          f"loaded in {time.perf_counter() - start:.1f}s; {args.queries} queries, k={args.k}")
+    try:
+        print(f"exact (no index)  p50 {exact_latency(query_vectors, args.k):8.1f} ms")
+        for index_type in args.types.split(","):
+            if index_type == "ivfflat":
+                options = {"lists": args.lists}
+                settings = [{"ivfflat.probes": probes} for probes in args.probes]
+            else:
+                options = {"m": args.m, "ef_construction": args.ef_construction}
+                # An HNSW scan returns at most ef_search rows
+                settings = [{"hnsw.ef_search": ef_search}
+                            for ef_search in sorted({max(ef, args.k) for ef in args.ef_search})]
+            print(f"{index_type} {options}: built in {build(index_type, options):.1f}s")
+            for setting in settings:
+                recall, p50, p95 = measure(query_vectors, exact, args.k, setting)
+                (name, value), = setting.items()
+                print(f"  {name:<15} {value:>5}  recall@{args.k} {recall:6.3f}  "
+                      f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+    finally:
+        with engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+replay_ingest.py
+Offline replay of recorded feeds through the ingestion code, to benchmark
+and regression-test ingestion without hitting live publishers.
+
+Usage (from apps/backend):
+    python -m benchmarks.replay_ingest --xml-dir DIR [--amplify N]
+        [--mode stages|pipeline] [--serve] [--embeddings fake|sbert]
+        [--upsert] [--memory]
+
+Recorded feeds are saved as DIR/<topic>/<publisher>.xml. With --amplify N
+the corpus is repeated until it holds about N entries: copy k of a feed is
+replayed as topic "<topic>#k", with links rewritten to "?replay=k" and
+titles suffixed with "#k", so no copy is deduplicated against another.
+
+Modes:
+    stages    Runs every feed through each stage in turn (parse, date
+              handling, embedding, dedup, upsert with --upsert) and reports
+              the throughput of each stage. With --memory, the peak memory
+              allocated by each stage is traced too (which slows it down).
+    pipeline  Runs Feeds.fetch_articles, the streaming pipeline used in
+              production, and reports per stage time from the ingestion
+              metrics. Feeds are replayed from memory, or served by a local
+              HTTP server with --serve. Articles are always upserted.
+
+Upserting writes the articles to DATABASE_URL: point it to a scratch
+database. Feed validators, health and archived bodies are kept in memory,
+and title embeddings go to a temporary store.
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import re
+import resource
+import tempfile
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+from urllib.parse import quote
+
+import feedparser
+import numpy as np
+
+from src.aggregator.feed_parser import FeedParser
+from src.monitoring import metrics
+
+EMBEDDING_DIM = 384
+# Articles per upsert / story clustering call, like the pipeline's micro-batches
+BATCH_SIZE = 64
+# Articles in the story index before it starts over, roughly the articles
+# of its STORY_WINDOW_DAYS in production (amplified copies share their dates)
+STORY_INDEX_SIZE = 20_000
+_ITEM = re.compile(r"<(item|entry)\b.*?</\1\s*>", re.S)
+_LINK = re.compile(
+    r"(<link\b[^>]*\bhref=\"|<link>\s*(?:<!\[CDATA\[)?\s*)([^\"<\]\s]+)")
+
+
+class HashingEncoder:
+    """Stand-in for SBERT: a deterministic random unit vector per title."""
+
+    def encode(self, sentences, device=None, **kwargs):
+        vectors = np.empty((len(sentences), EMBEDDING_DIM), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            rng = np.random.default_rng(zlib.crc32(sentence.encode("utf-8")))
+            vectors[i] = rng.standard_normal(EMBEDDING_DIM)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class FakeSBERT:
+    model = HashingEncoder()
+    device = "cpu"
+
+    def get_model_name(self):
+        return "hashing"
+
+    def get_model_version(self):
+        return "hashing"
+
+
+class ReplayClient:
+    """Serves recorded feed bodies in place of FeedHttpClient."""
+
+    def __init__(self, bodies: dict):
+        self.bodies = bodies
+        self.errors = {}
+
+    async def fetch(self, url: str, headers: dict = None) -> dict:
+        xml = self.bodies[url]
+        return {'status': 200, 'xml': xml, 'etag': None,
+                'last_modified': None, 'size': len(xml)}
+
+    async def close(self):
+        pass
+
+
+def rewrite_item(item: str, copy: int) -> str:
+    """Make an entry unique to a copy of the corpus."""
+    def link(match):
+        url = match.group(2)
+        separator = "&amp;" if "?" in url else "?"
+        return f"{match.group(1)}{url}{separator}replay={copy}"
+    item = _LINK.sub(link, item, count=1)
+    return item.replace("</title>", f" #{copy}</title>", 1)
+
+
+def load_corpus(xml_dir: Path, amplify: int = None) -> list:
+    """(topic, publisher, xml) of every recorded feed, amplified to about `amplify` entries."""
+    corpus = []
+    for path in sorted(xml_dir.glob("*/*.xml")):
+        corpus.append((path.parent.name, path.stem,
+                       path.read_text(encoding="utf-8", errors="replace")))
+    if not corpus:
+        raise SystemExit(f"No feeds found under {xml_dir}")
+    entries = sum(len(_ITEM.findall(xml)) for _, _, xml in corpus)
+    copies = max(math.ceil(amplify / entries), 1) if amplify else 1
+
+    amplified = list(corpus)
+    for copy in range(1, copies):
+        for topic, publisher, xml in corpus:
+            items = list(_ITEM.finditer(xml))
+            if not items:
+                continue
+            body = "".join(rewrite_item(m.group(0), copy) for m in items)
+            amplified.append((f"{topic}#{copy}", publisher,
+                              xml[:items[0].start()] + body + xml[items[-1].end():]))
+    print(f"corpus: {len(amplified)} feeds, ~{entries * copies:,} entries "
+          f"({copies} copies of {len(corpus)} feeds)")
+    return amplified
+
+
+def rss_mb() -> float:
+    """Peak resident memory of the process in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageTimer:
+    """Accumulates time, items and (optionally) peak traced memory of one stage."""
+
+    def __init__(self, name: str, trace_memory: bool):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.seconds = 0.0
+        self.items = 0
+        self.peak_bytes = 0
+
+    def run(self, items: int, func, *args):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func(*args)
+        self.seconds += time.perf_counter() - start
+        self.items += items
+        if self.trace_memory:
+            self.peak_bytes = max(self.peak_bytes,
+                                  tracemalloc.get_traced_memory()[1] - before)
+        return result
+
+    def report(self):
+        rate = self.items / self.seconds if self.seconds else 0
+        line = f"{self.name:<14} {self.items:>10,} items {self.seconds:>9.2f}s {rate:>12,.0f}/s"
+        if self.trace_memory:
+            line += f" {self.peak_bytes / 2**20:>9.1f} MB peak"
+        print(line)
+
+
+def run_stages(corpus: list, sbert, upsert: bool, trace_memory: bool):
+    from src.aggregator.deduplicator import Deduplicator
+    from src.aggregator.known_articles import KnownArticleIndex
+    from src.database.operations import insert_articles
+
+    stages = {name: StageTimer(name, trace_memory)
+              for name in ("parse", "dates", "embedding", "dedup", "upsert")}
+    known = KnownArticleIndex()
+    stories = Deduplicator()
+    dropped = {}
+    if trace_memory:
+        tracemalloc.start()
+
+    for topic, publisher, xml in corpus:
+        articles, feed_dropped = stages["parse"].run(
+            0, FeedParser.parse_entries, topic, publisher, xml)
+        stages["parse"].items += len(articles) + sum(feed_dropped.values())
+        for reason, count in feed_dropped.items():
+            dropped[reason] = dropped.get(reason, 0) + count
+
+        # Date handling on its own (it also runs inside parse_entries)
+        dates = [entry.get("published") for entry in feedparser.parse(xml).entries
+                 if entry.get("published")]
+        stages["dates"].run(len(dates), lambda: [FeedParser.parse_published(
+            publisher, dt_str) for dt_str in dates])
+
+        stages["embedding"].run(len(articles), FeedParser.add_embeddings,
+                                articles, sbert.model, sbert.device)
+
+        def dedup():
+            new = [art for art in FeedParser.simple_deduplicate(articles)
+                   if not known.is_known(art)]
+            for start in range(0, len(new), BATCH_SIZE):
+                stories.assign(new[start:start + BATCH_SIZE])
+            known.update(new)
+            return new
+        articles = stages["dedup"].run(len(articles), dedup)
+        if len(stories) >= STORY_INDEX_SIZE:
+            stories = Deduplicator()
+
+        if upsert:
+            for start in range(0, len(articles), BATCH_SIZE):
+                batch = articles[start:start + BATCH_SIZE]
+                stages["upsert"].run(len(batch), insert_articles, batch)
+
+    for stage in stages.values():
+        if stage.items or stage.name != "upsert":
+            stage.report()
+    print(f"feeds: {len(corpus)}, dropped entries: {dropped}")
+    print(f"story index: {len(stories)} articles")
+    print(f"peak rss: {rss_mb():,.0f} MB")
+
+
+async def serve(corpus: list):
+    """Serve the corpus on a local HTTP server, returning the runner and feed urls."""
+    from aiohttp import web
+
+    bodies = {f"/{topic}/{publisher}.xml": xml for topic, publisher, xml in corpus}
+
+    async def handle(request):
+        xml = bodies.get(request.path)
+        if xml is None:
+            return web.Response(status=404)
+        return web.Response(text=xml, content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, {path: f"http://127.0.0.1:{port}{quote(path)}" for path in bodies}
+
+
+def keep_state_in_memory(articles):
+    """
+    Keep the feed validators and health of a replay in memory and archive
+    no bodies, so a replay writes nothing but the articles to the database.
+    """
+    from src.aggregator.feed_archive import FeedArchiveStore
+    from src.aggregator.feed_health import FeedHealth
+    from src.aggregator.feed_state import FeedStateStore
+
+    class MemoryFeedState(FeedStateStore):
+        def save(self) -> bool:
+            self._states.update(self._pending)
+            self._pending = {}
+            return True
+
+    class MemoryFeedHealth(FeedHealth):
+        def save(self) -> bool:
+            self._dirty = set()
+            return True
+
+    articles.feed_state = MemoryFeedState()
+    articles.health = MemoryFeedHealth()
+    articles.archive = FeedArchiveStore(retention_days=0)
+
+
+async def run_pipeline(corpus: list, sbert, serve_http: bool):
+    from src.aggregator.embedding_store import EMBEDDING_STORE_DIR, EmbeddingStore
+    from src.aggregator.feeds import Feeds
+
+    # The hashing stand-in runs in this process; SBERT in EMBED_WORKERS processes
+    articles = Feeds(sbert, embed_workers=0) if isinstance(sbert, FakeSBERT) else Feeds(sbert)
+    keep_state_in_memory(articles)
+    # Replayed titles must not fill the production embedding store
+    store_dir = tempfile.TemporaryDirectory()
+    if EMBEDDING_STORE_DIR:
+        articles.embedding_store = EmbeddingStore(sbert.get_model_version(), store_dir.name)
+    runner = None
+    if serve_http:
+        runner, urls = await serve(corpus)
+        feeds = {}
+        for topic, publisher, _ in corpus:
+            feeds.setdefault(topic, {})[publisher] = urls[f"/{topic}/{publisher}.xml"]
+    else:
+        feeds, bodies = {}, {}
+        for topic, publisher, xml in corpus:
+            url = f"replay://{topic}/{publisher}"
+            feeds.setdefault(topic, {})[publisher] = url
+            bodies[url] = xml
+        articles.http_client = ReplayClient(bodies)
+
+    start = time.perf_counter()
+    try:
+        stats = await articles.fetch_articles(feeds)
+    finally:
+        await articles.close()
+        store_dir.cleanup()
+        if runner is not None:
+            await runner.cleanup()
+    elapsed = time.perf_counter() - start
+
+    print(f"pipeline: {elapsed:.2f}s, {stats['parsed'] / elapsed:,.0f} entries/s, {stats}")
+    for stage in ("parse", "embed", "upsert"):
+        total = metrics.REGISTRY.get_sample_value(
+            "ingest_stage_seconds_sum", {"stage": stage}) or 0
+        count = metrics.REGISTRY.get_sample_value(
+            "ingest_stage_seconds_count", {"stage": stage}) or 0
+        print(f"{stage:<14} {count:>10,.0f} calls {total:>9.2f}s busy")
+    print(f"peak rss: {rss_mb():,.0f} MB")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--xml-dir", type=Path, required=True,
+                            help="Directory of recorded feeds (<topic>/<publisher>.xml)")
+    arg_parser.add_argument("--amplify", type=int,
+                            help="Repeat the corpus up to about this many entries")
+    arg_parser.add_argument("--mode", choices=("stages", "pipeline"), default="stages")
+    arg_parser.add_argument("--serve", action="store_true",
+                            help="Pipeline mode: fetch the feeds from a local HTTP server")
+    arg_parser.add_argument("--embeddings", choices=("fake", "sbert"), default="fake",
+                            help="Hashing stand-in or the real SBERT model")
+    arg_parser.add_argument("--upsert", action="store_true",
+                            help="Stages mode: also upsert articles into DATABASE_URL")
+    arg_parser.add_argument("--memory", action="store_true",
+                            help="Stages mode: trace the peak memory of each stage")
+    args = arg_parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    corpus = load_corpus(args.xml_dir, args.amplify)
+    if args.embeddings == "sbert":
+        from src.aggregator.model import SBERT
+        sbert = SBERT()
+    else:
+        sbert = FakeSBERT()
+
+    if args.mode == "stages":
+        run_stages(corpus, sbert, args.upsert, args.memory)
+    else:
+        asyncio.run(run_pipeline(corpus, sbert, args.serve))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@ from pathlib import Path
 from contextlib import asynccontextmanager
 import asyncio
 import threading
-import time
 import yaml
 import logging
 
@@ -17,21 +16,36 @@ import os
 import utils.logger as logger
 from routers.auth import router as auth_router
 from routers.content import router as feed_router
-from routers.summarizer import router as summarize_router
+from routers.summarizer import router as summarize_router, summarizer
 from routers.userops import router as user_router
 from routers.ai import router as ai_router
+from routers.monitoring import router as monitoring_router
 from src.database.base import Base, engine
 from utils.initial_data import seed_data
-from src.aggregator.model import SBERT
 from src.aggregator.feeds import Feeds
-from src.database.operations import insert_articles
+from src.aggregator.scheduler import FeedScheduler
+from src.aggregator.leader import LeaderElector, LEADER_POLL_INTERVAL
+from src.monitoring.readiness import LazyModel
+from src.database.reembedding import active_embedding_model
+from src.database.vector_index import ensure_vector_index
+from src.database.queries import NEXT_CURSOR_HEADER
 
 load_dotenv()
 
 DATABASE_URL_KEY = os.getenv("DATABASE_URL")
+# Load DistilBART at startup rather than on the first summary
+SUMMARIZER_WARMUP = os.getenv("SUMMARIZER_WARMUP", "false").lower() == "true"
+# Seconds shutdown waits for a refresh in progress to finish
+REFRESH_STOP_TIMEOUT = int(os.getenv("REFRESH_STOP_TIMEOUT", 60))
 
 logger = logging.getLogger(__name__)
-REFRESH_INTERVAL = 60 * 5
+
+
+def load_sbert():
+    # torch and sentence-transformers are imported with the model, off the startup path
+    from src.aggregator.model import SBERT, SBERT_MODEL
+    # Once the articles were re-embedded, their vectors are the new model's
+    return SBERT(model_name=active_embedding_model() or SBERT_MODEL)
 
 
 @asynccontextmanager
@@ -53,40 +67,94 @@ async def lifespan(app: FastAPI):
             sql_script = file.read()
             conn.execute(text(sql_script))
             conn.commit()
+    ensure_vector_index()
 
     # Seed initial data
     session = Session(bind=engine)
     seed_data(session)
     session.commit()
-    # Initialize SBERT and Feeds and attach to app.state so routers can access them
-    app.state.sbert = SBERT()
-    app.state.articles = Feeds(app.state.sbert)
+    # Load SBERT in the background and attach it to app.state so routers can
+    # access it; routes that need no model are served meanwhile
+    app.state.sbert = LazyModel("SBERT", load_sbert, required=True)
+    app.state.sbert.load_in_background()
+    if SUMMARIZER_WARMUP:
+        summarizer.load_in_background()
+
+    # Start background refresh worker (runs in a daemon thread).
+    # Every API worker process runs one, but only the elected leader ingests;
+    # the others retry the election every LEADER_POLL_INTERVAL seconds.
+    stop_refresh = threading.Event()
 
-    # Start background refresh worker (runs in a daemon thread)
     def refresh_worker():
-        while True:
+        # One loop for the worker's lifetime so the pooled http client
+        # keeps its connections between refreshes
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        # Ingestion embeds articles: only stand for election once SBERT is loaded
+        sbert = app.state.sbert.wait()
+        while sbert is None:
+            if stop_refresh.wait(LEADER_POLL_INTERVAL):
+                return
+            sbert = app.state.sbert.wait()
+        app.state.articles = Feeds(sbert)
+        scheduler = FeedScheduler(health=app.state.articles.health)
+        elector = LeaderElector()
+        while not stop_refresh.is_set():
+            was_leader = elector.is_leader
+            if not elector.elect():
+                if was_leader:
+                    logger.warning("Lost ingestion leadership")
+                stop_refresh.wait(LEADER_POLL_INTERVAL)
+                continue
             try:
-                logger.info("Refreshing Feeds")
+                if not was_leader:
+                    logger.info(f"Elected ingestion leader (pid {os.getpid()})")
+                    app.state.articles.load_state()
+                    # Start from a fresh schedule, polling every feed once
+                    scheduler = FeedScheduler(health=app.state.articles.health)
                 with open("utils/feeds.yaml", "r") as file:
-                    rss_feeds = yaml.safe_load(file)
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(
-                    app.state.articles.refresh_articles(rss_feeds))
-                articles_list = app.state.articles.get_articles()
-                logger.info(f"Fetched {len(articles_list)} articles")
-                if articles_list:
-                    insert_articles(articles_list)
-                logger.info(
-                    f"Refreshed Feeds Successfully, Next Refresh in {REFRESH_INTERVAL//60} minutes")
+                    scheduler.set_feeds(yaml.safe_load(file))
+                due_feeds = scheduler.due_feeds()
+                if due_feeds:
+                    logger.info(
+                        f"Refreshing {sum(len(p) for p in due_feeds.values())} Feeds")
+                    stats = loop.run_until_complete(
+                        app.state.articles.refresh_articles(due_feeds))
+                    report = app.state.articles.get_poll_report()
+                    # Feeds missing from the report failed along with the refresh
+                    scheduler.record_polls({url: report.get(url)
+                                            for publishers in due_feeds.values()
+                                            for url in publishers.values()})
+                    if stats:
+                        logger.info(
+                            f"Refreshed Feeds: {stats['parsed']} articles parsed, "
+                            f"{stats['new']} new, {stats['stored']} stored")
             except Exception as e:
                 logger.error(f"Error refreshing feeds: {e}")
-            time.sleep(REFRESH_INTERVAL)
+            # Wake up regularly to check the leader lock is still held (only
+            # between refreshes: one in progress finishes after losing it)
+            stop_refresh.wait(min(scheduler.seconds_until_due(), LEADER_POLL_INTERVAL))
+        # Let a follower take over without waiting for the connection to drop
+        elector.release()
+        # The http session is bound to this loop: close it here
+        loop.run_until_complete(app.state.articles.http_client.close())
+        loop.close()
 
     thread = threading.Thread(target=refresh_worker, daemon=True)
     thread.start()
 
     yield
+    stop_refresh.set()
+    await asyncio.to_thread(thread.join, REFRESH_STOP_TIMEOUT)
+    if thread.is_alive():
+        logger.warning(f"Refresh still running after {REFRESH_STOP_TIMEOUT}s, stopping its workers")
+    # Embedding worker processes and their shared memory, the parse pool
+    articles = getattr(app.state, "articles", None)
+    if articles is not None:
+        await articles.close()
+    embedder = getattr(app.state, "embedder", None)
+    if embedder is not None:
+        embedder.close()
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
@@ -94,6 +162,7 @@ app.include_router(feed_router)
 app.include_router(summarize_router)
 app.include_router(user_router)
 app.include_router(ai_router)
+app.include_router(monitoring_router)
 
 origins = ["http://localhost:5173", "http://127.0.0.1:5173",
            "http://localhost:3000", "http://127.0.0.1:3000"]
@@ -105,6 +174,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods (GET, POST, OPTIONS, etc.)
     allow_headers=["*"],  # Allows all headers
+    expose_headers=[NEXT_CURSOR_HEADER],  # Lets clients page feeds by cursor
 )
 
 
@@ -1,21 +1,19 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy import delete
 
-from src.aggregator.model import SBERT
 from src.database.session import get_async_db, get_db
 from src.database.models import Users, ChatSession
 from src.users.services import get_current_active_user
-from routers.content import search_article
-from src.ai.highlights import SearchHighlights
+from routers.content import search_article, get_embedder, set_next_cursor
+from src.aggregator.embedding_service import EmbeddingService
 from src.ai.utils.db_queries import create_session, log_chat_message, get_chat_messages, get_chat_sessions
 from fastapi.responses import StreamingResponse
-from src.ai.agent import NewsDigestAgent
 from src.database.queries import get_article_brief_by_id
 
 logger = logging.getLogger(__name__)
@@ -23,12 +21,10 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-# Dependency to access SBERT created in main and stored on app.state
-def get_sbert(request: Request) -> SBERT:
-    s = getattr(request.app.state, "sbert", None)
-    if s is None:
-        raise HTTPException(status_code=500, detail="SBERT not initialized")
-    return s
+def load_agent_class():
+    # langchain and langgraph are imported on the first agent request, off the startup path
+    from src.ai.agent import NewsDigestAgent
+    return NewsDigestAgent
 
 
 class HighlightsRequest(BaseModel):
@@ -37,13 +33,13 @@ class HighlightsRequest(BaseModel):
 
 
 @router.post("/highlights")
-async def get_hightlights(request: HighlightsRequest, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user), sbert: SBERT = Depends(get_sbert)):
+async def get_hightlights(request: HighlightsRequest, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user), embedder: EmbeddingService = Depends(get_embedder)):
     print(request)
     session_id = request.sessionId
     query = request.query
     user_id = current_user.id
 
-    res = await search_article(query, page=1, limit=20, db=db, current_user=current_user, sbert=sbert)
+    res = await search_article(query, page=1, limit=20, db=db, current_user=current_user, embedder=embedder)
     if not res:
         return {"type": "highlights_error", "message": "No articles found for the given query."}
     articles = [
@@ -58,8 +54,9 @@ async def get_hightlights(request: HighlightsRequest, db: AsyncSession = Depends
     await create_session(db, session_id, user_id)
     await log_chat_message(db, session_id, 'user', f"Search Highlights: {query}", {"type": 'search_highlights', 'query': query})
 
+    NewsDigestAgent = load_agent_class()
     agent = NewsDigestAgent(
-        sbert, db, user_id, session_id, new_session=True)
+        embedder, db, user_id, session_id, new_session=True)
     response = await agent.gen_highlights(query, articles)
     return StreamingResponse(response, media_type="application/x-ndjson")
 
@@ -71,7 +68,7 @@ class ChatbotRequest(BaseModel):
 
 
 @router.post("/agent_test")
-async def test_agent(request: ChatbotRequest, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user), sbert: SBERT = Depends(get_sbert)):
+async def test_agent(request: ChatbotRequest, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user), embedder: EmbeddingService = Depends(get_embedder)):
     user_query = request.user_query
     session_id = request.session_id
     new_session = request.newSession
@@ -84,7 +81,8 @@ async def test_agent(request: ChatbotRequest, db: AsyncSession = Depends(get_asy
     # Log User message in DB
     await log_chat_message(db, session_id, 'user', user_query, {})
 
-    agent = NewsDigestAgent(sbert, db, user_id,
+    NewsDigestAgent = load_agent_class()
+    agent = NewsDigestAgent(embedder, db, user_id,
                             session_id, new_session)
     return StreamingResponse(agent.call_agent(user_query), media_type="application/x-ndjson")
 
@@ -95,7 +93,7 @@ class AIAnalyzeRequest(BaseModel):
 
 
 @router.post("/ai_analyze")
-async def ai_analyze(request: AIAnalyzeRequest, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user), sbert: SBERT = Depends(get_sbert)):
+async def ai_analyze(request: AIAnalyzeRequest, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user), embedder: EmbeddingService = Depends(get_embedder)):
     session_id = request.sessionId
     article_id = request.article_id
     user_id = current_user.id
@@ -103,16 +101,22 @@ async def ai_analyze(request: AIAnalyzeRequest, db: AsyncSession = Depends(get_a
     article_metadata = await get_article_brief_by_id(db, article_id)
     await create_session(db, session_id, user_id)
     await log_chat_message(db, session_id, 'user', "Analyze above Article", {"type": 'article_metadata', 'data': article_metadata})
-    agent = NewsDigestAgent(sbert, db, user_id,
+    NewsDigestAgent = load_agent_class()
+    agent = NewsDigestAgent(embedder, db, user_id,
                             session_id, new_session=True)
     async_gen = await agent.analyze_article(article_metadata)
     return StreamingResponse(async_gen, media_type="application/x-ndjson")
 
 
 @router.get("/chat_messages")
-async def load_chat(sessionId: str, page: int = 1, limit: int = 20, db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user)):
-    messages = await get_chat_messages(
-        db, sessionId, page, limit, current_user.id)
+async def load_chat(sessionId: str, response: Response, page: int = 1, limit: int = 20, cursor: Optional[str] = None,
+                    db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user)):
+    try:
+        messages, next_cursor = await get_chat_messages(
+            db, sessionId, page, limit, current_user.id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
     return messages
 
 
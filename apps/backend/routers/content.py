@@ -5,21 +5,24 @@ It includes functionality for refreshing feeds, checking user subscriptions, and
 """
 
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.sql import ColumnElement
 from typing import Optional
 
-from src.aggregator.model import SBERT
+from src.aggregator.embedding_service import EmbeddingService
 from src.aggregator.search import search
 from src.database.session import get_async_db
 from src.database.models import Articles, Users, Sources, UserSubscriptions, UserHistory
+from src.monitoring.readiness import MODEL_RETRY_AFTER
 from src.database.queries import (
+    NEXT_CURSOR_HEADER,
     bookmark_alias,
     build_article_select,
-    paginate_and_format_async,
+    latest_of_story,
+    paginate_keyset_async,
 )
 from src.users.services import get_current_active_user
 from src.users.recommendation import Recommender
@@ -28,22 +31,44 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-# Dependency to access SBERT created in main and stored on app.state
-def get_sbert(request: Request) -> SBERT:
-    s = getattr(request.app.state, "sbert", None)
-    if s is None:
+# Dependency to access the query embedding service, created on app.state once
+# SBERT (loaded in the background by main) is ready
+def get_embedder(request: Request) -> EmbeddingService:
+    s = getattr(request.app.state, "embedder", None)
+    if s is not None:
+        return s
+    model = getattr(request.app.state, "sbert", None)
+    if model is None:
         raise HTTPException(status_code=500, detail="SBERT not initialized")
+    sbert = model.get()
+    if sbert is None:
+        raise HTTPException(status_code=503, detail="SBERT is loading",
+                            headers={"Retry-After": str(MODEL_RETRY_AFTER)})
+    s = request.app.state.embedder = EmbeddingService(sbert)
     return s
 
 
-async def fetch_article(db: AsyncSession, current_user_id: int, page: int, page_size: int, filter_by: ColumnElement, order_by: ColumnElement) -> list:
-    """Fetch articles based on user preferences and filters."""
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Pass the cursor of the next page of a feed to the client, if there is one."""
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+async def fetch_article(db: AsyncSession, current_user_id: int, page: int, page_size: int, filter_by: ColumnElement, sort_key: tuple,
+                        collapse: bool = False, cursor: Optional[str] = None) -> tuple:
+    """Fetch a page of articles based on user preferences and filters (one article per story if collapse).
+
+    sort_key is the (timestamp, id) columns the feed is ordered by, newest
+    first. Returns the articles and the cursor of the next page.
+    """
     try:
         skip = (page - 1) * page_size
-        stmt = build_article_select(current_user_id)
-        stmt = stmt.where(filter_by).order_by(order_by)
-        results = await paginate_and_format_async(db, stmt, skip, page_size)
-        return results
+        stmt = build_article_select(current_user_id).where(filter_by)
+        if collapse:
+            stmt = stmt.where(latest_of_story(filter_by))
+        return await paginate_keyset_async(db, stmt, *sort_key, cursor, page_size, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in fetching articles: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -55,27 +80,38 @@ class ArticleRequest(BaseModel):
     topic: Optional[str] = None
 
 
-async def handle_article_request(request: ArticleRequest, page: int, page_size: int, db: AsyncSession, current_user_id: int) -> list:
-    """Handle article request based on type."""
+async def handle_article_request(request: ArticleRequest, page: int, page_size: int, db: AsyncSession, current_user_id: int,
+                                 collapse: bool = False, cursor: Optional[str] = None) -> tuple:
+    """Handle article request based on type. Bookmarks are never collapsed."""
+    published = (Articles.published_date, Articles.id)
     if request.type == "bookmarked":
-        return await fetch_article(db, current_user_id, page, page_size, bookmark_alias.article_id.isnot(None), bookmark_alias.bookmarked_at.desc())
+        return await fetch_article(db, current_user_id, page, page_size, bookmark_alias.article_id.isnot(None),
+                                   (bookmark_alias.bookmarked_at, bookmark_alias.id), cursor=cursor)
     elif request.type == "source":
-        return await fetch_article(db, current_user_id, page, page_size, Articles.source == request.source, Articles.published_date.desc())
+        return await fetch_article(db, current_user_id, page, page_size, Articles.source == request.source, published, collapse, cursor)
     elif request.type == "topic":
-        return await fetch_article(db, current_user_id, page, page_size, Articles.topic == request.topic, Articles.published_date.desc())
+        return await fetch_article(db, current_user_id, page, page_size, Articles.topic == request.topic, published, collapse, cursor)
     else:
         raise HTTPException(status_code=400, detail="Invalid article type")
 
 
+# Feeds are paged by cursor: the X-Next-Cursor header of a page, passed back
+# as cursor, fetches the next one. page still serves clients paging by number.
+CURSOR_DESCRIPTION = "X-Next-Cursor of the previous page; takes precedence over page"
+
+
 @router.post("/articles")
-async def get_articles(request: ArticleRequest, page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+async def get_articles(request: ArticleRequest, response: Response, page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+                       collapse: bool = Query(False, description="Show only the latest article of each story"),
+                       cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
                        db: AsyncSession = Depends(get_async_db), current_user: Users = Depends(get_current_active_user)) -> list:
     """Get articles based on user preferences and filters."""
     try:
-        results = await handle_article_request(
-            request, page, page_size, db, current_user.id)
+        results, next_cursor = await handle_article_request(
+            request, page, page_size, db, current_user.id, collapse, cursor)
         if not results:
             raise HTTPException(status_code=404, detail="No articles found")
+        set_next_cursor(response, next_cursor)
         return results
     except Exception as e:
         logger.error(f"Error in retrieving articles: {e}")
@@ -89,12 +125,12 @@ async def search_article(query: str, page: int = Query(1, description="Page numb
                          limit: int = Query(20, description="Results per page"), db: AsyncSession = Depends(get_async_db),
                          current_user: Users = Depends(
                              get_current_active_user),
-                         sbert: SBERT = Depends(get_sbert)) -> list:
+                         embedder: EmbeddingService = Depends(get_embedder)) -> list:
     """Search for articles in DataBase."""
     try:
         skip = (page - 1) * limit
         search_results = await search(
-            current_user.id, query, sbert.model, sbert.get_device(), db, skip, limit)
+            current_user.id, query, embedder, db, skip, limit)
         if not search_results:
             return []
         return search_results
@@ -171,7 +207,9 @@ async def get_user_subscriptions(current_user: Users = Depends(get_current_activ
 
 
 @router.get("/subscribed-articles")
-async def get_subscribed_articles(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+async def get_subscribed_articles(response: Response, page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+                                  collapse: bool = Query(False, description="Show only the latest article of each story"),
+                                  cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
                                   current_user: Users = Depends(get_current_active_user), db: AsyncSession = Depends(get_async_db)) -> list:
     """Get articles from all sources the user has subscribed to."""
     try:
@@ -188,11 +226,12 @@ async def get_subscribed_articles(page: int = Query(1, ge=1), page_size: int = Q
             raise HTTPException(
                 status_code=404, detail="No news source subscribed")
         # Get articles from subscribed sources
-        results = await fetch_article(db, current_user.id, page, page_size, Articles.source.in_(
-            source_names), Articles.published_date.desc())
+        results, next_cursor = await fetch_article(db, current_user.id, page, page_size, Articles.source.in_(
+            source_names), (Articles.published_date, Articles.id), collapse, cursor)
         if not results:
             raise HTTPException(
                 status_code=404, detail="No subscribed articles found")
+        set_next_cursor(response, next_cursor)
         return results
     except Exception as e:
         logger.error(f"Error in retrieving subscribed articles: {e}")
@@ -201,8 +240,29 @@ async def get_subscribed_articles(page: int = Query(1, ge=1), page_size: int = Q
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+def format_history_rows(rows: list) -> list:
+    """Format user history rows: articles with their summary and when they were watched."""
+    formatted = []
+    for row in rows:
+        m = row._mapping
+        formatted.append({
+            'id': m['id'],
+            'title': m['title'],
+            'link': m['link'],
+            'published_date': m['published_date'],
+            'image': m['image'],
+            'source': m['source'],
+            'topic': m['topic'],
+            'bookmarked': m['bookmarked'],
+            'summary': m['summary'],
+            'watched_at': m['watched_at'],
+        })
+    return formatted
+
+
 @router.get("/user-history")
-async def get_history(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+async def get_history(response: Response, page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+                      cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
                       current_user: Users = Depends(get_current_active_user), db: AsyncSession = Depends(get_async_db)) -> list:
     """Get User History."""
     try:
@@ -212,30 +272,15 @@ async def get_history(page: int = Query(1, ge=1), page_size: int = Query(20, ge=
                 current_user.id, Articles.summary, UserHistory.watched_at)
             .join(UserHistory, UserHistory.article_id == Articles.id)
             .where(UserHistory.user_id == current_user.id)
-            .order_by(UserHistory.watched_at.desc())
-            .offset(offset)
-            .limit(page_size)
         )
-        result = await db.execute(stmt)
-        results = result.fetchall()
-        if not results:
+        try:
+            formatted, next_cursor = await paginate_keyset_async(
+                db, stmt, UserHistory.watched_at, UserHistory.id, cursor, page_size, offset, format_history_rows)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not formatted:
             raise HTTPException(status_code=404, detail="No history found")
-
-        formatted = []
-        for row in results:
-            m = row._mapping
-            formatted.append({
-                'id': m['id'],
-                'title': m['title'],
-                'link': m['link'],
-                'published_date': m['published_date'],
-                'image': m['image'],
-                'source': m['source'],
-                'topic': m['topic'],
-                'bookmarked': m['bookmarked'],
-                'summary': m['summary'],
-                'watched_at': m['watched_at'],
-            })
+        set_next_cursor(response, next_cursor)
         return formatted
     except Exception as e:
         logger.error(f"Error in retrieving user history: {e}")
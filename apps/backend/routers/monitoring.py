@@ -0,0 +1,79 @@
+"""
+monitoring.py
+This module exposes the ingestion metrics in Prometheus text format, the
+health of feeds whose circuit breaker is not closed, and the liveness and
+readiness probes of the API. The probes and the metrics are public; the
+feed health requires an authenticated user.
+"""
+
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import FeedState, Users
+from src.database.session import get_async_db
+from src.monitoring import metrics
+from src.monitoring.readiness import model_states, models_ready
+from src.users.services import get_current_active_user
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/metrics")
+def get_metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@router.get("/feeds/health")
+async def get_unhealthy_feeds(db: AsyncSession = Depends(get_async_db),
+                              current_user: Users = Depends(get_current_active_user)) -> list:
+    """List open, half-open and quarantined feeds, quarantined ones first."""
+    try:
+        result = await db.execute(
+            select(FeedState)
+            .where(FeedState.circuit != "closed")
+            .order_by(FeedState.failures.desc())
+        )
+        return [
+            {
+                "url": row.url,
+                "circuit": row.circuit,
+                "failures": row.failures,
+                "failing_since": row.failing_since,
+                "open_until": row.open_until,
+                "last_error": row.last_error,
+                "last_fetched": row.last_fetched,
+            }
+            for row in result.scalars().all()
+        ]
+    except Exception as e:
+        logger.error(f"Error in retrieving feed health: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get("/healthz")
+def liveness() -> dict:
+    """Liveness probe: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readiness(db: AsyncSession = Depends(get_async_db)) -> JSONResponse:
+    """Readiness probe: the database answers and the required models are loaded."""
+    checks = {"models": model_states()}
+    try:
+        await db.execute(text("SELECT 1"))
+        checks["database"] = "ready"
+    except Exception as e:
+        logger.error(f"Readiness check of the database failed: {e}")
+        checks["database"] = "failed"
+    ready = checks["database"] == "ready" and models_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **checks})
@@ -10,19 +10,26 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from src.summarizer.summarizer import Summarizer
 from src.database.session import get_async_db
 from src.database.models import Articles, Users
 from src.database.operations import update_user_history
 from src.users.services import get_current_active_user
+from src.monitoring.readiness import LazyModel, MODEL_RETRY_AFTER
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize Summarizer Model
-dbart = Summarizer()
+
+def load_summarizer():
+    # torch, transformers and the article scrapers are imported with the model
+    from src.summarizer.summarizer import Summarizer
+    return Summarizer()
+
+
+# Summarizer Model, loaded on the first summary (or at startup with SUMMARIZER_WARMUP)
+summarizer = LazyModel("DistilBART", load_summarizer)
 
 
 class ArticleUrl(BaseModel):
@@ -45,6 +52,13 @@ async def summarize(id: int, update_history: bool = True, db: AsyncSession = Dep
             if update_history:
                 await update_user_history(db, current_user.id, article.id)
             return {"data": article.summary}
+        dbart = summarizer.get()
+        if dbart is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Summarizer is loading",
+                headers={"Retry-After": str(MODEL_RETRY_AFTER)}
+            )
         # Try to generate new summary
         try:
             generated_summary = dbart.infer(article.link)
@@ -1,28 +1,172 @@
 """
 deduplicator.py
-This module contains the deduplicator for the aggregator.
+This module clusters near-duplicate articles (the same story covered by
+several publishers) into stories, using the title embeddings computed
+during ingestion.
 """
 
+import itertools
 import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 
-from scipy.spatial.distance import pdist, squareform
+import numpy as np
+
+from src.database.operations import load_story_articles
 
 logger = logging.getLogger(__name__)
 
+# Cosine similarity of titles above which two articles are the same story
+STORY_SIMILARITY_THRESHOLD = 0.8
+# Stories are only matched against articles of the last few days
+STORY_WINDOW_DAYS = 3
+# Random hyperplane LSH: a pair with similarity 0.8 shares a bucket in at
+# least one of 16 tables of 8 bits with ~95% probability
+LSH_TABLES = 16
+LSH_BITS = 8
+_PRUNE_INTERVAL = 60 * 60
+
 
 class Deduplicator:
+    """
+    Incremental story clustering over an LSH index of recent title embeddings.
+
+    Each new article is compared only with the articles sharing one of its
+    LSH buckets (not with every article), joins the story of the most
+    similar one above STORY_SIMILARITY_THRESHOLD, or starts a new story.
+    """
+
+    def __init__(self, window_days: int = STORY_WINDOW_DAYS, seed: int = 0):
+        self.window = timedelta(days=window_days)
+        self._seed = seed
+        self._planes = None
+        self._reset()
+        self._last_prune = time.time()
+
+    def _reset(self):
+        self._buckets = [defaultdict(list) for _ in range(LSH_TABLES)]
+        self._vectors = None
+        self._story_ids = []
+        self._published = []
+        self._link_slots = {}
+
+    def __len__(self):
+        return len(self._story_ids)
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH bucket of each vector in every table, shape (n, LSH_TABLES)."""
+        if self._planes is None:
+            rng = np.random.default_rng(self._seed)
+            self._planes = rng.standard_normal(
+                (LSH_TABLES, LSH_BITS, vectors.shape[1])).astype(np.float32)
+        bits = np.einsum('tbd,nd->ntb', self._planes, vectors) > 0
+        return bits.astype(np.int64) @ (1 << np.arange(LSH_BITS, dtype=np.int64))
+
     @staticmethod
-    def deduplicate(input: list, model=None, device: str = None) -> list:
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _add(self, link: str, vector: np.ndarray, codes: np.ndarray, story_id: str, published_ts: float):
+        slot = len(self._story_ids)
+        if self._vectors is None:
+            self._vectors = np.empty((1024, vector.shape[0]), dtype=np.float32)
+        elif slot == self._vectors.shape[0]:
+            self._vectors = np.concatenate(
+                [self._vectors, np.empty_like(self._vectors)])
+        self._vectors[slot] = vector
+        self._story_ids.append(story_id)
+        self._published.append(published_ts)
+        self._link_slots[link] = slot
+        for table, code in enumerate(codes):
+            self._buckets[table][code].append(slot)
+
+    def _match(self, vector: np.ndarray, codes: np.ndarray) -> str | None:
+        candidates = list(itertools.chain.from_iterable(
+            self._buckets[table].get(code, ()) for table, code in enumerate(codes)))
+        if not candidates:
+            return None
+        # Duplicates (pairs sharing several buckets) do not change the best match
+        candidates = np.array(candidates, dtype=np.int64)
+        similarities = self._vectors[candidates] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < STORY_SIMILARITY_THRESHOLD:
+            return None
+        return self._story_ids[candidates[best]]
+
+    def load(self):
+        """Seed the index with the articles of the window that already have a story."""
+        since = datetime.now(timezone.utc) - self.window
+        self._reset()
+        rows = load_story_articles(since)
+        if rows:
+            vectors = self._normalize(np.stack([row[1] for row in rows]))
+            codes = self._hash(vectors)
+            for (link, _, story_id, published), vector, code in zip(rows, vectors, codes.tolist()):
+                self._add(link, vector, code, story_id, published.timestamp())
+        logger.info(f"Loaded {len(self)} articles into the story index")
+
+    def assign(self, articles: list) -> list:
         """
-        Embedding-based deduplication was removed and moved to FeedParser.
-        This method is retained as a no-op for backward compatibility and
-        simply returns the input list unchanged (or an empty list when
-        input is falsy).
+        Set 'story_id' on each article (in-place) and add it to the index.
+        Articles without embeddings are left without a story.
+        Returns the links added to the index, to forget if the articles are not stored.
         """
+        added = []
         try:
-            if not input:
-                return []
-            return input
+            embedded = [art for art in articles
+                        if art.get('embeddings') is not None]
+            if not embedded:
+                return added
+            vectors = self._normalize(
+                np.stack([art['embeddings'] for art in embedded]))
+            codes = self._hash(vectors)
+            for art, vector, code in zip(embedded, vectors, codes.tolist()):
+                slot = self._link_slots.get(art['link'])
+                if slot is not None:
+                    # Re-ingested article keeps its story
+                    art['story_id'] = self._story_ids[slot]
+                    continue
+                story_id = self._match(vector, code) or str(uuid.uuid4())
+                art['story_id'] = story_id
+                self._add(art['link'], vector, code, story_id,
+                          art['published'].timestamp())
+                added.append(art['link'])
+            if time.time() - self._last_prune > _PRUNE_INTERVAL:
+                self.prune()
         except Exception as e:
-            logger.error(f"Error in Deduplicating Feed (no-op): {e}")
-            return input
+            logger.error(f"Error assigning stories to articles: {e}")
+        return added
+
+    def forget(self, links: list):
+        """Remove articles added by assign from the index, so no later article joins their stories."""
+        for link in links:
+            slot = self._link_slots.pop(link, None)
+            if slot is None:
+                continue
+            codes = self._hash(self._vectors[slot:slot + 1])[0]
+            for table, code in enumerate(codes.tolist()):
+                self._buckets[table][code].remove(slot)
+            # Dropped from the arrays by the next prune
+            self._published[slot] = -np.inf
+
+    def prune(self):
+        """Rebuild the index without the articles older than the window."""
+        cutoff = (datetime.now(timezone.utc) - self.window).timestamp()
+        keep = [slot for slot, published in enumerate(self._published)
+                if published >= cutoff]
+        links = {slot: link for link, slot in self._link_slots.items()}
+        vectors = self._vectors[keep] if keep else None
+        story_ids = [self._story_ids[slot] for slot in keep]
+        published = [self._published[slot] for slot in keep]
+        kept_links = [links[slot] for slot in keep]
+        self._reset()
+        if keep:
+            for link, vector, code, story_id, ts in zip(
+                    kept_links, vectors, self._hash(vectors).tolist(), story_ids, published):
+                self._add(link, vector, code, story_id, ts)
+        self._last_prune = time.time()
+        logger.debug(f"Story index pruned to {len(self)} articles")
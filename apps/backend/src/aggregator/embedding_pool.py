@@ -0,0 +1,196 @@
+"""
+embedding_pool.py
+This module runs ingestion embedding in worker processes, so encoding
+bursts of new articles do not compete with request handling for the GIL
+and the torch threads of the API process.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_CPU_COUNT = os.cpu_count() or 1
+# Processes encoding article titles for ingestion, 0 encodes in the calling
+# process (the default on single core hosts, where there is nothing to isolate)
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 1 if _CPU_COUNT > 1 else 0))
+# Intra-op threads of each worker; the API process keeps SBERT_THREADS for queries
+EMBED_WORKER_THREADS = int(os.getenv(
+    "EMBED_WORKER_THREADS", max(1, (_CPU_COUNT - 1) // max(EMBED_WORKERS, 1))))
+# Scheduling priority of the workers: query encoding wins when cores are busy
+EMBED_WORKER_NICE = int(os.getenv("EMBED_WORKER_NICE", 10))
+# Titles per request to a worker, which is the size of its result buffer
+EMBED_WORKER_BATCH_SIZE = 256
+# Seconds to wait for a worker to answer, including loading its model
+EMBED_WORKER_TIMEOUT = 300
+
+
+def load_worker_model(model_name: str, backend: str, threads: int):
+    """Model of a worker process (anything with the encode of SentenceTransformer)."""
+    from .model import SBERT
+    return SBERT(backend, model_name, threads=threads).model
+
+
+def _worker_main(conn, buffer_name: str, capacity: int, dimensions: int,
+                 loader, model_name: str, backend: str, threads: int, nice: int):
+    """Encode the title lists received on conn into the shared result buffer."""
+    try:
+        os.nice(nice)
+    except OSError:
+        pass
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        vectors = np.ndarray((capacity, dimensions), dtype=np.float32, buffer=buffer.buf)
+        model = loader(model_name, backend, threads)
+        while True:
+            titles = conn.recv()
+            if titles is None:
+                break
+            try:
+                encoded = model.encode(titles, convert_to_numpy=True)
+                vectors[:len(titles)] = encoded
+                conn.send(len(titles))
+            except Exception as e:
+                conn.send(f"{type(e).__name__}: {e}")
+        del vectors
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        buffer.close()
+
+
+class _Worker:
+    """One worker process, its pipe and its shared result buffer."""
+
+    def __init__(self, context, capacity: int, dimensions: int, args: tuple):
+        self.buffer = shared_memory.SharedMemory(
+            create=True, size=capacity * dimensions * 4)
+        self.vectors = np.ndarray((capacity, dimensions), dtype=np.float32,
+                                  buffer=self.buffer.buf)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, name="embedding-worker", daemon=True,
+            args=(child_conn, self.buffer.name, capacity, dimensions) + args)
+        self.process.start()
+        child_conn.close()
+
+    def send(self, titles: list):
+        self.conn.send(titles)
+
+    def receive(self, timeout: float) -> np.ndarray:
+        """Vectors of the titles last sent, copied out of the shared buffer."""
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"No answer within {timeout}s")
+        result = self.conn.recv()
+        if isinstance(result, str):
+            raise RuntimeError(result)
+        return self.vectors[:result].copy()
+
+    def stop(self, timeout: float = 5):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        del self.vectors
+        self.buffer.close()
+        self.buffer.unlink()
+
+
+class EmbeddingPool:
+    """
+    Worker processes encoding titles with their own copy of the model.
+
+    Titles go to the workers over pipes; each worker writes the vectors to
+    a shared memory buffer the caller copies them from, so vectors are never
+    pickled. A list of titles is split across the workers, which encode
+    their parts in parallel. Workers start on the first call (only the
+    ingestion leader pays for them) and a worker that dies or times out is
+    replaced on the next call.
+
+    Has the encode signature of SentenceTransformer, so it stands in for the
+    model of the ingestion pipeline.
+    """
+
+    def __init__(self, model_name: str, backend: str, dimensions: int,
+                 workers: int = EMBED_WORKERS, threads: int = EMBED_WORKER_THREADS,
+                 batch_size: int = EMBED_WORKER_BATCH_SIZE, timeout: float = EMBED_WORKER_TIMEOUT,
+                 loader=load_worker_model):
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._args = (loader, model_name, backend, threads, EMBED_WORKER_NICE)
+        self._workers = [None] * max(workers, 1)
+        # spawn: forking a process that holds torch and running threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+
+    def _worker(self, i: int) -> _Worker:
+        worker = self._workers[i]
+        if worker is None or not worker.process.is_alive():
+            if worker is not None:
+                logger.error(f"Embedding worker {i} died (exit code {worker.process.exitcode})")
+                worker.stop()
+            worker = _Worker(self._context, self.batch_size, self.dimensions, self._args)
+            self._workers[i] = worker
+        return worker
+
+    def encode(self, sentences: list, **kwargs) -> np.ndarray:
+        """Vectors of the sentences (float32 numpy array, one row per sentence)."""
+        if not sentences:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        sentences = list(sentences)
+        n_workers = len(self._workers)
+        size = min(self.batch_size, math.ceil(len(sentences) / n_workers))
+        parts = [sentences[i:i + size] for i in range(0, len(sentences), size)]
+        vectors = []
+        with self._lock:
+            # Rounds of one part per worker
+            for start in range(0, len(parts), n_workers):
+                sent = []
+                for i, part in enumerate(parts[start:start + n_workers]):
+                    worker = self._worker(i)
+                    worker.send(part)
+                    sent.append(i)
+                # Every answer is read before failing, so none is left for the next call
+                error = None
+                for i in sent:
+                    try:
+                        vectors.append(self._workers[i].receive(self.timeout))
+                    except RuntimeError as e:
+                        error = error or e
+                    except (TimeoutError, EOFError, OSError) as e:
+                        # Replace the worker, its answers can no longer be trusted
+                        logger.error(f"Embedding worker {i} failed: {e}")
+                        self._workers[i].stop(timeout=0)
+                        self._workers[i] = None
+                        error = error or RuntimeError(f"Embedding worker {i} failed: {e}")
+                if error is not None:
+                    raise error
+        return np.concatenate(vectors)
+
+    def close(self):
+        """Stop the worker processes."""
+        with self._lock:
+            for i, worker in enumerate(self._workers):
+                if worker is not None:
+                    worker.stop()
+                    self._workers[i] = None
+
+
+def open_pool(sbert, workers: int = EMBED_WORKERS) -> EmbeddingPool | None:
+    """Worker pool running the model of sbert, None to encode in this process."""
+    if workers <= 0:
+        return None
+    return EmbeddingPool(sbert.get_model_name(), sbert.backend,
+                         sbert.model.get_sentence_embedding_dimension(), workers)
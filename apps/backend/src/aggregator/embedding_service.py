@@ -0,0 +1,113 @@
+"""
+embedding_service.py
+This module embeds search queries off the event loop, coalescing the
+queries of concurrent requests into micro-batches.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src.monitoring import metrics
+from .query_cache import QueryVectorCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Queries encoded in one model call at most
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_EMBED_BATCH_SIZE", 32))
+# Time a query waits for others to share its batch
+QUERY_BATCH_WINDOW = float(os.getenv("QUERY_EMBED_BATCH_WINDOW_MS", 5)) / 1000
+
+
+class EmbeddingService:
+    """
+    Awaitable query encoder wrapping SBERT, with a cache of query vectors.
+
+    Queries arriving within QUERY_BATCH_WINDOW of each other are encoded
+    together on a dedicated thread. While a batch is encoding, new queries
+    queue up and form the next batch, so batches grow with the load instead
+    of queries serializing on the event loop.
+    """
+
+    def __init__(self, sbert, batch_size: int = QUERY_BATCH_SIZE, window: float = QUERY_BATCH_WINDOW,
+                 cache: QueryVectorCache = None):
+        self.sbert = sbert
+        self.model_name = sbert.get_model_name()
+        self.model_version = sbert.get_model_version()
+        self.cache = cache if cache is not None else QueryVectorCache()
+        self.batch_size = max(batch_size, 1)
+        self.window = window
+        self._pending = []
+        self._timer = None
+        self._busy = False
+        self._tasks = set()
+        # One thread: batches run one after the other, like a single model call
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="query-embedding")
+
+    async def encode(self, query: str) -> list[float]:
+        """Embedding of a search query."""
+        # The normalized text is the cache key only: a cased model embeds
+        # the query as it was typed
+        key = normalize_query(query)
+        vector = self.cache.get(self.model_version, key)
+        if vector is not None:
+            return vector
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((key, query, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # The running batch flushes the queries that arrived meanwhile
+        if self._busy or not self._pending:
+            return
+        batch = self._pending[:self.batch_size]
+        self._pending = self._pending[self.batch_size:]
+        self._busy = True
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list):
+        try:
+            # Queries of the same key are encoded once
+            queries = {}
+            for key, query, _ in batch:
+                queries.setdefault(key, query)
+            metrics.QUERY_EMBED_BATCH_SIZE.observe(len(queries))
+            loop = asyncio.get_running_loop()
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode, list(queries.values()))
+            except Exception as e:
+                logger.error(f"Error embedding {len(queries)} search queries: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            index = {key: i for i, key in enumerate(queries)}
+            for key, vector in zip(queries, vectors):
+                self.cache.put(self.model_version, key, vector)
+            for key, _, future in batch:
+                if not future.done():
+                    future.set_result(vectors[index[key]])
+        finally:
+            self._busy = False
+            self._flush()
+
+    def _encode(self, queries: list) -> list:
+        with metrics.QUERY_EMBED_SECONDS.time():
+            embeddings = self.sbert.model.encode(
+                queries, convert_to_numpy=True, device=self.sbert.device)
+        return embeddings.tolist()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,287 @@
+"""
+embedding_store.py
+This module keeps a persistent, content-addressed store of title
+embeddings, so restarts, re-ingestion of archived feeds and backfills do not
+encode titles that were already embedded.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Directory of the stores (one per model version), empty to disable them
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "./model/EmbeddingStore")
+# Vectors kept per model version; the oldest are overwritten beyond it
+EMBEDDING_STORE_MAX_ENTRIES = int(os.getenv("EMBEDDING_STORE_MAX_ENTRIES", 200_000))
+# float32, or float16 to halve the size
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+# Stores of other model versions unused this long are removed by compaction
+STALE_STORE_SECONDS = 60 * 60 * 24 * 7
+_KEY_BYTES = 16
+_EMPTY_KEY = bytes(_KEY_BYTES)
+
+
+class EmbeddingStore:
+    """
+    Title embeddings of one model version in two memory-mapped files:
+    `vectors` (capacity x dimensions) and `keys` (capacity x 16 bytes), the
+    index, whose slot i holds the hash of (model version, title) of vector i.
+    `meta.json` records the shape and the next slot to write.
+
+    Slots are written in ring order, so the oldest vectors are evicted once
+    the store is full. Writers serialize on a file lock. Readers need no
+    lock: a writer clears a slot's key before overwriting its vector and
+    sets it last, and readers check the key around reading the vector.
+    """
+
+    def __init__(self, model_version: str, root: str = EMBEDDING_STORE_DIR,
+                 max_entries: int = EMBEDDING_STORE_MAX_ENTRIES, dtype: str = EMBEDDING_STORE_DTYPE):
+        self.model_version = model_version
+        self.root = root
+        self.path = os.path.join(root, self.directory_name(model_version))
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self._meta = None
+        self._keys = None
+        self._vectors = None
+        self._index = {}
+        self._scanned = 0
+
+    @staticmethod
+    def directory_name(model_version: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_version)
+
+    def key(self, title: str) -> bytes:
+        return hashlib.blake2b(f"{self.model_version}\0{title}".encode("utf-8"),
+                               digest_size=_KEY_BYTES).digest()
+
+    def __len__(self):
+        self._refresh()
+        return len(self._index)
+
+    # --- Reading ---------------------------------------------------------
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _refresh(self):
+        """Map the files and index the slots written since the last call."""
+        try:
+            with open(self._meta_path()) as file:
+                meta = json.load(file)
+        except FileNotFoundError:
+            return
+        if self._meta == meta:
+            return
+        if self._meta is None or meta["generation"] != self._meta["generation"]:
+            # New or compacted store: map it from scratch
+            self._keys = np.memmap(os.path.join(self.path, meta["keys"]), dtype=np.uint8,
+                                   mode="r+", shape=(meta["capacity"], _KEY_BYTES))
+            self._vectors = np.memmap(os.path.join(self.path, meta["vectors"]), dtype=meta["dtype"],
+                                      mode="r+", shape=(meta["capacity"], meta["dimensions"]))
+            self._index = {}
+            self._scanned = 0
+        capacity = meta["capacity"]
+        start = self._scanned
+        end = meta["written"]
+        # Only the last `capacity` writes are still in the ring
+        start = max(start, end - capacity)
+        if end > start:
+            slots = np.arange(start, end) % capacity
+            keys = np.asarray(self._keys[slots]).tobytes()
+            for i, slot in enumerate(slots.tolist()):
+                key = keys[i * _KEY_BYTES:(i + 1) * _KEY_BYTES]
+                if key != _EMPTY_KEY:
+                    self._index[key] = slot
+        self._scanned = end
+        self._meta = meta
+
+    def get_many(self, titles: list) -> list:
+        """Stored vectors of the titles (None for titles not stored)."""
+        self._refresh()
+        found = [None] * len(titles)
+        hits = []
+        for i, title in enumerate(titles):
+            key = self.key(title)
+            slot = self._index.get(key)
+            if slot is not None:
+                hits.append((i, key, slot))
+        if not hits:
+            return found
+        slots = np.array([slot for _, _, slot in hits])
+        expected = np.frombuffer(b"".join(key for _, key, _ in hits),
+                                 dtype=np.uint8).reshape(-1, _KEY_BYTES)
+        before = np.asarray(self._keys[slots])
+        vectors = np.asarray(self._vectors[slots], dtype=np.float32)
+        # A slot may have been overwritten before or while it was read
+        after = np.asarray(self._keys[slots])
+        valid = (before == expected).all(axis=1) & (after == expected).all(axis=1)
+        for (i, key, _), vector, ok in zip(hits, vectors, valid):
+            if ok:
+                found[i] = vector
+            else:
+                self._index.pop(key, None)
+        return found
+
+    # --- Writing ---------------------------------------------------------
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_meta(self, meta: dict):
+        tmp = self._meta_path() + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump(meta, file)
+        os.replace(tmp, self._meta_path())
+
+    def _create(self, dimensions: int, capacity: int, generation: int = 0) -> dict:
+        """Allocate empty (sparse) files and return their meta."""
+        meta = {
+            "model_version": self.model_version,
+            "dimensions": dimensions,
+            "dtype": self.dtype.name,
+            "capacity": capacity,
+            "written": 0,
+            "generation": generation,
+            "keys": f"keys.{generation}.bin",
+            "vectors": f"vectors.{generation}.bin",
+        }
+        for name, itemsize, width in ((meta["keys"], 1, _KEY_BYTES),
+                                      (meta["vectors"], self.dtype.itemsize, dimensions)):
+            with open(os.path.join(self.path, name), "wb") as file:
+                file.truncate(capacity * width * itemsize)
+        return meta
+
+    def _remove_files(self, meta: dict):
+        # Readers that mapped the files keep them until they refresh
+        for name in (meta["keys"], meta["vectors"]):
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+    def put_many(self, titles: list, vectors) -> int:
+        """Store the vectors of titles, returning how many were added."""
+        if not titles:
+            return 0
+        vectors = np.asarray(vectors)
+        with self._write_lock():
+            self._refresh()
+            if self._meta is None or self._meta["dimensions"] != vectors.shape[1]:
+                old = self._meta
+                self._write_meta(self._create(vectors.shape[1], self.max_entries,
+                                              old["generation"] + 1 if old else 0))
+                self._refresh()
+                if old is not None:
+                    self._remove_files(old)
+            meta = dict(self._meta)
+            new = {}
+            for title, vector in zip(titles, vectors):
+                key = self.key(title)
+                if key not in self._index and key not in new:
+                    new[key] = vector
+            # Beyond the capacity, only the last vectors would survive
+            items = list(new.items())[-meta["capacity"]:]
+            if not items:
+                return 0
+            slots = np.arange(meta["written"], meta["written"] + len(items)) % meta["capacity"]
+            # Evict the oldest vectors; clear their keys first, so readers
+            # never pair a key with another vector
+            evicted = np.asarray(self._keys[slots]).tobytes()
+            for i in range(len(items)):
+                self._index.pop(evicted[i * _KEY_BYTES:(i + 1) * _KEY_BYTES], None)
+            self._keys[slots] = 0
+            self._vectors[slots] = np.stack([vector for _, vector in items])
+            self._keys[slots] = np.frombuffer(
+                b"".join(key for key, _ in items), dtype=np.uint8).reshape(-1, _KEY_BYTES)
+            for key, slot in zip((key for key, _ in items), slots.tolist()):
+                self._index[key] = slot
+            meta["written"] += len(items)
+            self._vectors.flush()
+            self._keys.flush()
+            self._write_meta(meta)
+            self._refresh()
+            return len(items)
+
+    def embed(self, titles: list, encode) -> np.ndarray:
+        """
+        Vectors of the titles: stored ones are read, the others encoded with
+        encode(list of titles) and stored.
+        """
+        vectors = self.get_many(titles)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = np.asarray(encode([titles[i] for i in missing]), dtype=np.float32)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+            try:
+                self.put_many([titles[i] for i in missing], encoded)
+            except Exception as e:
+                logger.error(f"Error storing {len(missing)} title embeddings: {e}")
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def compact(self) -> int:
+        """
+        Remove the stores of other model versions unused for STALE_STORE_SECONDS,
+        and repack this one into max_entries slots (keeping the most recent
+        vectors) if it is larger.
+        Returns the number of vectors dropped.
+        """
+        dropped = 0
+        with self._write_lock():
+            for name in os.listdir(self.root):
+                other = os.path.join(self.root, name)
+                try:
+                    unused = time.time() - os.stat(os.path.join(other, "meta.json")).st_mtime
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                if other != self.path and unused > STALE_STORE_SECONDS:
+                    shutil.rmtree(other, ignore_errors=True)
+                    logger.info(f"Removed embedding store {name}")
+            self._refresh()
+            meta = self._meta
+            if meta is None or meta["capacity"] <= self.max_entries:
+                return 0
+            slots = np.arange(max(meta["written"] - meta["capacity"], 0),
+                              meta["written"]) % meta["capacity"]
+            kept = slots[np.asarray(self._keys[slots]).any(axis=1)][-self.max_entries:]
+            dropped = min(meta["written"], meta["capacity"]) - len(kept)
+            new_meta = self._create(meta["dimensions"], self.max_entries, meta["generation"] + 1)
+            keys = np.memmap(os.path.join(self.path, new_meta["keys"]), dtype=np.uint8,
+                             mode="r+", shape=(self.max_entries, _KEY_BYTES))
+            vectors = np.memmap(os.path.join(self.path, new_meta["vectors"]), dtype=new_meta["dtype"],
+                                mode="r+", shape=(self.max_entries, meta["dimensions"]))
+            keys[:len(kept)] = self._keys[kept]
+            vectors[:len(kept)] = self._vectors[kept]
+            keys.flush()
+            vectors.flush()
+            new_meta["written"] = len(kept)
+            self._write_meta(new_meta)
+            self._refresh()
+            self._remove_files(meta)
+        logger.info(f"Compacted embedding store {self.model_version}, dropped {dropped} vectors")
+        return dropped
+
+
+def open_store(model_version: str) -> EmbeddingStore | None:
+    """Store of a model version, None if stores are disabled."""
+    if not EMBEDDING_STORE_DIR:
+        return None
+    return EmbeddingStore(model_version)
@@ -0,0 +1,96 @@
+"""
+feed_archive.py
+This module archives the raw body of every changed feed, compressed and
+keyed by content hash, so history can be re-ingested after a parser fix
+without downloading anything again.
+"""
+
+import hashlib
+import logging
+import os
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from src.database.operations import (
+    delete_archived_feeds,
+    list_archived_feeds,
+    load_archived_feed_body,
+    save_archived_feeds,
+)
+
+logger = logging.getLogger(__name__)
+
+# Days archived bodies are kept, 0 disables the archive
+ARCHIVE_RETENTION_DAYS = int(os.getenv("FEED_ARCHIVE_RETENTION_DAYS", 30))
+_COMPRESSION_LEVEL = 6
+_PRUNE_INTERVAL = 60 * 60
+
+
+class FeedArchiveStore:
+    """
+    Write-behind store of raw feed bodies in the `feed_archive` table.
+
+    Bodies added during a refresh are compressed and written by `save`,
+    off the event loop. Unchanged bodies never reach the archive, as
+    fetch_feed already skips them by content hash.
+    """
+
+    def __init__(self, retention_days: int = ARCHIVE_RETENTION_DAYS):
+        self.retention = timedelta(days=retention_days)
+        self._pending = []
+        self._last_prune = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention > timedelta(0)
+
+    def add(self, topic: str, publisher: str, url: str, xml: str):
+        """Stage a fetched feed body for archiving."""
+        if self.enabled:
+            self._pending.append((topic, publisher, url, xml,
+                                  datetime.now(timezone.utc)))
+
+    def discard(self):
+        """Drop staged bodies."""
+        self._pending = []
+
+    def save(self) -> bool:
+        """Compress and persist staged bodies, and prune the ones past retention."""
+        pending, self._pending = self._pending, []
+        rows = []
+        for topic, publisher, url, xml, fetched_at in pending:
+            raw = xml.encode("utf-8")
+            rows.append({
+                "url": url,
+                "topic": topic,
+                "publisher": publisher,
+                "content_hash": hashlib.sha256(raw).hexdigest(),
+                "fetched_at": fetched_at,
+                "body": zlib.compress(raw, _COMPRESSION_LEVEL),
+            })
+        saved = save_archived_feeds(rows)
+        if saved and rows:
+            logger.debug(
+                f"Archived {len(rows)} feed bodies, {sum(len(row['body']) for row in rows)} bytes compressed")
+
+        if self.enabled and time.time() - self._last_prune > _PRUNE_INTERVAL:
+            deleted = delete_archived_feeds(
+                datetime.now(timezone.utc) - self.retention)
+            if deleted:
+                logger.info(f"Pruned {deleted} archived feed bodies")
+            self._last_prune = time.time()
+        return saved
+
+    @staticmethod
+    def list(since: datetime, until: datetime = None, topic: str = None, publisher: str = None) -> list:
+        """Archived bodies fetched in [since, until], newest first (without the bodies)."""
+        return list_archived_feeds(since, until, topic, publisher)
+
+    @staticmethod
+    def load_body(archive_id: int) -> str | None:
+        """Decompressed body of an archived feed."""
+        body = load_archived_feed_body(archive_id)
+        if body is None:
+            return None
+        return zlib.decompress(body).decode("utf-8")
@@ -0,0 +1,149 @@
+"""
+feed_health.py
+This module keeps a persisted circuit breaker per feed, so feeds that keep
+failing stop using up the ingestion budget.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from src.database.operations import load_feed_states, save_feed_health
+from src.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+QUARANTINED = "quarantined"
+CIRCUIT_STATES = (CLOSED, HALF_OPEN, OPEN, QUARANTINED)
+
+# Consecutive failures opening the circuit
+FAILURE_THRESHOLD = 3
+# The circuit stays open for BASE_OPEN_SECONDS, doubled on every further failure
+BASE_OPEN_SECONDS = 60 * 5
+MAX_OPEN_SECONDS = 60 * 60 * 6
+# Consecutive failures after which a feed is considered dead
+QUARANTINE_FAILURES = 12
+QUARANTINE_PROBE_SECONDS = 60 * 60 * 24
+_LAST_ERROR_MAX_LENGTH = 512
+
+
+class FeedHealth:
+    """
+    Per-feed health state machine:
+
+    closed -- FAILURE_THRESHOLD failures --> open (exponential backoff)
+    open -- backoff elapsed --> half_open (one probe poll)
+    half_open -- success --> closed, failure --> open (longer backoff)
+    any -- QUARANTINE_FAILURES failures --> quarantined (probed daily)
+
+    A successful poll closes the circuit from any state.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._dirty = set()
+
+    def load(self):
+        """Load the persisted health of every feed."""
+        self._states = {
+            url: {
+                "circuit": state.get("circuit") or CLOSED,
+                "failures": state.get("failures") or 0,
+                "open_until": state.get("open_until"),
+                "failing_since": state.get("failing_since"),
+                "last_error": state.get("last_error"),
+            }
+            for url, state in load_feed_states().items()
+        }
+        self._dirty = set()
+        unhealthy = [url for url, state in self._states.items()
+                     if state["circuit"] != CLOSED]
+        logger.info(
+            f"Loaded health of {len(self._states)} feeds, {len(unhealthy)} with an open circuit")
+
+    def _state(self, url: str) -> dict:
+        return self._states.setdefault(url, {
+            "circuit": CLOSED,
+            "failures": 0,
+            "open_until": None,
+            "failing_since": None,
+            "last_error": None,
+        })
+
+    def circuit(self, url: str) -> str:
+        """Current circuit state of a feed."""
+        state = self._states.get(url)
+        return state["circuit"] if state else CLOSED
+
+    def allow(self, url: str, now: datetime = None) -> bool:
+        """
+        Check whether the feed may be polled now. An open circuit whose
+        backoff has elapsed moves to half-open and lets one probe through.
+        """
+        state = self._states.get(url)
+        if not state or state["circuit"] in (CLOSED, HALF_OPEN):
+            return True
+        now = now or datetime.now(timezone.utc)
+        if state["open_until"] is not None and now < state["open_until"]:
+            return False
+        if state["circuit"] == OPEN:
+            state["circuit"] = HALF_OPEN
+            self._dirty.add(url)
+            logger.info(f"Probing feed {url} (circuit half-open)")
+        return True
+
+    def record_success(self, url: str):
+        """Record a successful poll, closing the circuit."""
+        state = self._state(url)
+        if state["circuit"] != CLOSED:
+            logger.info(
+                f"Feed {url} recovered after {state['failures']} failures")
+        if state["circuit"] != CLOSED or state["failures"]:
+            state.update(circuit=CLOSED, failures=0, open_until=None,
+                         failing_since=None)
+            self._dirty.add(url)
+
+    def record_failure(self, url: str, error: str, now: datetime = None):
+        """Record a failed poll, opening or quarantining the circuit when needed."""
+        now = now or datetime.now(timezone.utc)
+        state = self._state(url)
+        state["failures"] += 1
+        state["failing_since"] = state["failing_since"] or now
+        state["last_error"] = (error or "")[:_LAST_ERROR_MAX_LENGTH]
+        self._dirty.add(url)
+
+        failures = state["failures"]
+        if failures >= QUARANTINE_FAILURES:
+            if state["circuit"] != QUARANTINED:
+                logger.warning(
+                    f"Quarantining feed {url} after {failures} failures: {state['last_error']}")
+            state["circuit"] = QUARANTINED
+            state["open_until"] = now + \
+                timedelta(seconds=QUARANTINE_PROBE_SECONDS)
+        elif failures >= FAILURE_THRESHOLD:
+            backoff = min(BASE_OPEN_SECONDS * 2 ** (failures - FAILURE_THRESHOLD),
+                          MAX_OPEN_SECONDS)
+            if state["circuit"] != OPEN:
+                logger.warning(
+                    f"Opening circuit of feed {url} for {backoff}s after {failures} failures: {state['last_error']}")
+            state["circuit"] = OPEN
+            state["open_until"] = now + timedelta(seconds=backoff)
+
+    def unhealthy(self) -> dict:
+        """Feeds whose circuit is not closed, with their health state."""
+        return {url: dict(state) for url, state in self._states.items()
+                if state["circuit"] != CLOSED}
+
+    def save(self) -> bool:
+        """Persist the health of the feeds updated since the last save."""
+        for circuit in CIRCUIT_STATES:
+            metrics.FEED_CIRCUITS.labels(circuit).set(
+                sum(1 for state in self._states.values() if state["circuit"] == circuit))
+        if not self._dirty:
+            return True
+        if not save_feed_health({url: self._states[url] for url in self._dirty}):
+            return False
+        self._dirty = set()
+        return True
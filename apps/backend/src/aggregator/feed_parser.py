@@ -6,47 +6,100 @@ This module contains the feed parser for the aggregator.
 import asyncio
 import re
 import logging
+import time
 from urllib.parse import urlparse
 from datetime import datetime
 
-import aiohttp
 import pytz
 import feedparser
 from dateutil import parser
 from dateutil import tz
 
+from src.monitoring import metrics
+
 logger = logging.getLogger(__name__)
 
+# Zones written literally in some publishers' dates, strptime leaves them naive
+_LITERAL_ZONES = (
+    (" GMT +5:30", tz.gettz("Asia/Kolkata")),
+    (" GMT", tz.UTC),
+)
+
+# Reasons a feed entry is dropped while parsing
+DROP_REASONS = ("no_date", "invalid_date", "future_date",
+                "missing_title_or_link", "video_link", "error")
+
 
 class FeedParser:
+    # strptime candidates tried when learning the publish date format of a source
+    DATE_FORMATS = (
+        "%a, %d %b %Y %H:%M:%S %z",
+        "%a, %d %b %Y %H:%M:%S GMT",
+        "%a, %d %b %Y %H:%M:%S GMT +5:30",
+        "%a, %d %b %Y %H:%M:%S",
+        "%a, %d %b %Y %H:%M %z",
+        "%d %b %Y %H:%M:%S %z",
+        "%Y-%m-%dT%H:%M:%S%z",
+        "%Y-%m-%dT%H:%M:%S.%f%z",
+        "%Y-%m-%d %H:%M:%S%z",
+        "%Y-%m-%d %H:%M:%S",
+    )
+    # Learned format of each source (None when no candidate matched), per process
+    _date_formats = {}
+    # Slow-path parses of each source without a format since it was last
+    # learned: learning is retried every RELEARN_DATE_FORMAT_AFTER of them
+    _date_format_misses = {}
+    RELEARN_DATE_FORMAT_AFTER = 100
 
     @staticmethod
-    async def fetch_xml(url: str) -> str:
-        """Function to fetch xml data from the given url."""
+    async def fetch_feed(publisher: str, url: str, client, feed_state=None, topic: str = "") -> str | None:
+        """
+        Function to fetch the xml of one feed using the shared http client.
+        Returns None when the fetch failed, or when the feed answered 304 Not
+        Modified or its body hashes the same as on the previous fetch.
+        """
         try:
-            async with aiohttp.ClientSession(headers={"User-Agent": "Mozilla/5.0"}) as session:
-                async with session.get(url) as response:
-                    return await response.text()
+            headers = feed_state.request_headers(url) if feed_state else None
+            start = time.perf_counter()
+            response = await client.fetch(url, headers)
+            metrics.record_fetch(topic, publisher, time.perf_counter() - start,
+                                 response['status'] if response else "error",
+                                 response['size'] if response else 0)
+            if response is None or response['status'] >= 400:
+                logger.warning(
+                    f"Skipping {publisher} feed due to fetch failure")
+                return None
+            xml = response['xml']
+            if feed_state is None:
+                return xml
+            content_hash = feed_state.hash_content(
+                xml) if xml is not None else None
+            unchanged = xml is not None and feed_state.is_unchanged(
+                url, content_hash)
+            feed_state.update(url, response['status'], response['etag'],
+                              response['last_modified'], content_hash)
+            if xml is None:
+                logger.debug(f"Skipping {publisher} feed - not modified")
+                return None
+            if unchanged:
+                logger.debug(f"Skipping {publisher} feed - content unchanged")
+                return None
+            return xml
         except Exception as e:
-            logger.error(f"Error in Fetching xml of url:{url}, error: {e}")
+            logger.error(f"Error in Fetching XML Feed of {publisher}: {e}")
+            return None
 
     @staticmethod
-    async def fetch_topics_feed(topic: dict) -> dict:
-        """Function to fetch xml feeds for given topic."""
+    async def fetch_topics_feed(topic: dict, client, feed_state=None) -> dict:
+        """Function to fetch xml feeds for given topic, leaving out skipped feeds."""
         try:
             tasks = []
             for publisher, url in topic.items():
-                tasks.append(FeedParser.fetch_xml(url))
+                tasks.append(FeedParser.fetch_feed(
+                    publisher, url, client, feed_state))
             result = await asyncio.gather(*tasks)
-            data = {}
-            for publisher, xml in zip(topic.keys(), result):
-                # Only include feeds that were successfully fetched
-                if xml is not None:
-                    data[publisher] = xml
-                else:
-                    logger.warning(
-                        f"Skipping {publisher} feed due to fetch failure")
-            return data
+            return {publisher: xml for publisher, xml in zip(topic, result)
+                    if xml is not None}
         except Exception as e:
             logger.error(f"Error in Fetching XML Feed of {topic}: {e}")
             return {}  # Return empty dict instead of None on error
@@ -80,16 +133,21 @@ class FeedParser:
             return None
 
     @staticmethod
-    def add_embeddings(articles: list, model, device: str) -> list:
+    def add_embeddings(articles: list, model, device: str, store=None) -> list:
         """
         Attach embeddings to each article in-place using the provided model.
+        Titles found in the embedding store (if given) are not encoded again.
         Returns the articles list (same objects; mutated to include 'embeddings').
         """
         try:
             if not articles:
                 return []
             titles = [item.get('title', '') for item in articles]
-            embeddings = model.encode(titles, device=device)
+            if store is not None:
+                embeddings = store.embed(
+                    titles, lambda missing: model.encode(missing, device=device))
+            else:
+                embeddings = model.encode(titles, device=device)
             for i, item in enumerate(articles):
                 try:
                     item['embeddings'] = embeddings[i]
@@ -163,6 +221,61 @@ class FeedParser:
                 dt_str}")
             return None
 
+    @staticmethod
+    def _strptime(dt_str: str, fmt: str) -> datetime:
+        """strptime that also attaches the zone of formats ending in a literal zone name."""
+        parsed = datetime.strptime(dt_str, fmt)
+        if parsed.tzinfo is None:
+            for suffix, zone in _LITERAL_ZONES:
+                if fmt.endswith(suffix):
+                    return parsed.replace(tzinfo=zone)
+        return parsed
+
+    @staticmethod
+    def learn_date_format(dt_str: str, expected: datetime) -> str | None:
+        """Return the first candidate format parsing dt_str to exactly the expected datetime."""
+        for fmt in FeedParser.DATE_FORMATS:
+            try:
+                parsed = FeedParser._strptime(dt_str, fmt)
+            except ValueError:
+                continue
+            if parsed == expected and (parsed.tzinfo is None) == (expected.tzinfo is None):
+                return fmt
+        return None
+
+    @staticmethod
+    def parse_published(source: str, dt_str: str):
+        """
+        Parse the publish date of an entry.
+        Every publisher uses one stable date format, so the strptime format
+        learned from the source's first entry is tried first. Dates it cannot
+        parse (including ones with invalid time components) go through
+        correct_time_components and dateutil as before. Sources whose dates
+        match no candidate format only try to learn one again every
+        RELEARN_DATE_FORMAT_AFTER entries.
+        """
+        fmt = FeedParser._date_formats.get(source)
+        if fmt is not None:
+            try:
+                return FeedParser._strptime(dt_str, fmt)
+            except ValueError:
+                pass
+
+        corrected_str = FeedParser.correct_time_components(dt_str)
+        published_time = FeedParser.handle_time_str(corrected_str)
+        if published_time is not None:
+            if source in FeedParser._date_formats and FeedParser._date_formats[source] is None:
+                misses = FeedParser._date_format_misses.get(source, 0) + 1
+                if misses < FeedParser.RELEARN_DATE_FORMAT_AFTER:
+                    FeedParser._date_format_misses[source] = misses
+                    return published_time
+                FeedParser._date_format_misses.pop(source, None)
+            learned = FeedParser.learn_date_format(dt_str, published_time)
+            # Keep a working format when a single odd date does not match any
+            if learned is not None or source not in FeedParser._date_formats:
+                FeedParser._date_formats[source] = learned
+        return published_time
+
     @staticmethod
     def normalize_url(url):
         """Remove #fragment from URL."""
@@ -236,74 +349,12 @@ class FeedParser:
         """
         try:
             result = []
-            ist = pytz.timezone('Asia/Kolkata')
-
-            # Parse and collect metadata with time conversion
             for publisher, xml in pub_xml.items():
                 if xml is None:  # Skip if XML is None
                     logger.warning(f"Skipping {publisher} feed - XML is None")
                     continue
-
-                feed = feedparser.parse(xml)
-                for entry in feed.entries:
-                    try:
-                        # Process published time
-                        published_str = entry.get('published')
-                        if not published_str:
-                            logger.debug(
-                                f"Skipping entry from {publisher} - no publish date")
-                            continue
-
-                        corrected_str = FeedParser.correct_time_components(
-                            published_str)
-                        published_time = FeedParser.handle_time_str(
-                            corrected_str)
-
-                        # If published date is None skip entry
-                        if published_time is None:
-                            continue
-                        elif published_time > datetime.now(pytz.utc):
-                            logger.debug(
-                                f"Skipping entry from {publisher} - future publish date")
-                            continue
-
-                        # Convert to IST
-                        if published_time.tzinfo is None:  # Handle naive datetime
-                            published_time = pytz.utc.localize(published_time)
-                        published_time = published_time.astimezone(ist)
-
-                        # Check for title and link
-                        title = entry.get('title')
-                        url = entry.get('link')
-                        if not title or not url:
-                            logger.debug(
-                                f"Skipping entry from {publisher} - missing title or link")
-                            continue
-
-                        url = FeedParser.normalize_url(url)
-                        url = FeedParser.filter_video_links(url)
-                        if not url:
-                            logger.debug(
-                                f"Skipping entry from {publisher} - filtered video link")
-                            continue
-
-                        # Check if URL is valid
-                        if not url:
-                            continue
-
-                        metadata = {
-                            'title': title,
-                            'link': url,
-                            'published': published_time,
-                            'image': FeedParser.extract_image_link(entry),
-                            'source': publisher,
-                            'topic': topic
-                        }
-                        result.append(metadata)
-                    except Exception as e:
-                        logger.warning(
-                            f"Error processing entry from {publisher}: {e}")
-                        continue  # Skip problematic entries
+                articles, _ = FeedParser.parse_entries(topic, publisher, xml)
+                result.extend(articles)
 
             logger.debug(
                 f"{topic}'s Feed Parsed Successfully!, Total Articles:{len(result)}")
@@ -311,3 +362,81 @@ class FeedParser:
         except Exception as e:
             logger.error(f"Error in Parsing Feed: {e}")
             return []  # Return empty list instead of None on error
+
+    @staticmethod
+    def parse_entries(topic: str, publisher: str, xml: str) -> tuple[list, dict]:
+        """
+        Parse the entries of one publisher's feed.
+        Args:
+            topic: Topic of article
+            publisher: Publisher of the feed
+            xml: XML data of the feed
+        Return:
+            tuple: List of Articles, and number of dropped entries per reason
+        """
+        result = []
+        dropped = dict.fromkeys(DROP_REASONS, 0)
+        ist = pytz.timezone('Asia/Kolkata')
+
+        # Parse and collect metadata with time conversion
+        feed = feedparser.parse(xml)
+        for entry in feed.entries:
+            try:
+                # Process published time
+                published_str = entry.get('published')
+                if not published_str:
+                    logger.debug(
+                        f"Skipping entry from {publisher} - no publish date")
+                    dropped['no_date'] += 1
+                    continue
+
+                published_time = FeedParser.parse_published(
+                    publisher, published_str)
+
+                # If published date is None skip entry
+                if published_time is None:
+                    dropped['invalid_date'] += 1
+                    continue
+                elif published_time > datetime.now(pytz.utc):
+                    logger.debug(
+                        f"Skipping entry from {publisher} - future publish date")
+                    dropped['future_date'] += 1
+                    continue
+
+                # Convert to IST
+                if published_time.tzinfo is None:  # Handle naive datetime
+                    published_time = pytz.utc.localize(published_time)
+                published_time = published_time.astimezone(ist)
+
+                # Check for title and link
+                title = entry.get('title')
+                url = entry.get('link')
+                if not title or not url:
+                    logger.debug(
+                        f"Skipping entry from {publisher} - missing title or link")
+                    dropped['missing_title_or_link'] += 1
+                    continue
+
+                url = FeedParser.normalize_url(url)
+                url = FeedParser.filter_video_links(url)
+                if not url:
+                    logger.debug(
+                        f"Skipping entry from {publisher} - filtered video link")
+                    dropped['video_link'] += 1
+                    continue
+
+                metadata = {
+                    'title': title,
+                    'link': url,
+                    'published': published_time,
+                    'image': FeedParser.extract_image_link(entry),
+                    'source': publisher,
+                    'topic': topic
+                }
+                result.append(metadata)
+            except Exception as e:
+                logger.warning(
+                    f"Error processing entry from {publisher}: {e}")
+                dropped['error'] += 1
+                continue  # Skip problematic entries
+        return result, dropped
@@ -0,0 +1,90 @@
+"""
+feed_state.py
+This module keeps the conditional GET validators (ETag, Last-Modified and
+content hash) of every feed, so unchanged feeds can be skipped on refresh.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from src.database.operations import load_feed_states, save_feed_states
+
+logger = logging.getLogger(__name__)
+
+
+class FeedStateStore:
+    """
+    In-memory view of the `feed_state` table.
+
+    Updates made during a refresh are staged and only applied (and persisted)
+    by `save`, which should be called once the fetched articles are stored.
+    This way a failed insert does not mark a feed as already seen.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._pending = {}
+
+    def load(self):
+        """Load the persisted validators from the database."""
+        self._states = load_feed_states()
+        self._pending = {}
+        logger.info(f"Loaded validators of {len(self._states)} feeds")
+
+    @staticmethod
+    def hash_content(xml: str) -> str:
+        """Return the sha256 hex digest of a feed body."""
+        return hashlib.sha256(xml.encode("utf-8")).hexdigest()
+
+    def request_headers(self, url: str) -> dict:
+        """Build If-None-Match / If-Modified-Since headers for the given feed."""
+        state = self._states.get(url)
+        if not state:
+            return {}
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def is_unchanged(self, url: str, content_hash: str) -> bool:
+        """Check whether the feed body is identical to the last stored one."""
+        state = self._states.get(url)
+        return bool(state) and state.get("content_hash") == content_hash
+
+    def update(self, url: str, status: int, etag: str = None, last_modified: str = None, content_hash: str = None):
+        """
+        Stage the outcome of a fetch. Validators missing from a 304 response
+        are carried over from the previous state.
+        """
+        previous = self._states.get(url, {})
+        self._pending[url] = {
+            "etag": etag or previous.get("etag"),
+            "last_modified": last_modified or previous.get("last_modified"),
+            "content_hash": content_hash or previous.get("content_hash"),
+            "last_status": status,
+            "last_fetched": datetime.now(timezone.utc),
+        }
+
+    def fetched(self, url: str) -> bool:
+        """Check whether the feed was fetched successfully during this refresh."""
+        return url in self._pending
+
+    def discard(self, url: str = None):
+        """Drop staged updates (e.g. when a refresh fails), or only those of the given feed."""
+        if url is None:
+            self._pending = {}
+        else:
+            self._pending.pop(url, None)
+
+    def save(self) -> bool:
+        """Apply staged updates and persist them to the database."""
+        if not self._pending:
+            return True
+        if not save_feed_states(self._pending):
+            return False
+        self._states.update(self._pending)
+        self._pending = {}
+        return True
@@ -5,60 +5,351 @@ This module fetches and parses RSS feeds for the aggregator.
 
 import asyncio
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
 
+from .deduplicator import Deduplicator
+from .embedding_pool import EMBED_WORKERS, open_pool
+from .embedding_store import open_store
+from .feed_archive import FeedArchiveStore
+from .feed_health import FeedHealth
 from .feed_parser import FeedParser
+from .feed_state import FeedStateStore
+from .http_client import FeedHttpClient
+from .known_articles import KnownArticleIndex
+from src.database.operations import insert_articles
+from src.monitoring import metrics
 
 logger = logging.getLogger(__name__)
 
+# Number of processes parsing feeds, 0 parses in the calling process
+# (the default on single core hosts, where a pool only adds overhead)
+_CPU_COUNT = os.cpu_count() or 1
+PARSE_WORKERS = int(os.getenv("FEED_PARSE_WORKERS",
+                              _CPU_COUNT if _CPU_COUNT > 1 else 0))
+
+# Ingestion pipeline: fetch -> parse -> embed (micro-batches) -> upsert.
+# Stages are joined by bounded queues, so a slow stage holds back the ones
+# before it and memory stays bounded by the queue sizes.
+FETCH_CONCURRENCY = 16
+PARSE_QUEUE_SIZE = 8
+EMBED_BATCH_SIZE = 64
+# Seconds to wait for a micro-batch to fill up before embedding it
+EMBED_BATCH_WAIT = 0.5
+EMBED_QUEUE_SIZE = EMBED_BATCH_SIZE * 4
+UPSERT_QUEUE_SIZE = 2
+
 
 class Feeds:
-    def __init__(self, sbert):
-        self._articles = None
+    def __init__(self, sbert, embed_workers: int = EMBED_WORKERS):
         self.model = sbert.model
+        self.model_name = sbert.get_model_name()
         self.device = sbert.device
+        # Articles are embedded by worker processes, if any, not by the
+        # model the API process encodes search queries with
+        self.embedding_pool = open_pool(sbert, embed_workers)
+        self.embedding_store = open_store(sbert.get_model_version())
+        self.feed_state = FeedStateStore()
+        self.health = FeedHealth()
+        self.archive = FeedArchiveStore()
+        self.http_client = FeedHttpClient()
+        self.known_articles = KnownArticleIndex()
+        self.stories = Deduplicator()
+        self._parse_pool = None
+        self._poll_report = {}
+
+    def load_state(self):
+        """
+        Load feed validators and health, known articles and the story index
+        from the database, and compact the title embedding store.
+        Called whenever this process becomes the ingestion leader, as the
+        previous leader may have stored articles since.
+        """
+        self.feed_state.load()
+        self.health.load()
+        self.known_articles.load()
+        self.stories.load()
+        if self.embedding_store is not None:
+            try:
+                self.embedding_store.compact()
+            except Exception as e:
+                logger.error(f"Error compacting the embedding store: {e}")
+
+    def get_poll_report(self) -> dict:
+        """New articles found per feed url in the last refresh (None for failed fetches)."""
+        return self._poll_report
 
-    def get_articles(self):
-        return self._articles
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        if self._parse_pool is None:
+            # spawn: forking a process that holds torch and running threads is unsafe
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"))
+        return self._parse_pool
 
-    def set_articles(self, articles: dict):
-        self._articles = articles
+    async def parse_feed(self, topic: str, publisher: str, xml: str) -> list | None:
+        """
+        Parse one fetched feed in the process pool (or a thread without one).
+        Returns None if the feed could not be parsed or has no entries at all.
+        """
+        start = time.perf_counter()
+        try:
+            if PARSE_WORKERS <= 0:
+                articles, dropped = await asyncio.to_thread(
+                    FeedParser.parse_entries, topic, publisher, xml)
+            else:
+                loop = asyncio.get_running_loop()
+                articles, dropped = await loop.run_in_executor(
+                    self._get_parse_pool(), FeedParser.parse_entries, topic, publisher, xml)
+        except BrokenProcessPool:
+            # A worker died, start a fresh pool for the next feed
+            logger.error(f"Parser process died while parsing {publisher} feed")
+            self._parse_pool = None
+            return None
+        except Exception as e:
+            logger.error(f"Error in Parsing Feed of {publisher}: {e}")
+            return None
+        metrics.record_parse(topic, publisher, time.perf_counter() - start,
+                             len(articles), dropped)
+        if not articles and not any(dropped.values()):
+            logger.warning(f"No entries in {publisher} feed of {topic}")
+            return None
+        return articles
 
     async def fetch_articles(self, feeds: dict) -> dict:
         """
-        Fetch and Parse RSS Feeds
+        Fetch, parse, embed and store RSS feeds as a streaming pipeline.
+        Articles of each micro-batch are upserted as soon as they are embedded.
 
         Args:
             feeds: Rss Feeds in form of a dictionary
-            device: Device to run model on (CPU/GPU)
         Returns:
-            data: Articles Topicwise in a dict format
+            dict: Counts of parsed, new and stored articles and of failed batches
         """
+        self.feed_state.discard()
+        self.archive.discard()
+        self._poll_report = {url: None for publishers in feeds.values()
+                             for url in publishers.values()}
+        feed_queue = asyncio.Queue()
+        for topic, publishers in feeds.items():
+            for publisher, url in publishers.items():
+                feed_queue.put_nowait((topic, publisher, url))
+
+        async def fetch(put):
+            while not feed_queue.empty():
+                topic, publisher, url = feed_queue.get_nowait()
+                xml = await FeedParser.fetch_feed(
+                    publisher, url, self.http_client, self.feed_state, topic)
+                if not self.feed_state.fetched(url):
+                    self.health.record_failure(
+                        url, self.http_client.errors.get(url, "Fetch failed"))
+                    continue
+                self._poll_report[url] = 0
+                if xml is None:
+                    # Not modified
+                    self.health.record_success(url)
+                else:
+                    self.archive.add(topic, publisher, url, xml)
+                    await put((topic, publisher, url, xml))
+
         try:
-            rss_feeds = feeds
-            results = []
-            for topic in rss_feeds:
-                results.append(FeedParser.fetch_topics_feed(rss_feeds[topic]))
-            # Get XML Data For Each Topic in list
-            responses = await asyncio.gather(*results)
-            # Parse Feeds and append them all in list
-            articles = []
-            for topic, xml_data in zip(rss_feeds, responses):
-                articles.extend(FeedParser.parse_feed(
-                    topic, xml_data))
-            logger.debug(f"Fetched {len(articles)} Articles")
-            # Deduplicate Articles
-            logger.debug("Deduplicating Articles")
-            # Attach embeddings to articles (mutates list)
-            try:
-                FeedParser.add_embeddings(articles, self.model, self.device)
-            except Exception as e:
-                logger.error(f"Error adding embeddings to articles: {e}")
+            stats = await self._run_pipeline(fetch, FETCH_CONCURRENCY)
+        except BaseException:
+            self.feed_state.discard()
+            self.archive.discard()
+            raise
+        finally:
+            self.health.save()
 
-            # Simple deduplication (by link, then by (title, source))
-            result = FeedParser.simple_deduplicate(articles)
-            return result
-        except Exception as e:
-            logger.error(f"Error in Fetching Feeds: {e}")
+        await asyncio.to_thread(self.archive.save)
+        # Persist feed validators only once all their articles are stored
+        if stats['failed_batches'] == 0:
+            self.feed_state.save()
+        else:
+            self.feed_state.discard()
+        return stats
+
+    async def reingest_archive(self, since: datetime, until: datetime = None, topic: str = None, publisher: str = None) -> dict:
+        """
+        Parse archived feed bodies again (e.g. after a parser fix) and
+        overwrite the stored articles, without downloading anything.
+
+        Args:
+            since: Oldest fetch time of the bodies to replay
+            until: Latest fetch time of the bodies to replay
+            topic: Only replay the feeds of this topic
+            publisher: Only replay the feeds of this publisher
+        Returns:
+            dict: Counts of parsed, new and stored articles and of failed batches
+        """
+        # Newest bodies first: the pipeline keeps the first version of a link
+        entries = await asyncio.to_thread(
+            self.archive.list, since, until, topic, publisher)
+        logger.info(f"Re-ingesting {len(entries)} archived feed bodies")
+
+        async def replay(put):
+            for entry in entries:
+                xml = await asyncio.to_thread(self.archive.load_body, entry['id'])
+                if xml is not None:
+                    await put((entry['topic'], entry['publisher'], entry['url'], xml))
+
+        return await self._run_pipeline(replay, 1, live=False, overwrite=True)
+
+    async def _run_pipeline(self, produce, n_producers: int, live: bool = True, overwrite: bool = False) -> dict:
+        """
+        Parse, embed and store the feed bodies put by the producers.
+
+        Args:
+            produce: Coroutine function putting (topic, publisher, url, xml) items with the put it is given
+            n_producers: Number of concurrent producers
+            live: Bodies were just fetched, so feed health and the poll report are updated
+            overwrite: Overwrite stored articles even if their published date did not change
+        Returns:
+            dict: Counts of parsed, new and stored articles and of failed batches
+        """
+        stats = {'parsed': 0, 'new': 0, 'stored': 0, 'failed_batches': 0}
+        # Latest published date of every link sent downstream in this run
+        seen = {}
+        # and of every (title, source): one publisher's topic feeds share
+        # stories under different links
+        seen_titles = {}
+
+        xml_queue = asyncio.Queue(maxsize=PARSE_QUEUE_SIZE)
+        article_queue = asyncio.Queue(maxsize=EMBED_QUEUE_SIZE)
+        batch_queue = asyncio.Queue(maxsize=UPSERT_QUEUE_SIZE)
+        n_parsers = max(PARSE_WORKERS, 1)
+        remaining = {'produce': n_producers, 'parse': n_parsers}
+
+        # A failing stage fails the whole run (gather cancels the others),
+        # so end-of-stream sentinels are only sent on the normal path
+        async def produce_stage():
+            await produce(xml_queue.put)
+            # The last producer tells every parser to stop
+            remaining['produce'] -= 1
+            if remaining['produce'] == 0:
+                for _ in range(n_parsers):
+                    await xml_queue.put(None)
+
+        async def parse_stage():
+            while True:
+                item = await xml_queue.get()
+                if item is None:
+                    break
+                topic, publisher, url, xml = item
+                articles = await self.parse_feed(topic, publisher, xml)
+                if articles is None:
+                    if live:
+                        # Do not remember the validators of a body without entries,
+                        # so it is not skipped as unchanged on the next poll
+                        self.feed_state.discard(url)
+                        self.health.record_failure(url, "No feed entries")
+                    continue
+                if live:
+                    self.health.record_success(url)
+                stats['parsed'] += len(articles)
+                for art in articles:
+                    # Only new articles, or ones whose title or date changed, need work
+                    previous = seen.get(art['link'])
+                    if previous is not None and previous >= art['published']:
+                        continue
+                    title_key = (art['title'], art['source'])
+                    previous = seen_titles.get(title_key)
+                    if previous is not None and previous >= art['published']:
+                        continue
+                    if not overwrite and self.known_articles.is_known(art):
+                        continue
+                    seen[art['link']] = art['published']
+                    seen_titles[title_key] = art['published']
+                    if live:
+                        self._poll_report[url] += 1
+                    stats['new'] += 1
+                    await article_queue.put(art)
+            remaining['parse'] -= 1
+            if remaining['parse'] == 0:
+                await article_queue.put(None)
+
+        async def embed_stage():
+            loop = asyncio.get_running_loop()
+            done = False
+            while not done:
+                art = await article_queue.get()
+                if art is None:
+                    break
+                batch = [art]
+                deadline = loop.time() + EMBED_BATCH_WAIT
+                while len(batch) < EMBED_BATCH_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        art = await asyncio.wait_for(article_queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if art is None:
+                        done = True
+                        break
+                    batch.append(art)
+                # Simple deduplication (by link, then by (title, source))
+                batch = FeedParser.simple_deduplicate(batch)
+                metrics.EMBED_BATCH_SIZE.observe(len(batch))
+                with metrics.STAGE_SECONDS.labels("embed").time():
+                    await asyncio.to_thread(
+                        FeedParser.add_embeddings, batch, self.embedding_pool or self.model,
+                        self.device, self.embedding_store)
+                for art in batch:
+                    art['embedding_model'] = self.model_name
+                # Cluster into stories in order, so the index sees every batch
+                added = self.stories.assign(batch)
+                await batch_queue.put((batch, added))
+            await batch_queue.put(None)
+
+        async def upsert_stage():
+            while True:
+                item = await batch_queue.get()
+                if item is None:
+                    break
+                batch, added = item
+                try:
+                    with metrics.STAGE_SECONDS.labels("upsert").time():
+                        stored = await asyncio.to_thread(insert_articles, batch, overwrite)
+                except Exception as e:
+                    logger.error(f"Error storing articles batch: {e}")
+                    stored = False
+                if stored:
+                    self.known_articles.update(batch)
+                    stats['stored'] += len(batch)
+                    metrics.UPSERT_ROWS.labels("stored").inc(len(batch))
+                else:
+                    # Later articles must not join stories that were not stored
+                    self.stories.forget(added)
+                    stats['failed_batches'] += 1
+                    metrics.UPSERT_ROWS.labels("failed").inc(len(batch))
+
+        tasks = [asyncio.create_task(produce_stage())
+                 for _ in range(n_producers)]
+        tasks += [asyncio.create_task(parse_stage()) for _ in range(n_parsers)]
+        tasks += [asyncio.create_task(embed_stage()),
+                  asyncio.create_task(upsert_stage())]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return stats
+
+    async def close(self):
+        """Release the pooled http connections, the parser and the embedding processes."""
+        await self.http_client.close()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        if self.embedding_pool is not None:
+            await asyncio.to_thread(self.embedding_pool.close)
 
     async def refresh_articles(self, feeds: dict) -> dict:
         """
@@ -66,11 +357,14 @@ class Feeds:
 
         Args:
             feeds: Rss Feeds in form of a dictionary
-            device: Device to run model on (CPU/GPU) 
+        Returns:
+            dict: Pipeline counts, or None if the refresh failed
         """
         try:
-            articles = await self.fetch_articles(feeds)
-            self.set_articles(articles)
-            logger.debug("Saved New Articles")
+            with metrics.REFRESH_SECONDS.time():
+                stats = await self.fetch_articles(feeds)
+            metrics.LAST_REFRESH.set_to_current_time()
+            logger.debug(f"Refresh stats: {stats}")
+            return stats
         except Exception as e:
             logger.error(f"Error in Refreshing Articles: {e}")
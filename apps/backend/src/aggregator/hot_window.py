@@ -0,0 +1,221 @@
+"""
+hot_window.py
+This module keeps the embeddings of the recent articles in memory, so the
+vector candidates of a search are one matrix-vector product instead of a
+vector index scan: with the recency weight of the ranking, nearly every
+result is a recent article.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import LargeBinary, func, select, text
+
+from src.database.session import context_db
+from src.database.models import Articles, EMBEDDING_DIM
+from src.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+# Days of articles kept in memory, 0 to disable the window (every search
+# then takes its vector candidates from the index). Each article takes
+# EMBEDDING_DIM * 4 bytes in every API process, and a search scans them all
+# (about 5 ms per 20k articles of 384 dimensions on one core).
+HOT_WINDOW_DAYS = float(os.getenv("HOT_WINDOW_DAYS", 14))
+# Seconds between full reloads, which pick up the articles updated in place
+# (upserts, re-embedding) and drop those that left the window
+HOT_WINDOW_RELOAD_SECONDS = int(os.getenv("HOT_WINDOW_RELOAD_SECONDS", 3600))
+# Seconds before a failed load is retried
+_RETRY_SECONDS = 60
+# Rows read at a time
+_CHUNK_ROWS = 16384
+
+
+def _grow(array: np.ndarray, count: int, capacity: int) -> np.ndarray:
+    """Copy of the first count rows of an array, with room for capacity rows."""
+    grown = np.empty((capacity,) + array.shape[1:], array.dtype)
+    grown[:count] = array[:count]
+    return grown
+
+
+class _Window(NamedTuple):
+    """
+    The loaded window. Rows [0, count) of the arrays are valid; appends fill
+    the spare capacity and publish a new _Window, so a reader's rows never
+    change under it.
+    """
+    model_name: str
+    ids: np.ndarray
+    published: np.ndarray
+    vectors: np.ndarray
+    count: int
+    max_id: int
+    generation: int
+    loaded_at: float
+
+
+class HotWindow:
+    """
+    Embeddings (normalized, one row per article), ids and publication times
+    (epoch seconds) of the articles of the last `days` days embedded by one
+    model, read from the database by a full load, then by the ids stored
+    since at each new ingestion generation.
+    """
+
+    def __init__(self, days: float = HOT_WINDOW_DAYS, reload_seconds: int = HOT_WINDOW_RELOAD_SECONDS):
+        self.days = days
+        self.reload_seconds = reload_seconds
+        self._window = None
+        # Serializes loads and updates
+        self._lock = threading.Lock()
+        self._loading = None
+        self._failed_at = -_RETRY_SECONDS
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    def __len__(self):
+        window = self._window
+        return window.count if window is not None else 0
+
+    def _cutoff(self) -> float:
+        return (datetime.now(timezone.utc) - timedelta(days=self.days)).timestamp()
+
+    def _read(self, db, model_name: str, after_id: int, ids, published, vectors, count: int) -> tuple:
+        """
+        Read the window's articles with an id above after_id into the arrays
+        from row count, growing them as needed. Returns the arrays and count.
+        """
+        # The binary form of the vectors (dimensions and a reserved field as
+        # two int16, then big-endian float32) is decoded an order of
+        # magnitude faster than their text
+        stmt = (select(Articles.id, Articles.published_date,
+                       func.vector_send(Articles.embeddings, type_=LargeBinary).label("embeddings"))
+                .where(Articles.published_date >= datetime.fromtimestamp(self._cutoff(), timezone.utc),
+                       Articles.embedding_model == model_name,
+                       Articles.id > after_id)
+                .order_by(Articles.id)
+                .execution_options(yield_per=_CHUNK_ROWS))
+        for rows in db.execute(stmt).partitions():
+            if count + len(rows) > len(ids):
+                capacity = max(2 * len(ids), count + len(rows))
+                ids, published, vectors = (_grow(array, count, capacity)
+                                           for array in (ids, published, vectors))
+            chunk = (np.frombuffer(b"".join(row.embeddings for row in rows), dtype=">f4")
+                     .reshape(len(rows), -1)[:, 1:].astype(np.float32))
+            norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+            vectors[count:count + len(rows)] = chunk / np.where(norms > 0, norms, 1)
+            ids[count:count + len(rows)] = [row.id for row in rows]
+            published[count:count + len(rows)] = [row.published_date.timestamp() for row in rows]
+            count += len(rows)
+        return ids, published, vectors, count
+
+    def load(self, model_name: str, generation: int = None):
+        """(Re)load the whole window from the database."""
+        with self._lock:
+            start = time.perf_counter()
+            with context_db() as db:
+                # Read after the generation, so no batch it counts is missed
+                generation = generation if generation is not None else _ingest_generation(db)
+                ids, published, vectors, count = self._read(
+                    db, model_name, 0, np.empty(0, np.int64), np.empty(0, np.float64),
+                    np.empty((0, EMBEDDING_DIM), np.float32), 0)
+            self._publish(_Window(model_name, ids, published, vectors, count,
+                                  int(ids[:count].max()) if count else 0, generation, time.monotonic()))
+            logger.info(f"Loaded {count} articles of the last {self.days:g} days "
+                        f"({vectors.nbytes / 2**20:.0f} MiB) in {time.perf_counter() - start:.1f}s")
+
+    def update(self, generation: int):
+        """Append the articles stored since the window was read, once per ingestion generation."""
+        # A running load reads them anyway: searches do not wait for it
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            window = self._window
+            if window is None or window.generation == generation:
+                return
+            with context_db() as db:
+                ids, published, vectors, count = self._read(
+                    db, window.model_name, window.max_id,
+                    window.ids, window.published, window.vectors, window.count)
+            self._publish(window._replace(
+                ids=ids, published=published, vectors=vectors, count=count,
+                max_id=int(ids[window.count:count].max()) if count > window.count else window.max_id,
+                generation=generation))
+            if count > window.count:
+                logger.debug(f"Added {count - window.count} articles to the hot window")
+        finally:
+            self._lock.release()
+
+    def _publish(self, window: _Window):
+        self._window = window
+        metrics.HOT_WINDOW_ARTICLES.set(window.count)
+
+    def load_in_background(self, model_name: str):
+        """Start a full load, unless one is running or failed less than _RETRY_SECONDS ago."""
+        if self._loading is not None and self._loading.is_alive():
+            return
+        if time.monotonic() - self._failed_at < _RETRY_SECONDS:
+            return
+
+        def load():
+            try:
+                self.load(model_name)
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                logger.error(f"Error loading the hot window: {e}")
+
+        self._loading = threading.Thread(target=load, name="load-hot-window", daemon=True)
+        self._loading.start()
+
+    def _nearest(self, window: _Window, query_embedding, k: int) -> np.ndarray:
+        """Ids of the k rows of the window most similar to the query, among those still in it."""
+        # The query's norm scales every similarity alike
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarity = window.vectors[:window.count] @ query
+        similarity[window.published[:window.count] < self._cutoff()] = -np.inf
+        if k < len(similarity):
+            top = np.argpartition(-similarity, k)[:k]
+        else:
+            top = np.arange(len(similarity))
+        top = top[np.isfinite(similarity[top])]
+        return window.ids[top]
+
+    async def nearest(self, query_embedding, k: int, model_name: str, generation: int = None) -> list | None:
+        """
+        Ids of the k articles of the window nearest to the query embedding,
+        after adding the articles of a new ingestion generation, if given.
+        None while the window of the model is not loaded (it starts loading):
+        the caller then falls back to the vector index.
+        """
+        if not self.enabled:
+            return None
+        window = self._window
+        if (window is None or window.model_name != model_name
+                or time.monotonic() - window.loaded_at > self.reload_seconds):
+            self.load_in_background(model_name)
+            if window is None or window.model_name != model_name:
+                return None
+        elif generation is not None and generation != window.generation:
+            try:
+                await asyncio.to_thread(self.update, generation)
+                window = self._window
+            except Exception as e:
+                # Serve the window as it is; the next search retries
+                logger.error(f"Error updating the hot window: {e}")
+        # BLAS releases the GIL: score off the event loop
+        ids = await asyncio.to_thread(self._nearest, window, query_embedding, k)
+        return ids.tolist()
+
+
+def _ingest_generation(db) -> int:
+    # Sync twin of src.database.queries.get_ingest_generation
+    return db.execute(text(
+        "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM ingest_generation")).scalar_one()
@@ -0,0 +1,125 @@
+"""
+http_client.py
+This module contains the pooled HTTP client used to fetch RSS feeds.
+"""
+
+import logging
+
+import aiohttp
+
+try:
+    import brotli  # noqa: F401 - lets aiohttp decode "br" responses
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 32
+MAX_CONNECTIONS_PER_HOST = 4
+DNS_CACHE_TTL = 60 * 10
+KEEPALIVE_TIMEOUT = 60
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+TOTAL_TIMEOUT = 30
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+_CHUNK_SIZE = 64 * 1024
+
+
+class FeedHttpClient:
+    """
+    Long-lived aiohttp session shared by every feed fetch.
+
+    Connections are kept alive and DNS lookups cached across refresh cycles,
+    connections per publisher host are capped, and each fetch has connect,
+    read and total deadlines so a single hung publisher cannot stall a refresh.
+    The session is bound to the event loop it is first used on.
+    The reason of the last failed fetch of every url is kept in `errors`.
+    """
+
+    def __init__(self):
+        self._session = None
+        self.errors = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=MAX_CONNECTIONS,
+                limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=TOTAL_TIMEOUT,
+                sock_connect=CONNECT_TIMEOUT,
+                sock_read=READ_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"User-Agent": "Mozilla/5.0",
+                         "Accept-Encoding": ACCEPT_ENCODING},
+            )
+        return self._session
+
+    async def fetch(self, url: str, headers: dict = None) -> dict:
+        """
+        Fetch a feed.
+        Args:
+            url: Feed url
+            headers: Extra request headers (e.g. conditional GET validators)
+        Returns:
+            dict: status, xml (None on 304 and error statuses), etag,
+            last_modified and size in bytes of the response,
+            or None if no response was received.
+        """
+        try:
+            session = self._get_session()
+            async with session.get(url, headers=headers) as response:
+                size = 0
+                if response.status == 304:
+                    xml = None
+                elif response.status >= 400:
+                    logger.error(
+                        f"Error in Fetching xml of url:{url}, status: {response.status}")
+                    self.errors[url] = f"HTTP {response.status}"
+                    xml = None
+                else:
+                    if (response.content_length or 0) > MAX_RESPONSE_BYTES:
+                        logger.error(
+                            f"Skipping xml of url:{url}, response too large ({response.content_length} bytes)")
+                        self.errors[url] = f"Response too large ({response.content_length} bytes)"
+                        return None
+                    body = bytearray()
+                    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+                        body.extend(chunk)
+                        if len(body) > MAX_RESPONSE_BYTES:
+                            logger.error(
+                                f"Skipping xml of url:{url}, response exceeds {MAX_RESPONSE_BYTES} bytes")
+                            self.errors[url] = f"Response exceeds {MAX_RESPONSE_BYTES} bytes"
+                            return None
+                    size = len(body)
+                    encoding = response.charset or "utf-8"
+                    try:
+                        xml = body.decode(encoding, errors="replace")
+                    except LookupError:
+                        xml = body.decode("utf-8", errors="replace")
+                if response.status < 400:
+                    self.errors.pop(url, None)
+                return {
+                    'status': response.status,
+                    'xml': xml,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'size': size,
+                }
+        except Exception as e:
+            logger.error(
+                f"Error in Fetching xml of url:{url}, error: {e!r}")
+            self.errors[url] = repr(e)
+
+    async def close(self):
+        """Close the underlying session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,63 @@
+"""
+known_articles.py
+This module keeps an in-memory index of the articles already stored in the
+database, so refreshes only embed and upsert new or changed articles.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from src.database.operations import load_known_articles
+
+logger = logging.getLogger(__name__)
+
+# RSS feeds only carry recent items, older links need not be remembered
+KNOWN_ARTICLES_WINDOW_DAYS = 14
+
+
+class KnownArticleIndex:
+    """
+    Maps each known link to the hash of its title and its latest published
+    timestamp. An article is considered known (and skipped) when its link is
+    indexed with the same title and it is not newer than the stored one, i.e.
+    when upserting it would be a no-op.
+    """
+
+    def __init__(self, window_days: int = KNOWN_ARTICLES_WINDOW_DAYS):
+        self.window = timedelta(days=window_days)
+        self._index = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def load(self):
+        """Seed the index with the articles published within the window."""
+        since = datetime.now(timezone.utc) - self.window
+        self._index = {}
+        for link, title, published in load_known_articles(since):
+            self._remember(link, title, published.timestamp())
+        logger.info(f"Loaded {len(self._index)} known article links")
+
+    def _remember(self, link: str, title: str, published_ts: float):
+        known = self._index.get(link)
+        if known is not None and known[1] > published_ts:
+            published_ts = known[1]
+        self._index[link] = (hash(title), published_ts)
+
+    def is_known(self, article: dict) -> bool:
+        """Check whether the article is already stored unchanged."""
+        known = self._index.get(article.get('link'))
+        if known is None:
+            return False
+        title_hash, published_ts = known
+        return (title_hash == hash(article.get('title'))
+                and article['published'].timestamp() <= published_ts)
+
+    def update(self, articles: list):
+        """Remember stored articles and forget the ones older than the window."""
+        for art in articles:
+            self._remember(art['link'], art['title'],
+                           art['published'].timestamp())
+        cutoff = (datetime.now(timezone.utc) - self.window).timestamp()
+        self._index = {link: known for link, known in self._index.items()
+                       if known[1] >= cutoff}
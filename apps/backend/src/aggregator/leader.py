@@ -0,0 +1,97 @@
+"""
+leader.py
+This module elects a single ingestion leader among the API worker processes
+using a Postgres advisory lock.
+"""
+
+import logging
+import os
+
+from sqlalchemy import text
+
+from src.database.base import engine
+
+logger = logging.getLogger(__name__)
+
+# Key of the session-level advisory lock held by the ingestion leader
+INGEST_LOCK_KEY = int(os.getenv("INGEST_LOCK_KEY", 7_263_514_880))
+# Seconds between election attempts of followers (the failover delay)
+LEADER_POLL_INTERVAL = 5
+
+
+class LeaderElector:
+    """
+    Leader election through `pg_try_advisory_lock`.
+
+    The leader holds the lock on a dedicated connection. Postgres releases
+    it as soon as that connection closes (process exit or crash), so the
+    next follower to call `elect` takes over.
+
+    Leadership is only checked when `elect` is called, between refreshes:
+    a refresh in progress when the lock is lost still runs to its end, so
+    for a while the old and the new leader may both ingest. Their writes
+    are idempotent upserts.
+    """
+
+    def __init__(self, lock_key: int = INGEST_LOCK_KEY):
+        self.lock_key = lock_key
+        self._conn = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def elect(self) -> bool:
+        """
+        Try to become (or stay) the leader.
+        Returns:
+            bool: True if this process holds the lock.
+        """
+        if self._conn is not None:
+            try:
+                # The lock lives as long as the connection
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"Lost the leader lock connection: {e}")
+                self._close()
+                return False
+
+        conn = None
+        try:
+            conn = engine.connect()
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"),
+                                    {"key": self.lock_key}).scalar()
+            # Do not stay idle in a transaction, the lock is session-level
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error trying to acquire the leader lock: {e}")
+            acquired = False
+        if acquired:
+            self._conn = conn
+        elif conn is not None:
+            conn.close()
+        return bool(acquired)
+
+    def release(self):
+        """Give up leadership."""
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:key)"),
+                               {"key": self.lock_key})
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Error releasing the leader lock: {e}")
+        self._close()
+
+    def _close(self):
+        try:
+            # Invalidate rather than return to the pool, so a lock that may
+            # still be held is dropped along with the connection
+            self._conn.invalidate()
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
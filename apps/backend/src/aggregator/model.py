@@ -4,30 +4,70 @@ This module contains the embedding model for the aggregator.
 """
 
 import logging
+import os
 
 import torch
 from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
+# torch (PyTorch), onnx (ONNX Runtime FP32) or onnx-int8 (ONNX Runtime, int8 quantized)
+SBERT_BACKENDS = ("torch", "onnx", "onnx-int8")
+SBERT_BACKEND = os.getenv("SBERT_BACKEND", "torch")
+SBERT_MODEL = os.getenv("SBERT_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Quantized export shipped in the model repository: model_quint8_avx2.onnx runs
+# on any x86-64 CPU, model_qint8_avx512_vnni.onnx / model_qint8_arm64.onnx are
+# faster where supported
+SBERT_ONNX_INT8_FILE = os.getenv(
+    "SBERT_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+# Intra-op threads of the model in the API process (query encoding), 0 for
+# the library default; ingestion workers use EMBED_WORKER_THREADS
+SBERT_THREADS = int(os.getenv("SBERT_THREADS", 0))
+
 
 class SBERT:
 
-    def __init__(self):
-        self.model_name = "sentence-transformers/all-MiniLM-L6-v2"
+    def __init__(self, backend: str = SBERT_BACKEND, model_name: str = SBERT_MODEL,
+                 threads: int = SBERT_THREADS):
+        if backend not in SBERT_BACKENDS:
+            raise ValueError(
+                f"Unknown SBERT backend {backend!r}, expected one of {SBERT_BACKENDS}")
+        self.model_name = model_name
         self.cache_dir = "./model/SentenceTransformer"
+        self.backend = backend
 
-        self.device = torch.device(
-            "cuda" if torch.cuda.is_available() else "cpu")
-        self.model = SentenceTransformer(
-            self.model_name, cache_folder=self.cache_dir).to(self.device)
+        if backend == "torch":
+            if threads > 0:
+                # Applies to the whole process
+                torch.set_num_threads(threads)
+            self.device = torch.device(
+                "cuda" if torch.cuda.is_available() else "cpu")
+            self.model = SentenceTransformer(
+                self.model_name, cache_folder=self.cache_dir).to(self.device)
+        else:
+            # ONNX Runtime sessions are created for the CPU
+            self.device = torch.device("cpu")
+            file_name = SBERT_ONNX_INT8_FILE if backend == "onnx-int8" else "onnx/model.onnx"
+            model_kwargs = {"file_name": file_name}
+            if threads > 0:
+                import onnxruntime
+                session_options = onnxruntime.SessionOptions()
+                session_options.intra_op_num_threads = threads
+                model_kwargs["session_options"] = session_options
+            self.model = SentenceTransformer(
+                self.model_name, cache_folder=self.cache_dir, backend="onnx",
+                model_kwargs=model_kwargs)
         if str(self.device) == "cuda":
             logger.info("SentenceTransformer is Using GPU")
         else:
-            logger.info("SentenceTransformer is Using CPU")
+            logger.info(f"SentenceTransformer is Using CPU ({backend} backend)")
 
     def get_device(self):
         return self.device
 
     def get_model_name(self):
         return self.model_name
+
+    def get_model_version(self):
+        """Model and backend: vectors of different backends differ slightly."""
+        return f"{self.model_name}@{self.backend}"
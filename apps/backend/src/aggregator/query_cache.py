@@ -0,0 +1,80 @@
+"""
+query_cache.py
+This module caches the embeddings of search queries, so repeated queries
+(popular searches, the agent's augmented queries) skip the model.
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.monitoring import metrics
+
+# Memory used by cached vectors at most
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", 32))
+# Seconds a cached vector is served
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", 60 * 60 * 24))
+# Key, timestamps and container overhead of one entry, on top of the vector
+_ENTRY_OVERHEAD = 200
+
+
+def normalize_query(query: str) -> str:
+    """Cache key of a query, ignoring case and repeated spaces."""
+    return " ".join(query.lower().split())
+
+
+class QueryVectorCache:
+    """
+    LRU cache of query vectors keyed by model and normalized query text,
+    bounded by memory, whose entries expire after a TTL.
+    """
+
+    def __init__(self, max_bytes: int = int(QUERY_CACHE_MAX_MB * 2**20), ttl: float = QUERY_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, model: str, query: str) -> list[float] | None:
+        """Cached vector of a normalized query, None on a miss."""
+        key = (model, query)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] > self.ttl:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            metrics.QUERY_CACHE_REQUESTS.labels("miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        metrics.QUERY_CACHE_REQUESTS.labels("hit").inc()
+        return entry[0].tolist()
+
+    def put(self, model: str, query: str, vector: list[float]):
+        """Cache the vector of a normalized query, evicting the least recently used."""
+        key = (model, query)
+        if key in self._entries:
+            self._remove(key)
+        value = np.asarray(vector, dtype=np.float32)
+        self._entries[key] = (value, time.monotonic())
+        self.bytes += self._size(key, value)
+        while self.bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+        metrics.QUERY_CACHE_BYTES.set(self.bytes)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+        metrics.QUERY_CACHE_BYTES.set(0)
+
+    def _remove(self, key: tuple):
+        value, _ = self._entries.pop(key)
+        self.bytes -= self._size(key, value)
+
+    @staticmethod
+    def _size(key: tuple, value: np.ndarray) -> int:
+        return value.nbytes + len(key[1]) + _ENTRY_OVERHEAD
@@ -0,0 +1,109 @@
+"""
+reembed.py
+This module re-embeds every article with another model, online: vectors are
+written in resumable batches to shadow columns while search and ingestion
+keep using the current ones, then swapped in by an atomic cutover.
+
+Usage (from apps/backend):
+    python -m src.aggregator.reembed --model MODEL [--backend BACKEND]
+        [--batch-size N] [--cutover] [--restart]
+
+Interrupted runs resume where they stopped. Without --cutover the job stops
+once the shadow index is built; run it again with --cutover to swap. After
+the cutover, API replicas pick the new model up when they restart (set
+EMBEDDING_DIM to its dimensions); until then, search ignores vectors of a
+model other than their own.
+"""
+
+import argparse
+import logging
+import time
+
+from .embedding_store import open_store
+from .model import SBERT, SBERT_BACKEND
+from src.database.reembedding import (
+    build_reembedding_index,
+    count_pending_reembedding,
+    cutover_reembedding,
+    load_pending_reembedding,
+    save_reembedded,
+    start_reembedding,
+)
+
+logger = logging.getLogger(__name__)
+
+REEMBED_BATCH_SIZE = 256
+
+
+def encoder(sbert: SBERT):
+    """Function encoding titles with the model, reusing the vectors of its embedding store."""
+    def encode(titles: list):
+        return sbert.model.encode(titles, device=sbert.device)
+    store = open_store(sbert.get_model_version())
+    if store is None:
+        return encode
+    return lambda titles: store.embed(titles, encode)
+
+
+def reembed_pending(sbert: SBERT, batch_size: int = REEMBED_BATCH_SIZE) -> int:
+    """Embed the articles without a shadow vector, returning how many were embedded."""
+    encode = encoder(sbert)
+    done = 0
+    after_id = 0
+    start = time.perf_counter()
+    while True:
+        rows = load_pending_reembedding(after_id, batch_size)
+        if not rows:
+            return done
+        vectors = encode([title for _, title in rows])
+        save_reembedded(sbert.get_model_name(), [
+            (article_id, vector.tolist()) for (article_id, _), vector in zip(rows, vectors)])
+        after_id = rows[-1][0]
+        done += len(rows)
+        if done % (batch_size * 20) < batch_size:
+            logger.info(
+                f"Re-embedded {done} articles ({done / (time.perf_counter() - start):.0f}/s)")
+
+
+def reembed(model_name: str, backend: str = SBERT_BACKEND, batch_size: int = REEMBED_BATCH_SIZE,
+            cutover: bool = False, restart: bool = False):
+    sbert = SBERT(backend, model_name)
+    dimensions = sbert.model.get_sentence_embedding_dimension()
+    migration_id = start_reembedding(model_name, dimensions, restart)
+
+    logger.info(f"{count_pending_reembedding()} articles to re-embed")
+    reembed_pending(sbert, batch_size)
+    build_reembedding_index()
+    # Catch up with the articles written meanwhile, so the cutover is short
+    caught_up = reembed_pending(sbert, batch_size)
+    logger.info(f"Shadow embeddings complete ({caught_up} caught up after the index build)")
+
+    if not cutover:
+        logger.info("Run again with --cutover to switch search to the new embeddings")
+        return
+    encode = encoder(sbert)
+    cutover_reembedding(migration_id, lambda titles: [
+        vector.tolist() for vector in encode(titles)])
+    logger.info(
+        f"Articles now embedded by {model_name}: restart the API with EMBEDDING_DIM={dimensions}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--model", required=True,
+                            help="Sentence-transformers model to re-embed the articles with")
+    arg_parser.add_argument("--backend", default=SBERT_BACKEND,
+                            help="SBERT backend running the model")
+    arg_parser.add_argument("--batch-size", type=int, default=REEMBED_BATCH_SIZE)
+    arg_parser.add_argument("--cutover", action="store_true",
+                            help="Swap the new embeddings in once complete")
+    arg_parser.add_argument("--restart", action="store_true",
+                            help="Drop the re-embedding in progress and start over")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    reembed(args.model, args.backend, args.batch_size, args.cutover, args.restart)
+
+
+if __name__ == "__main__":
+    main()
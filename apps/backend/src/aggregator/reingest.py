@@ -0,0 +1,59 @@
+"""
+reingest.py
+This module re-ingests archived feed bodies, e.g. after a parser fix,
+overwriting the stored articles without fetching the feeds again.
+
+Usage (from apps/backend):
+    python -m src.aggregator.reingest --since 2024-05-01 [--until 2024-05-08]
+        [--topic TOPIC] [--publisher PUBLISHER]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from .feeds import Feeds
+from .model import SBERT, SBERT_MODEL
+from src.database.reembedding import active_embedding_model
+
+logger = logging.getLogger(__name__)
+
+
+def parse_time(value: str) -> datetime:
+    """ISO date or datetime, in UTC unless it has a timezone."""
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+async def reingest(since: datetime, until: datetime = None, topic: str = None, publisher: str = None) -> dict:
+    # Once the articles were re-embedded, their vectors are the new model's
+    articles = Feeds(SBERT(model_name=active_embedding_model() or SBERT_MODEL))
+    try:
+        # Re-ingested articles keep their story
+        articles.stories.load()
+        return await articles.reingest_archive(since, until, topic, publisher)
+    finally:
+        await articles.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--since", type=parse_time, required=True,
+                            help="Oldest fetch time of the archived bodies")
+    arg_parser.add_argument("--until", type=parse_time,
+                            help="Latest fetch time of the archived bodies")
+    arg_parser.add_argument("--topic", help="Only re-ingest the feeds of this topic")
+    arg_parser.add_argument("--publisher", help="Only re-ingest the feeds of this publisher")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stats = asyncio.run(reingest(args.since, args.until, args.topic, args.publisher))
+    logger.info(f"Re-ingest done: {stats}")
+    if stats['failed_batches']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+scheduler.py
+This module decides which feeds are due for polling, adapting each feed's
+polling interval to how often it publishes.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 60 * 5
+MIN_POLL_INTERVAL = 60 * 2
+MAX_POLL_INTERVAL = 60 * 60
+# Aim to find this many new articles per poll
+TARGET_NEW_PER_POLL = 2
+# Weight of the latest observation in the publishing rate moving average
+RATE_SMOOTHING = 0.3
+# Interval growth of feeds that never published
+QUIET_BACKOFF = 1.5
+# Global budget of feeds polled in one tick, overdue feeds wait for the next
+MAX_FEEDS_PER_TICK = 40
+MIN_TICK = 10
+
+
+class FeedScheduler:
+    """
+    Tracks every feed's publishing rate (exponential moving average of new
+    articles per second) and polls it roughly every TARGET_NEW_PER_POLL
+    expected articles, within [MIN_POLL_INTERVAL, MAX_POLL_INTERVAL].
+    Quiet feeds are backed off. Failing feeds are left to the circuit
+    breaker (FeedHealth): feeds it blocks are skipped without using the
+    tick budget.
+    """
+
+    def __init__(self, feeds: dict = None, health=None):
+        self._feeds = {}
+        self.health = health
+        if feeds:
+            self.set_feeds(feeds)
+
+    def set_feeds(self, feeds: dict):
+        """Sync with the feeds configuration, keeping the state of known urls."""
+        now = time.time()
+        current = {}
+        for topic, publishers in feeds.items():
+            for publisher, url in publishers.items():
+                state = self._feeds.get(url) or {
+                    'interval': DEFAULT_POLL_INTERVAL,
+                    'next_due': now,
+                    'last_polled': None,
+                    'rate': None,
+                }
+                state['topic'] = topic
+                state['publisher'] = publisher
+                current[url] = state
+        self._feeds = current
+
+    def due_feeds(self, now: float = None) -> dict:
+        """
+        Return the feeds due for polling, most overdue first, within the tick budget.
+        Returns:
+            dict: {topic: {publisher: url}} like the feeds configuration.
+        """
+        now = now if now is not None else time.time()
+        due = sorted((state['next_due'], url)
+                     for url, state in self._feeds.items()
+                     if state['next_due'] <= now)
+        result = {}
+        polled = 0
+        for _, url in due:
+            if polled == MAX_FEEDS_PER_TICK:
+                break
+            if self.health is not None and not self.health.allow(
+                    url, datetime.fromtimestamp(now, timezone.utc)):
+                continue
+            state = self._feeds[url]
+            result.setdefault(state['topic'], {})[state['publisher']] = url
+            polled += 1
+        return result
+
+    def seconds_until_due(self, now: float = None) -> float:
+        """Seconds until the next feed is due (at least MIN_TICK)."""
+        now = now if now is not None else time.time()
+        if not self._feeds:
+            return DEFAULT_POLL_INTERVAL
+        next_due = min(state['next_due'] for state in self._feeds.values())
+        return max(next_due - now, MIN_TICK)
+
+    def record(self, url: str, new_articles: int = None, now: float = None):
+        """
+        Record the outcome of a poll and schedule the feed's next one.
+        Args:
+            url: Feed url
+            new_articles: Number of new articles found, None if the poll failed
+        """
+        state = self._feeds.get(url)
+        if state is None:
+            return
+        now = now if now is not None else time.time()
+
+        if new_articles is None:
+            # Backoff of failing feeds is up to the circuit breaker
+            interval = state['interval']
+        else:
+            elapsed = now - state['last_polled'] if state['last_polled'] else state['interval']
+            observed = new_articles / max(elapsed, 1)
+            if state['rate'] is None:
+                state['rate'] = observed
+            else:
+                state['rate'] = (RATE_SMOOTHING * observed +
+                                 (1 - RATE_SMOOTHING) * state['rate'])
+            # Empty polls decay the rate, so the interval grows on its own
+            if state['rate'] > 0:
+                interval = TARGET_NEW_PER_POLL / state['rate']
+            else:
+                interval = state['interval'] * QUIET_BACKOFF
+            state['last_polled'] = now
+
+        state['interval'] = min(max(interval, MIN_POLL_INTERVAL),
+                                MAX_POLL_INTERVAL)
+        state['next_due'] = now + state['interval']
+        logger.debug(
+            f"Next poll of {state['topic']}/{state['publisher']} in {state['interval']:.0f}s")
+
+    def record_polls(self, report: dict, now: float = None):
+        """Record the outcome of every feed polled in a refresh ({url: new articles or None})."""
+        for url, new_articles in report.items():
+            self.record(url, new_articles, now)
@@ -3,24 +3,32 @@ search.py
 This module contains the search functionality for the aggregator.
 """
 
+import os
 import re
 import string
 import logging
 from datetime import datetime
 from typing import List, Any
 
-from sqlalchemy import or_, case, text
+import numpy as np
+from sqlalchemy import or_, case, text, union, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import select, func, cast, desc
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 
+from src.aggregator.hot_window import HotWindow
+from src.aggregator.query_cache import normalize_query
+from src.aggregator.search_cache import SEARCH_SNAPSHOT_RESULTS, SearchSnapshotCache
 from src.database.models import Articles
+from src.database.vector_index import apply_search_settings
 from src.database.queries import (
     format_article_results,
     get_article_query,
     paginate_and_format,
     build_article_select,
+    get_ingest_generation,
     paginate_and_format_async,
 )
 
@@ -32,13 +40,18 @@ VECTOR_WEIGHT = 0.4
 HYBRID_WEIGHT = 0.35
 RECENCY_WEIGHT = 0.65
 
+# Candidates taken from each index (vector and full-text) before scoring,
+# 0 scores every article (a full scan, as the indexes cannot serve the
+# hybrid ordering)
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", 1000))
 
-def search_db(query: str, model: Any, device: str) -> List[dict]:
-    # Generate query embedding
-    query_embedding = model.encode(
-        [query], convert_to_tensor=True, device=device)
-    query_embedding = query_embedding.cpu().numpy().flatten().tolist()
+# Rankings of the recent searches of this process
+snapshots = SearchSnapshotCache()
+# Embeddings of the recent articles, the vector candidates of searches by recency
+hot_window = HotWindow()
 
+
+def search_db(query: str, query_embedding: List[float], model_name: str = None) -> List[dict]:
     # BM25 full-text search score (0 if no match)
     bm25_score = func.coalesce(
         func.ts_rank_cd(Articles.tsv, func.plainto_tsquery('english', query)),
@@ -47,6 +60,11 @@ def search_db(query: str, model: Any, device: str) -> List[dict]:
 
     # Vector similarity score
     vector_score = 1 - Articles.embeddings.cosine_distance(query_embedding)
+    if model_name is not None:
+        # Vectors of another model (e.g. a replica still running the previous
+        # model after a re-embedding cut over) are not comparable
+        vector_score = case(
+            (Articles.embedding_model == model_name, vector_score), else_=0.0)
 
     # Hybrid score (BM25 + Vector only) - used for elimination
     hybrid_score = (bm25_score * BM25_WEIGHT) + (vector_score * VECTOR_WEIGHT)
@@ -66,24 +84,102 @@ def search_db(query: str, model: Any, device: str) -> List[dict]:
     return bm25_score, vector_score, hybrid_score, recency_score, combined_score
 
 
-async def search(current_user_id: int, query: str, model: Any, device: str, db: AsyncSession, skip: int, limit: int, min_score: float = 0.18) -> List[dict]:
-    """Async variant of hybrid search combining BM25 and vector similarity with pagination."""
+def search_candidates(query: str, query_embedding: List[float], k: int = SEARCH_CANDIDATES,
+                      nearest_ids: List[int] = None):
+    """
+    Ids of the k nearest articles by the vector index and the k best
+    full-text matches by the GIN index, as a subquery to join the articles
+    to: scoring and filtering then only touch these candidates, so their
+    cost does not grow with the table.
+    nearest_ids, if given, are the nearest articles found otherwise (in the
+    hot window), and replace the vector index scan.
+    """
+    ts_query = func.plainto_tsquery('english', query)
+    if nearest_ids is not None:
+        nearest = (select(Articles.id)
+                   .where(Articles.id == any_(bindparam("nearest_ids", nearest_ids, type_=ARRAY(Integer))))
+                   .subquery())
+    else:
+        nearest = (select(Articles.id)
+                   .order_by(Articles.embeddings.cosine_distance(query_embedding))
+                   .limit(k)
+                   .subquery())
+    matching = (select(Articles.id)
+                .where(Articles.tsv.bool_op('@@')(ts_query))
+                .order_by(func.ts_rank_cd(Articles.tsv, ts_query).desc())
+                .limit(k)
+                .subquery())
+    return union(select(nearest.c.id), select(matching.c.id)).subquery("candidates")
+
+
+async def _ranked_ids(query: str, embedder: Any, db: AsyncSession, skip: int, limit: int, min_score: float,
+                      ef_search: int, probes: int, recent: bool, generation: int = None) -> List[int]:
+    """
+    Ids of the matching articles, best first (by combined score if recent, else by hybrid score).
+    generation, the current ingestion generation if known, brings the hot window up to date.
+    """
+    query_embedding = await embedder.encode(query)
     bm25_score, vector_score, hybrid_score, recency_score, combined_score = search_db(
-        query, model, device)
-
-    # Build select using async-friendly helpers
-    stmt = build_article_select(
-        current_user_id,
-        bm25_score.label('bm25_score'),
-        vector_score.label('vector_score'),
-        hybrid_score.label('hybrid_score'),
-        recency_score.label('recency_score'),
-        combined_score.label('combined_score')
-    )
-
-    # Apply filters and ordering
+        query, query_embedding, embedder.model_name)
+
+    stmt = select(Articles.id)
+    if SEARCH_CANDIDATES > 0:
+        # Deep pages need more candidates than the first ones
+        k = max(SEARCH_CANDIDATES, skip + limit)
+        # Older articles rank below recent ones by recency, but not by relevance
+        # alone: those searches keep the vector index
+        nearest_ids = await hot_window.nearest(
+            query_embedding, k, embedder.model_name, generation) if recent else None
+        candidates = search_candidates(query, query_embedding, k, nearest_ids)
+        stmt = stmt.join(candidates, candidates.c.id == Articles.id)
+        if nearest_ids is None:
+            await apply_search_settings(db, ef_search, probes, k)
+
+    # Apply filters and ordering (id breaks ties, so rankings are repeatable)
     stmt = stmt.where(hybrid_score >= min_score).order_by(
-        combined_score.desc())
-
-    # Paginate and format
-    return await paginate_and_format_async(db, stmt, skip, limit)
+        (combined_score if recent else hybrid_score).desc(), Articles.id.desc())
+    result = await db.execute(stmt.offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+
+async def search_ids(query: str, embedder: Any, db: AsyncSession, skip: int, limit: int, min_score: float = 0.18,
+                     ef_search: int = None, probes: int = None, recent: bool = True) -> List[int]:
+    """
+    Ids of a page of search results, best first.
+    A new search (skip 0) is ranked again once articles were ingested since
+    its cached ranking; further pages are slices of the cached ranking, so
+    they neither embed the query nor query the index again, and do not
+    shift as articles are ingested.
+    """
+    key = (normalize_query(query), embedder.model_version, min_score, ef_search, probes, recent)
+    generation = await get_ingest_generation(db) if skip == 0 else None
+    ids = snapshots.get(key, generation)
+    if ids is None and skip + limit <= SEARCH_SNAPSHOT_RESULTS:
+        if generation is None:
+            generation = await get_ingest_generation(db)
+        ids = np.asarray(await _ranked_ids(query, embedder, db, 0, SEARCH_SNAPSHOT_RESULTS, min_score,
+                                           ef_search, probes, recent, generation))
+        snapshots.put(key, generation, ids)
+    # A full ranking may not reach deep pages
+    if ids is not None and (skip + limit <= len(ids) or len(ids) < SEARCH_SNAPSHOT_RESULTS):
+        return ids[skip:skip + limit].tolist()
+    return await _ranked_ids(query, embedder, db, skip, limit, min_score, ef_search, probes, recent)
+
+
+async def search(current_user_id: int, query: str, embedder: Any, db: AsyncSession, skip: int, limit: int, min_score: float = 0.18,
+                 ef_search: int = None, probes: int = None) -> List[dict]:
+    """
+    Async variant of hybrid search combining BM25 and vector similarity with pagination.
+    ef_search (HNSW index) or probes (ivfflat index) override the recall of
+    the vector candidates (see src.database.vector_index).
+    The ranking comes from search_ids; the articles and their bookmarked
+    flag are read fresh.
+    """
+    ids = await search_ids(query, embedder, db, skip, limit, min_score, ef_search, probes)
+    if not ids:
+        return []
+    stmt = build_article_select(current_user_id).where(Articles.id.in_(ids))
+    articles = await paginate_and_format_async(db, stmt, 0, len(ids))
+    # Articles deleted since the ranking are left out
+    position = {article_id: i for i, article_id in enumerate(ids)}
+    return sorted(articles, key=lambda article: position[article['id']])
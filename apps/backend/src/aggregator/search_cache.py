@@ -0,0 +1,67 @@
+"""
+search_cache.py
+This module caches the ranked result ids of searches, so the further pages
+of a search are slices of the ranking computed for its first page: they
+are cheap, and stable while new articles are ingested.
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.monitoring import metrics
+
+# Seconds the pages of a search are served from its ranking
+SEARCH_SNAPSHOT_TTL = int(os.getenv("SEARCH_SNAPSHOT_TTL", 300))
+# Searches whose ranking is kept
+SEARCH_SNAPSHOT_MAX_ENTRIES = int(os.getenv("SEARCH_SNAPSHOT_MAX_ENTRIES", 1000))
+# Ranked ids kept per search; deeper pages are queried directly
+SEARCH_SNAPSHOT_RESULTS = int(os.getenv("SEARCH_SNAPSHOT_RESULTS", 1000))
+
+
+class SearchSnapshotCache:
+    """
+    LRU cache of the ranked article ids of searches, keyed by normalized
+    query and search settings. Each ranking records the ingestion generation
+    it was computed at: a new search (first page) needs the current one,
+    later pages take the ranking of their first page until it expires.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_SNAPSHOT_MAX_ENTRIES, ttl: float = SEARCH_SNAPSHOT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple, generation: int = None) -> np.ndarray | None:
+        """
+        Ranked ids of a search, None on a miss, or if generation is given
+        and the ranking predates it.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[2] > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            metrics.SEARCH_SNAPSHOT_REQUESTS.labels("miss").inc()
+            return None
+        if generation is not None and entry[1] != generation:
+            metrics.SEARCH_SNAPSHOT_REQUESTS.labels("stale").inc()
+            return None
+        self._entries.move_to_end(key)
+        metrics.SEARCH_SNAPSHOT_REQUESTS.labels("hit").inc()
+        return entry[0]
+
+    def put(self, key: tuple, generation: int, ids: list[int]):
+        """Cache the ranked ids of a search, evicting the least recently used."""
+        self._entries.pop(key, None)
+        self._entries[key] = (np.asarray(ids, dtype=np.int64), generation, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
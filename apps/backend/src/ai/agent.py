@@ -171,19 +171,18 @@ Metadata of the Top 20 articles for a user’s search query.
 
 
 class NewsDigestAgent:
-    def __init__(self, sbert, db, user_id, session_id, new_session: bool):
+    def __init__(self, embedder, db, user_id, session_id, new_session: bool):
         self.model = ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=0.5)
         self.tools = [search_db_tool,
                       scrape_articles_tool, latest_by_topic_tool]
         self.dbi_url = os.getenv("DATABASE_URL")
-        self.sbert = sbert
+        self.embedder = embedder
         self.db = db
         self.session_id = session_id
         self.new_session = new_session
         self.user_id = user_id
         self.context = DBContext(
-            model=self.sbert.model,
-            device=self.sbert.device,
+            embedder=self.embedder,
             db=self.db
         )
 
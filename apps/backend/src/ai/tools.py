@@ -12,7 +12,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import ColumnElement
 
-from src.aggregator.search import search_db
+from src.aggregator.search import search_ids
 from src.ai.article_loader import ArticleLoader
 from src.database.models import Articles
 
@@ -22,19 +22,10 @@ logger = logging.getLogger(__name__)
 # See https://github.com/langchain-ai/langchain/issues/33646
 
 
-async def retrieve_articles_db(
-    db: AsyncSession,
-    offset: int,
-    limit: int,
-    hybrid_score: ColumnElement,
-    combined_score: ColumnElement,
-    recent: bool,
-    *columns: ColumnElement,
-    min_score: float = 0.18,
-) -> List[dict]:
+async def retrieve_articles_by_ids(db: AsyncSession, ids: List[int]) -> List[dict]:
     """
-    Async variant that retrieves articles using SQLAlchemy Core with AsyncSession.
-    Applies a minimum hybrid score filter and optional recency ordering.
+    Async variant that retrieves articles using SQLAlchemy Core with AsyncSession,
+    in the order of the given ids.
     """
     QUERY_STRUCTURE = (
         Articles.id,
@@ -43,15 +34,12 @@ async def retrieve_articles_db(
         Articles.published_date,
         Articles.source,
     )
+    if not ids:
+        return []
 
-    stmt = select(*QUERY_STRUCTURE, *columns).where(hybrid_score >= min_score)
-    if recent:
-        stmt = stmt.order_by(combined_score.desc())
-
-    stmt = stmt.offset(offset).limit(limit)
-
+    stmt = select(*QUERY_STRUCTURE).where(Articles.id.in_(ids))
     result = await db.execute(stmt)
-    rows = result.mappings().all()  # synchronous consumption of result
+    rows = {r["id"]: r for r in result.mappings().all()}
 
     return [
         {
@@ -61,14 +49,13 @@ async def retrieve_articles_db(
             "datetime": r["published_date"],
             "source": r["source"]
         }
-        for r in rows
+        for r in (rows.get(article_id) for article_id in ids) if r is not None
     ]
 
 
 @dataclass
 class DBContext:
-    model: Any
-    device: str
+    embedder: Any
     db: AsyncSession
 
 
@@ -106,6 +93,8 @@ async def search_db_tool(runtime: ToolRuntime[DBContext], query: str, recent: bo
         recent (bool): 
             Whether to prioritize recent articles. Recommended `True` for up-to-date 
             information; set to `False` to emphasize overall relevance regardless of recency.
+            Results are ordered best first: by combined (hybrid and recency) score if `True`,
+            by hybrid score alone if `False`.
         skip (int, optional): 
             Number of results to skip for pagination. Defaults to `0`.
         limit (int, optional): 
@@ -113,15 +102,14 @@ async def search_db_tool(runtime: ToolRuntime[DBContext], query: str, recent: bo
 
     Returns:
         str: 
-            A JSON-formatted string containing the list of retrieved articles and their 
-            associated scores (BM25, vector, hybrid, recency, and combined).
+            A JSON-formatted string containing the list of retrieved articles (id, title,
+            link, published date and source), best first.
 
     Notes:
         - The function does not perform any database writes; it only retrieves results.
         - The hybrid scoring system blends multiple ranking signals for improved accuracy.
     """
-    model = runtime.context.model
-    device = runtime.context.device
+    embedder = runtime.context.embedder
     db = runtime.context.db
     tool_call_id = runtime.tool_call_id
 
@@ -129,23 +117,9 @@ async def search_db_tool(runtime: ToolRuntime[DBContext], query: str, recent: bo
     writer({"type": "tool", "tool_call_id": tool_call_id, "message": f"Searching Database for: {query}",
            "tool_status": "started"})
 
-    # Build SQL expressions for scores (no DB call here)
-    bm25_score, vector_score, hybrid_score, recency_score, combined_score = search_db(
-        query, model, device)
-
-    articles = await retrieve_articles_db(
-        db,
-        skip,
-        limit,
-        hybrid_score,
-        combined_score,
-        recent,
-        bm25_score.label("bm25_score"),
-        vector_score.label("vector_score"),
-        hybrid_score.label("hybrid_score"),
-        recency_score.label("recency_score"),
-        combined_score.label("combined_score"),
-    )
+    # Ranked ids of the page (later pages come from the cached ranking)
+    ids = await search_ids(query, embedder, db, skip, limit, recent=recent)
+    articles = await retrieve_articles_by_ids(db, ids)
     writer({"type": "tool", "tool_call_id": tool_call_id, "tool_status": "ended"})
     return json.dumps(articles, default=str, separators=(",", ":"))
 
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from src.database.models import ChatSession, ChatMessage
+from src.database.queries import paginate_keyset_async
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -106,17 +107,28 @@ async def log_chat_message(db: AsyncSession, session_id: str, sender: str, messa
         return False
 
 
-async def get_chat_messages(db: AsyncSession, session_id: str, page: int = 1, limit: int = 20, user_id: int = None):
-    """Retrieve chat messages for a given session with pagination.
+def _format_message_rows(rows: list) -> list:
+    # Return simple list of dicts with only the message fields
+    return [{"id": r.id, "sender": r.sender, "message": r.message, "message_metadata": r.message_metadata}
+            for r in rows]
+
+
+async def get_chat_messages(db: AsyncSession, session_id: str, page: int = 1, limit: int = 20, user_id: int = None,
+                            cursor: str = None):
+    """Retrieve chat messages for a given session with pagination, newest first.
 
     Args:
             db: Async SQLAlchemy session.
             session_id: The UUID/string identifier for the session.
-            page: The page number for pagination.
+            page: The page number for pagination (when no cursor is given).
             limit: The number of messages per page.
             user_id: The user ID to verify session ownership (optional).
+            cursor: The cursor of the page, returned with the previous one (optional).
     Returns:
-            A list of chat messages for the specified session.
+            A list of chat messages for the specified session, and the cursor
+            of the next page (None after the last one).
+    Raises:
+            ValueError: If the cursor is malformed.
     """
     try:
         # sanitize pagination inputs
@@ -136,21 +148,13 @@ async def get_chat_messages(db: AsyncSession, session_id: str, page: int = 1, li
             stmt = stmt.join(ChatSession, ChatMessage.session_id == ChatSession.id).where(
                 ChatSession.user_id == user_id)
 
-        stmt = stmt.order_by(ChatMessage.created_at.desc()
-                             ).offset(offset).limit(limit)
-
-        result = await db.execute(stmt)
-        # Use mappings() to get dict-like rows instead of ORM objects
-        rows = result.mappings().all()
-
-        # Return simple list of dicts with only the two fields
-        messages = [{"id": r["id"], "sender": r["sender"], "message": r["message"], "message_metadata": r["message_metadata"]}
-                    for r in rows]
-
-        return messages
+        return await paginate_keyset_async(db, stmt, ChatMessage.created_at, ChatMessage.id,
+                                           cursor, limit, offset, _format_message_rows)
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving chat messages: {e}")
-        return []
+        return [], None
 
 
 async def get_chat_sessions(db: AsyncSession, page: int = 1, limit: int = 10, user_id: int = None):
@@ -3,14 +3,18 @@ models.py
 This module contains the models for the database.
 """
 
+import os
 from datetime import datetime
-from sqlalchemy import TIMESTAMP, CheckConstraint, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import TIMESTAMP, CheckConstraint, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, UniqueConstraint, LargeBinary
 from sqlalchemy.dialects.postgresql import TSVECTOR, JSONB
 from pgvector.sqlalchemy import Vector
 import uuid
 
 from .base import Base
 
+# Dimensions of the title embeddings, those of the embedding model
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 384))
+
 
 class Articles(Base):
     __tablename__ = 'articles'
@@ -22,7 +26,10 @@ class Articles(Base):
     image = Column(String(512), nullable=True)
     source = Column(String(50), nullable=False)
     topic = Column(String(50), nullable=False)
-    embeddings = Column(Vector(384), nullable=False)
+    embeddings = Column(Vector(EMBEDDING_DIM), nullable=False)
+    # Model that produced the embeddings
+    embedding_model = Column(String(100), nullable=True)
+    story_id = Column(String(36), nullable=True)
     summary = Column(Text, nullable=True)
     tsv = Column(TSVECTOR)
 
@@ -32,6 +39,52 @@ class Articles(Base):
     )
 
 
+class FeedState(Base):
+    __tablename__ = "feed_state"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    url = Column(String(512), nullable=False, unique=True)
+    etag = Column(String(512), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    last_status = Column(Integer, nullable=True)
+    last_fetched = Column(DateTime(timezone=True), nullable=True)
+    # Circuit breaker (see aggregator/feed_health.py)
+    circuit = Column(String(16), nullable=False, default="closed")
+    failures = Column(Integer, nullable=False, default=0)
+    open_until = Column(DateTime(timezone=True), nullable=True)
+    failing_since = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(512), nullable=True)
+
+
+class FeedArchive(Base):
+    __tablename__ = "feed_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    url = Column(String(512), nullable=False)
+    topic = Column(String(50), nullable=False)
+    publisher = Column(String(50), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+    # zlib compressed feed body
+    body = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('url', 'content_hash', name='uq_feed_archive_url_hash'),
+    )
+
+
+class EmbeddingMigration(Base):
+    """A re-embedding of the articles with another model, complete once cut over."""
+    __tablename__ = "embedding_migrations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    model = Column(String(100), nullable=False)
+    dimensions = Column(Integer, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class Users(Base):
     __tablename__ = "users"
 
@@ -6,12 +6,12 @@ This module contains the operations for the database.
 import logging
 from datetime import datetime, timezone
 
-from sqlalchemy import select, and_
+from sqlalchemy import delete, func, select, and_, text, case
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .session import context_db
-from .models import Articles, Users, UserHistory
+from .models import Articles, Users, UserHistory, FeedState, FeedArchive
 from src.users.schemas import UserCreate
 
 
@@ -21,15 +21,18 @@ _ARTICLE_INSERT_BATCH_SIZE = 500
 _ARTICLE_TITLE_MAX_LENGTH = 512
 
 
-def insert_articles(articles: list[dict]):
+def insert_articles(articles: list[dict], overwrite: bool = False):
     """
     Bulk insert articles with ON CONFLICT for 'link'.
     Assumes deduplication is handled upstream (e.g., in feed parsing),
     and performs an upsert per row based on 'link'.
+    Stored articles are only updated by a later published date, or always with overwrite
+    (keeping their summary unless the title changed).
+    Returns True if the articles were written (or there was nothing to write).
     """
     if not articles:
         logger.info("No articles to insert or update.")
-        return
+        return True
 
     # Step 3: Map articles to dicts for insertion
     mapped_articles = [
@@ -41,6 +44,8 @@ def insert_articles(articles: list[dict]):
             "source": a["source"],
             "topic": a["topic"],
             "embeddings": a["embeddings"],
+            "embedding_model": a.get("embedding_model"),
+            "story_id": a.get("story_id"),
             "summary": None,
             "tsv": None
         }
@@ -64,11 +69,19 @@ def insert_articles(articles: list[dict]):
                         "image": stmt.excluded.image,
                         "topic": stmt.excluded.topic,
                         "embeddings": stmt.excluded.embeddings,
-                        "summary": stmt.excluded.summary,
+                        "embedding_model": stmt.excluded.embedding_model,
+                        # An article keeps the story it was first clustered into
+                        "story_id": func.coalesce(Articles.story_id,
+                                                  stmt.excluded.story_id),
+                        # Re-ingestion (overwrite) keeps the generated summary of
+                        # an unchanged article; tsv is recomputed by its trigger
+                        "summary": case((Articles.title == stmt.excluded.title, Articles.summary),
+                                        else_=stmt.excluded.summary)
+                        if overwrite else stmt.excluded.summary,
                         "tsv": stmt.excluded.tsv
                     },
-                    where=(stmt.excluded.published_date >
-                           Articles.published_date)
+                    where=None if overwrite else (
+                        stmt.excluded.published_date > Articles.published_date)
                 )
 
                 db.execute(stmt)
@@ -79,6 +92,240 @@ def insert_articles(articles: list[dict]):
 
     except Exception as e:
         logger.exception(f"Error during bulk insert/upsert of articles: {e}")
+        return False
+
+    # Sequences are not transactional: a generation advanced before the
+    # commit could be read (and cached against) without these rows
+    try:
+        with context_db() as db:
+            db.execute(text("SELECT nextval('ingest_generation')"))
+            db.commit()
+    except Exception as e:
+        # The articles are stored: cached rankings expire with their TTL
+        logger.error(f"Error advancing the ingest generation: {e}")
+    return True
+
+
+def load_known_articles(since: datetime) -> list:
+    """
+    Load link, title and published date of the articles published since the given time.
+    Args:
+        since: Lower bound of published_date
+    Returns:
+        list: (link, title, published_date) tuples.
+    """
+    try:
+        with context_db() as db:
+            stmt = (
+                select(Articles.link, Articles.title, Articles.published_date)
+                .where(Articles.published_date >= since)
+            )
+            return db.execute(stmt).all()
+    except Exception as e:
+        logger.error(f"Error loading known articles: {e}")
+        return []
+
+
+def load_story_articles(since: datetime) -> list:
+    """
+    Load link, embeddings, story id and published date of the articles
+    clustered into a story and published since the given time.
+    Args:
+        since: Lower bound of published_date
+    Returns:
+        list: (link, embeddings, story_id, published_date) tuples.
+    """
+    try:
+        with context_db() as db:
+            stmt = (
+                select(Articles.link, Articles.embeddings,
+                       Articles.story_id, Articles.published_date)
+                .where(and_(Articles.published_date >= since,
+                            Articles.story_id.isnot(None)))
+            )
+            return db.execute(stmt).all()
+    except Exception as e:
+        logger.error(f"Error loading story articles: {e}")
+        return []
+
+
+def load_feed_states() -> dict:
+    """
+    Load the persisted conditional GET validators and health of every feed.
+    Returns:
+        dict: Mapping of feed url to its stored state.
+    """
+    try:
+        with context_db() as db:
+            rows = db.execute(select(FeedState)).scalars().all()
+            return {
+                row.url: {
+                    "etag": row.etag,
+                    "last_modified": row.last_modified,
+                    "content_hash": row.content_hash,
+                    "last_status": row.last_status,
+                    "last_fetched": row.last_fetched,
+                    "circuit": row.circuit,
+                    "failures": row.failures,
+                    "open_until": row.open_until,
+                    "failing_since": row.failing_since,
+                    "last_error": row.last_error,
+                }
+                for row in rows
+            }
+    except Exception as e:
+        logger.error(f"Error loading feed states: {e}")
+        return {}
+
+
+def save_feed_states(states: dict) -> bool:
+    """
+    Upsert the conditional GET validators of the given feeds.
+    Args:
+        states: Mapping of feed url to its state.
+    Returns:
+        bool: True if the states were saved successfully, False otherwise.
+    """
+    if not states:
+        return True
+
+    rows = [{"url": url, **state} for url, state in states.items()]
+    try:
+        with context_db() as db:
+            stmt = pg_insert(FeedState).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['url'],
+                set_={
+                    "etag": stmt.excluded.etag,
+                    "last_modified": stmt.excluded.last_modified,
+                    "content_hash": stmt.excluded.content_hash,
+                    "last_status": stmt.excluded.last_status,
+                    "last_fetched": stmt.excluded.last_fetched,
+                }
+            )
+            db.execute(stmt)
+            db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error saving feed states: {e}")
+        return False
+
+
+def save_feed_health(states: dict) -> bool:
+    """
+    Upsert the circuit breaker state of the given feeds.
+    Args:
+        states: Mapping of feed url to its circuit, failures, open_until,
+            failing_since and last_error.
+    Returns:
+        bool: True if the states were saved successfully, False otherwise.
+    """
+    if not states:
+        return True
+
+    rows = [
+        {
+            "url": url,
+            "circuit": state["circuit"],
+            "failures": state["failures"],
+            "open_until": state["open_until"],
+            "failing_since": state["failing_since"],
+            "last_error": state["last_error"],
+        }
+        for url, state in states.items()
+    ]
+    try:
+        with context_db() as db:
+            stmt = pg_insert(FeedState).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['url'],
+                set_={
+                    "circuit": stmt.excluded.circuit,
+                    "failures": stmt.excluded.failures,
+                    "open_until": stmt.excluded.open_until,
+                    "failing_since": stmt.excluded.failing_since,
+                    "last_error": stmt.excluded.last_error,
+                }
+            )
+            db.execute(stmt)
+            db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error saving feed health: {e}")
+        return False
+
+
+def save_archived_feeds(rows: list[dict]) -> bool:
+    """
+    Insert archived feed bodies, refreshing the fetch time of bodies already archived.
+    Args:
+        rows: Dicts of url, topic, publisher, content_hash, fetched_at and compressed body.
+    Returns:
+        bool: True if the bodies were saved successfully, False otherwise.
+    """
+    if not rows:
+        return True
+    try:
+        with context_db() as db:
+            stmt = pg_insert(FeedArchive).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                constraint='uq_feed_archive_url_hash',
+                set_={"fetched_at": stmt.excluded.fetched_at}
+            )
+            db.execute(stmt)
+            db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error archiving feed bodies: {e}")
+        return False
+
+
+def list_archived_feeds(since: datetime, until: datetime = None, topic: str = None, publisher: str = None) -> list[dict]:
+    """
+    List archived feed bodies fetched in the given period, newest first.
+    Returns:
+        list: Dicts of id, url, topic, publisher and fetched_at.
+    """
+    try:
+        with context_db() as db:
+            stmt = select(FeedArchive.id, FeedArchive.url, FeedArchive.topic,
+                          FeedArchive.publisher, FeedArchive.fetched_at).where(
+                FeedArchive.fetched_at >= since)
+            if until is not None:
+                stmt = stmt.where(FeedArchive.fetched_at <= until)
+            if topic is not None:
+                stmt = stmt.where(FeedArchive.topic == topic)
+            if publisher is not None:
+                stmt = stmt.where(FeedArchive.publisher == publisher)
+            stmt = stmt.order_by(FeedArchive.fetched_at.desc())
+            return [dict(row._mapping) for row in db.execute(stmt)]
+    except Exception as e:
+        logger.error(f"Error listing archived feeds: {e}")
+        return []
+
+
+def load_archived_feed_body(archive_id: int) -> bytes | None:
+    """Load the compressed body of an archived feed."""
+    try:
+        with context_db() as db:
+            return db.execute(select(FeedArchive.body).where(
+                FeedArchive.id == archive_id)).scalar_one_or_none()
+    except Exception as e:
+        logger.error(f"Error loading archived feed {archive_id}: {e}")
+        return None
+
+
+def delete_archived_feeds(before: datetime) -> int:
+    """Delete the feed bodies archived before the given time, returning how many were deleted."""
+    try:
+        with context_db() as db:
+            result = db.execute(delete(FeedArchive).where(
+                FeedArchive.fetched_at < before))
+            db.commit()
+            return result.rowcount
+    except Exception as e:
+        logger.error(f"Error pruning archived feeds: {e}")
+        return 0
 
 
 async def check_user_in_db(user: UserCreate, db: AsyncSession):
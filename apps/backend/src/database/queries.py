@@ -3,15 +3,22 @@ queries.py
 Stores specific format to retrieve articles from database and apply pagination
 """
 
+import base64
+import json
+from datetime import datetime, timezone
+
 from fastapi import Query
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, exists, or_, text
 from sqlalchemy.orm import Session, aliased
 from sqlalchemy.sql import case, ColumnElement
+from sqlalchemy.sql.util import ClauseAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import Articles, UserBookmarks
-from datetime import timezone
+
+# Response header carrying the cursor of the next page of a feed
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 # Define aliases for user interactions
 bookmark_alias = aliased(UserBookmarks)
@@ -99,6 +106,21 @@ def build_article_select(current_user_id: int, *add_columns: ColumnElement):
     return stmt
 
 
+def latest_of_story(filter_by: ColumnElement) -> ColumnElement:
+    """Build a condition keeping only the newest article of each story among those matching filter_by.
+
+    Articles without a story are always kept.
+    """
+    newer = Articles.__table__.alias("newer_article")
+    return ~exists().where(
+        newer.c.story_id == Articles.story_id,
+        or_(newer.c.published_date > Articles.published_date,
+            and_(newer.c.published_date == Articles.published_date,
+                 newer.c.id > Articles.id)),
+        ClauseAdapter(newer).traverse(filter_by),
+    )
+
+
 def _format_async_rows(rows: list) -> list:
     """Format rows returned from AsyncSession.execute into the standard article dict list."""
     if not rows:
@@ -142,10 +164,86 @@ async def paginate_and_format_async(db: AsyncSession, stmt, offset: int, limit:
     return _format_async_rows(rows)
 
 
+# ==========================
+# Keyset (cursor) pagination
+# ==========================
+
+def encode_cursor(sort_value: datetime, row_id: int | str) -> str:
+    """Opaque token of the position of a row in a feed ordered by (sort value, id) descending."""
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, id_type: type = None) -> tuple:
+    """
+    (sort value, id) of a cursor token; raises ValueError if it is malformed,
+    or if its id is not of id_type (the Python type of the id column) when given.
+    """
+    try:
+        sort_value, row_id = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(row_id, (int, str)) or isinstance(row_id, bool):
+            raise TypeError(f"id of type {type(row_id).__name__}")
+        if id_type is not None and not isinstance(row_id, id_type):
+            raise TypeError(f"id of type {type(row_id).__name__}, expected {id_type.__name__}")
+        return datetime.fromisoformat(sort_value), row_id
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+
+def after_cursor(sort_column: ColumnElement, id_column: ColumnElement, position: tuple) -> ColumnElement:
+    """Build a condition keeping the rows after a (sort value, id) position in descending order.
+
+    The sort column bound comes first, so indexes on (..., sort column DESC)
+    serve it as a range scan; the id only breaks ties.
+    """
+    sort_value, row_id = position
+    return and_(sort_column <= sort_value,
+                or_(sort_column < sort_value, id_column < row_id))
+
+
+async def paginate_keyset_async(db: AsyncSession, stmt, sort_column: ColumnElement, id_column: ColumnElement,
+                                cursor: str | None, limit: int, offset: int = 0,
+                                format_rows=_format_async_rows) -> tuple[list, str | None]:
+    """Execute a Select one page at a time in (sort column, id) descending order and format the results.
+
+    A page starts after the position of the cursor, so it costs the same at
+    any depth and does not shift as newer rows arrive. Without a cursor it
+    starts at offset (clients paging by number). Returns the page and the
+    cursor of the next one, None after the last page.
+    """
+    if cursor is not None:
+        # A cursor id of another type than the column's would fail in the database
+        position = decode_cursor(cursor, id_column.type.python_type)
+        stmt = stmt.where(after_cursor(sort_column, id_column, position))
+        offset = 0
+    stmt = (
+        stmt.add_columns(sort_column.label("cursor_sort"), id_column.label("cursor_id"))
+        .order_by(sort_column.desc(), id_column.desc())
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    result = await db.execute(stmt)
+    rows = result.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].cursor_sort, rows[-1].cursor_id)
+    return format_rows(rows), next_cursor
+
+
 # ==========================
 # Simple async getters
 # ==========================
 
+async def get_ingest_generation(db: AsyncSession) -> int:
+    """Generation of the stored articles, advanced by every ingested batch."""
+    # last_value is 1 both before and after the first nextval
+    result = await db.execute(text(
+        "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM ingest_generation"))
+    return result.scalar_one()
+
+
 async def get_article_brief_by_id(db: AsyncSession, article_id: int):
     """Retrieve a single article's brief fields by id (async).
 
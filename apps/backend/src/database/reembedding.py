@@ -0,0 +1,195 @@
+"""
+reembedding.py
+This module contains the database side of re-embedding the articles with
+another model: vectors are written to shadow columns while search keeps
+using the current ones, then swapped in by an atomic cutover.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import select, text
+
+from .base import engine
+from .models import EmbeddingMigration
+from .session import context_db
+from .vector_index import create_index_sql
+
+logger = logging.getLogger(__name__)
+
+SHADOW_INDEX = "idx_articles_embeddings_next"
+# Keeps the swapped-in vectors non-null; SET NOT NULL would scan the table
+# under the cutover's lock
+NOT_NULL_CONSTRAINT = "articles_embeddings_not_null"
+
+# A changed title needs a new vector: forget the shadow one
+_RESET_SHADOW_TRIGGER = """
+CREATE OR REPLACE FUNCTION reset_next_embedding() RETURNS trigger AS $$
+BEGIN
+  IF NEW.title IS DISTINCT FROM OLD.title THEN
+    NEW.embeddings_next := NULL;
+    NEW.embedding_model_next := NULL;
+  END IF;
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reset_next_embedding_trigger ON articles;
+CREATE TRIGGER reset_next_embedding_trigger
+BEFORE UPDATE OF title ON articles
+FOR EACH ROW
+EXECUTE FUNCTION reset_next_embedding();
+"""
+
+_DROP_SHADOW = """
+DROP TRIGGER IF EXISTS reset_next_embedding_trigger ON articles;
+DROP FUNCTION IF EXISTS reset_next_embedding();
+ALTER TABLE articles DROP COLUMN IF EXISTS embeddings_next;
+ALTER TABLE articles DROP COLUMN IF EXISTS embedding_model_next;
+"""
+
+
+def active_embedding_model() -> str | None:
+    """Model of the last re-embedding cut over, None if the articles were never re-embedded."""
+    try:
+        with context_db() as db:
+            return db.execute(
+                select(EmbeddingMigration.model)
+                .where(EmbeddingMigration.completed_at.is_not(None))
+                .order_by(EmbeddingMigration.completed_at.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+    except Exception as e:
+        logger.error(f"Error loading the active embedding model: {e}")
+        return None
+
+
+def start_reembedding(model: str, dimensions: int, restart: bool = False) -> int:
+    """
+    Start re-embedding the articles with a model, or resume the migration in progress.
+    Args:
+        model: Name of the new model
+        dimensions: Dimensions of its vectors
+        restart: Drop a migration in progress to another model (or from scratch)
+    Returns:
+        int: Id of the migration
+    Raises:
+        RuntimeError: If another migration is in progress and restart is not set
+    """
+    with context_db() as db:
+        current = db.execute(
+            select(EmbeddingMigration)
+            .where(EmbeddingMigration.completed_at.is_(None))
+        ).scalar_one_or_none()
+        if current is not None and not restart:
+            if (current.model, current.dimensions) != (model, dimensions):
+                raise RuntimeError(
+                    f"A re-embedding to {current.model} is in progress, restart to drop it")
+            logger.info(f"Resuming re-embedding to {model}")
+            return current.id
+
+        if current is not None:
+            logger.info(f"Dropping re-embedding to {current.model}")
+            db.delete(current)
+        db.execute(text(_DROP_SHADOW))
+        db.execute(text(
+            f"ALTER TABLE articles ADD COLUMN embeddings_next vector({int(dimensions)})"))
+        db.execute(text(
+            "ALTER TABLE articles ADD COLUMN embedding_model_next VARCHAR(100)"))
+        db.execute(text(_RESET_SHADOW_TRIGGER))
+        migration = EmbeddingMigration(
+            model=model, dimensions=dimensions,
+            started_at=datetime.now(timezone.utc))
+        db.add(migration)
+        db.commit()
+        logger.info(f"Started re-embedding to {model} ({dimensions} dimensions)")
+        return migration.id
+
+
+def count_pending_reembedding() -> int:
+    """Number of articles without a shadow vector."""
+    with context_db() as db:
+        return db.execute(text(
+            "SELECT count(*) FROM articles WHERE embeddings_next IS NULL")).scalar()
+
+
+def load_pending_reembedding(after_id: int, limit: int) -> list[tuple]:
+    """(id, title) of the next articles without a shadow vector, by id."""
+    with context_db() as db:
+        return [tuple(row) for row in db.execute(text(
+            "SELECT id, title FROM articles "
+            "WHERE embeddings_next IS NULL AND id > :after_id "
+            "ORDER BY id LIMIT :limit"),
+            {"after_id": after_id, "limit": limit})]
+
+
+def _save_shadow(conn, model: str, rows: list[tuple]):
+    conn.execute(
+        text("UPDATE articles SET embeddings_next = CAST(:embedding AS vector), "
+             "embedding_model_next = :model WHERE id = :id"),
+        [{"id": article_id, "model": model,
+          "embedding": "[" + ",".join(map(str, embedding)) + "]"}
+         for article_id, embedding in rows])
+
+
+def save_reembedded(model: str, rows: list[tuple]):
+    """Write the shadow vectors of (id, embedding) rows."""
+    if not rows:
+        return
+    with engine.begin() as conn:
+        _save_shadow(conn, model, rows)
+
+
+def build_reembedding_index():
+    """Build the vector index of the shadow column (as configured) without blocking writes."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(create_index_sql(SHADOW_INDEX, "embeddings_next", concurrently=True)))
+
+
+def cutover_reembedding(migration_id: int, encode) -> int:
+    """
+    Swap the shadow vectors in, in one transaction: articles written since
+    the last pass are embedded under a lock blocking writes, then the
+    columns and the index are renamed. Readers wait for the swap only: the
+    vectors' NOT NULL check is added unvalidated, then validated after the
+    commit without blocking reads or writes.
+    Args:
+        migration_id: Id of the migration
+        encode: Function of a list of titles returning their vectors
+    Returns:
+        int: Number of articles embedded during the cutover
+    """
+    with engine.begin() as conn:
+        model = conn.execute(
+            select(EmbeddingMigration.model)
+            .where(EmbeddingMigration.id == migration_id)).scalar_one()
+        conn.execute(text("LOCK TABLE articles IN SHARE ROW EXCLUSIVE MODE"))
+        rows = conn.execute(text(
+            "SELECT id, title FROM articles WHERE embeddings_next IS NULL")).all()
+        if rows:
+            vectors = encode([title for _, title in rows])
+            _save_shadow(conn, model, [(row[0], vector)
+                                       for row, vector in zip(rows, vectors)])
+
+        conn.execute(text(
+            "DROP TRIGGER IF EXISTS reset_next_embedding_trigger ON articles"))
+        conn.execute(text("DROP FUNCTION IF EXISTS reset_next_embedding()"))
+        conn.execute(text(
+            "ALTER TABLE articles DROP COLUMN embeddings, DROP COLUMN embedding_model"))
+        conn.execute(text(
+            "ALTER TABLE articles RENAME COLUMN embeddings_next TO embeddings"))
+        conn.execute(text(
+            "ALTER TABLE articles RENAME COLUMN embedding_model_next TO embedding_model"))
+        conn.execute(text(
+            f"ALTER TABLE articles ADD CONSTRAINT {NOT_NULL_CONSTRAINT} "
+            f"CHECK (embeddings IS NOT NULL) NOT VALID"))
+        conn.execute(text(
+            f"ALTER INDEX IF EXISTS {SHADOW_INDEX} RENAME TO idx_articles_embeddings"))
+        conn.execute(
+            EmbeddingMigration.__table__.update()
+            .where(EmbeddingMigration.id == migration_id)
+            .values(completed_at=datetime.now(timezone.utc)))
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE articles VALIDATE CONSTRAINT {NOT_NULL_CONSTRAINT}"))
+    logger.info(f"Cut over to {model} embeddings ({len(rows)} articles embedded during the cutover)")
+    return len(rows)
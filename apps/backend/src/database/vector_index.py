@@ -0,0 +1,152 @@
+"""
+vector_index.py
+This module manages the vector index of the article embeddings, ivfflat or
+HNSW as configured, and the per-query settings trading its recall for
+latency.
+
+Usage (from apps/backend), to (re)build the index without blocking writes,
+e.g. after changing VECTOR_INDEX or once an ivfflat index built on an empty
+table has articles to cluster:
+    python -m src.database.vector_index --rebuild
+"""
+
+import argparse
+import logging
+import os
+import re
+
+from sqlalchemy import func, select, text
+
+from .base import engine
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_TYPES = ("ivfflat", "hnsw")
+# ivfflat (clusters the vectors present when it is built) or hnsw (a graph,
+# built incrementally, so it needs no rebuild as the table grows)
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "ivfflat")
+INDEX_NAME = "idx_articles_embeddings"
+
+# Build settings
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", 200))
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 64))
+
+# Query settings, overridable per search: more probes (ivfflat) or a larger
+# candidate list (hnsw) raise recall and latency. An HNSW scan returns at
+# most ef_search rows.
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", 10))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 100))
+# Largest ef_search pgvector accepts
+_HNSW_EF_SEARCH_MAX = 1000
+
+
+def index_options(index_type: str = VECTOR_INDEX) -> dict:
+    """Build settings (WITH options) of an index type."""
+    if index_type == "ivfflat":
+        return {"lists": IVFFLAT_LISTS}
+    if index_type == "hnsw":
+        return {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    raise ValueError(
+        f"Unknown vector index {index_type!r}, expected one of {VECTOR_INDEX_TYPES}")
+
+
+def create_index_sql(name: str = INDEX_NAME, column: str = "embeddings", table: str = "articles",
+                     index_type: str = VECTOR_INDEX, options: dict = None,
+                     concurrently: bool = False) -> str:
+    """CREATE INDEX statement of a cosine distance index on a vector column."""
+    options = options or index_options(index_type)
+    with_options = ", ".join(f"{key} = {int(value)}" for key, value in options.items())
+    return (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+            f"ON {table} USING {index_type} ({column} vector_cosine_ops) "
+            f"WITH ({with_options})")
+
+
+def _parse_index(definition: str) -> tuple:
+    """(index type, options) of an index definition from pg_indexes."""
+    index_type = re.search(r"USING (\w+)", definition).group(1)
+    options = {key: int(value) for key, value in
+               re.findall(r"(\w+)\s*=\s*'?(\d+)'?", definition.partition("WITH")[2])}
+    return index_type, options
+
+
+def current_index(conn, name: str = INDEX_NAME) -> tuple | None:
+    """(index type, options) of an existing index, None if there is none."""
+    definition = conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+        {"name": name}).scalar_one_or_none()
+    return _parse_index(definition) if definition else None
+
+
+def ensure_vector_index():
+    """
+    Create the configured index if the articles have none (at startup). An
+    existing index built otherwise is kept: rebuilding blocks for long on a
+    large table, so it is left to rebuild_vector_index.
+    """
+    with engine.connect() as conn:
+        existing = current_index(conn)
+        if existing is None:
+            conn.execute(text(create_index_sql()))
+            conn.commit()
+            logger.info(f"Created {VECTOR_INDEX} index {INDEX_NAME}")
+            if VECTOR_INDEX == "ivfflat" and not conn.execute(
+                    text("SELECT EXISTS (SELECT 1 FROM articles)")).scalar():
+                logger.warning(
+                    "ivfflat index built on an empty table: rebuild it once articles are "
+                    "stored (python -m src.database.vector_index --rebuild)")
+        elif existing != (VECTOR_INDEX, index_options()):
+            logger.warning(
+                f"{INDEX_NAME} is {existing[0]} {existing[1]}, configured {VECTOR_INDEX} "
+                f"{index_options()}: rebuild it (python -m src.database.vector_index --rebuild)")
+
+
+def rebuild_vector_index(index_type: str = VECTOR_INDEX):
+    """
+    Build the index as configured under a temporary name without blocking
+    writes, then swap it for the current one.
+    """
+    new_name = f"{INDEX_NAME}_new"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Left over (possibly invalid) by an interrupted rebuild
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+        logger.info(f"Building {index_type} index {index_options(index_type)}")
+        conn.execute(text(create_index_sql(new_name, index_type=index_type, concurrently=True)))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+        conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {INDEX_NAME}"))
+    logger.info(f"Rebuilt {INDEX_NAME} as {index_type}")
+
+
+def search_settings(ef_search: int = None, probes: int = None, k: int = None) -> dict:
+    """
+    Settings of the vector index scans of one query, the defaults unless
+    given. ef_search is raised to k, the rows the query takes from the
+    index, as an HNSW scan returns no more (up to pgvector's maximum).
+    """
+    ef_search = ef_search or HNSW_EF_SEARCH
+    return {"hnsw.ef_search": max(ef_search, min(k or 0, _HNSW_EF_SEARCH_MAX)),
+            "ivfflat.probes": probes or IVFFLAT_PROBES}
+
+
+async def apply_search_settings(db, ef_search: int = None, probes: int = None, k: int = None):
+    """Set the vector index settings for the rest of the session's transaction (SET LOCAL)."""
+    await db.execute(select(*(
+        func.set_config(name, str(int(value)), True)
+        for name, value in search_settings(ef_search, probes, k).items())))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rebuild", action="store_true",
+                            help="Rebuild the index with the configured settings")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.rebuild:
+        rebuild_vector_index()
+    with engine.connect() as conn:
+        logger.info(f"{INDEX_NAME}: {current_index(conn)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+metrics.py
+This module defines the Prometheus metrics of the ingestion pipeline and
+search, exposed in text format on the /metrics route.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    REGISTRY,
+)
+
+# Per feed, labelled by topic and publisher
+FEED_LABELS = ("topic", "publisher")
+
+FEED_FETCH_SECONDS = Histogram(
+    "feed_fetch_seconds", "Time to fetch a feed", FEED_LABELS,
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30))
+FEED_FETCH_BYTES = Counter(
+    "feed_fetch_bytes", "Bytes of feed bodies received", FEED_LABELS)
+FEED_FETCHES = Counter(
+    "feed_fetches", "Feed fetches by HTTP status ('error' when no response)",
+    FEED_LABELS + ("status",))
+FEED_ENTRIES_PARSED = Counter(
+    "feed_entries_parsed", "Feed entries parsed into articles", FEED_LABELS)
+FEED_ENTRIES_DROPPED = Counter(
+    "feed_entries_dropped", "Feed entries dropped while parsing, by reason",
+    FEED_LABELS + ("reason",))
+FEED_CIRCUITS = Gauge(
+    "feed_circuits", "Feeds per circuit breaker state", ("state",),
+    multiprocess_mode="max")
+
+# Per pipeline stage
+STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds", "Time spent in a pipeline stage per feed or batch",
+    ("stage",), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+EMBED_BATCH_SIZE = Histogram(
+    "ingest_embed_batch_size", "Articles per embedding micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+UPSERT_ROWS = Counter(
+    "ingest_upsert_rows", "Articles sent to the database, by result", ("result",))
+REFRESH_SECONDS = Histogram(
+    "ingest_refresh_seconds", "Duration of a whole refresh",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+LAST_REFRESH = Gauge(
+    "ingest_last_refresh_timestamp_seconds", "Time the last refresh finished",
+    multiprocess_mode="max")
+
+# Search
+QUERY_EMBED_SECONDS = Histogram(
+    "search_query_embed_seconds", "Time to encode one batch of search queries",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+QUERY_EMBED_BATCH_SIZE = Histogram(
+    "search_query_embed_batch_size", "Distinct search queries per encoding batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+QUERY_CACHE_REQUESTS = Counter(
+    "search_query_cache_requests", "Query embedding cache lookups, by result (hit or miss)",
+    ("result",))
+QUERY_CACHE_BYTES = Gauge(
+    "search_query_cache_bytes", "Memory used by the query embedding cache",
+    multiprocess_mode="livesum")
+SEARCH_SNAPSHOT_REQUESTS = Counter(
+    "search_snapshot_requests", "Search ranking cache lookups, by result (hit, miss or stale)",
+    ("result",))
+HOT_WINDOW_ARTICLES = Gauge(
+    "search_hot_window_articles", "Recent articles whose embeddings are kept in memory for search",
+    multiprocess_mode="livemax")
+
+
+def record_fetch(topic: str, publisher: str, seconds: float, status, size: int = 0):
+    """Record the outcome of one feed fetch (status is the HTTP status or 'error')."""
+    FEED_FETCH_SECONDS.labels(topic, publisher).observe(seconds)
+    FEED_FETCHES.labels(topic, publisher, str(status)).inc()
+    if size:
+        FEED_FETCH_BYTES.labels(topic, publisher).inc(size)
+
+
+def record_parse(topic: str, publisher: str, seconds: float, parsed: int, dropped: dict):
+    """Record the entries parsed and dropped ({reason: count}) from one feed."""
+    STAGE_SECONDS.labels("parse").observe(seconds)
+    FEED_ENTRIES_PARSED.labels(topic, publisher).inc(parsed)
+    for reason, count in dropped.items():
+        if count:
+            FEED_ENTRIES_DROPPED.labels(topic, publisher, reason).inc(count)
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Render every metric in Prometheus text format.
+    With PROMETHEUS_MULTIPROC_DIR set (several API workers), the values of
+    all worker processes are aggregated.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,115 @@
+"""
+readiness.py
+This module loads models lazily or in the background, so the API serves
+routes that need no model right away, and reports whether the models a
+replica needs are loaded.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# Seconds before a failed load is retried
+MODEL_RETRY_SECONDS = 30
+# Retry-After of the requests refused while their model loads
+MODEL_RETRY_AFTER = 10
+
+# Every lazily loaded model, by name
+MODELS = {}
+
+
+class LazyModel:
+    """
+    A model built by `factory` on a background thread, the first time it is
+    needed or at startup with `load_in_background`. A failed load is retried
+    when the model is needed again, MODEL_RETRY_SECONDS later at the earliest.
+
+    required: the replica is not ready (/readyz) until the model is loaded.
+    """
+
+    def __init__(self, name: str, factory, required: bool = False):
+        self.name = name
+        self.required = required
+        self._factory = factory
+        self._instance = None
+        self._error = None
+        self._failed_at = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        MODELS[name] = self
+
+    @property
+    def state(self) -> str:
+        if self._instance is not None:
+            return READY
+        if self._error is not None:
+            return FAILED
+        return LOADING if self._thread is not None else NOT_LOADED
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    def load_in_background(self):
+        """Start loading the model, unless it is loaded or loading."""
+        with self._lock:
+            if self._instance is not None:
+                return
+            if self._thread is not None and self._error is None:
+                return
+            if self._error is not None and time.monotonic() - self._failed_at < MODEL_RETRY_SECONDS:
+                return
+            self._error = None
+            self._done.clear()
+            self._thread = threading.Thread(
+                target=self._load, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        logger.info(f"Loading {self.name}")
+        start = time.perf_counter()
+        try:
+            self._instance = self._factory()
+            logger.info(
+                f"Loaded {self.name} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self._error = str(e) or type(e).__name__
+            self._failed_at = time.monotonic()
+            logger.error(f"Error loading {self.name}: {e}")
+        finally:
+            self._done.set()
+
+    def get(self):
+        """The model, or None while it is loading (loading starts if needed)."""
+        if self._instance is None:
+            self.load_in_background()
+        return self._instance
+
+    def wait(self, timeout: float = None):
+        """Block until the model is loaded; None if loading failed or timed out."""
+        self.load_in_background()
+        self._done.wait(timeout)
+        return self._instance
+
+
+def model_states() -> dict:
+    """State of every lazily loaded model (and its error when loading failed)."""
+    states = {}
+    for name, model in MODELS.items():
+        states[name] = {"state": model.state, "required": model.required}
+        if model.error:
+            states[name]["error"] = model.error
+    return states
+
+
+def models_ready() -> bool:
+    """Whether every model the replica needs is loaded."""
+    return all(model.state == READY for model in MODELS.values() if model.required)
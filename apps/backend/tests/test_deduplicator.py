@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.aggregator import deduplicator
+from src.aggregator.deduplicator import Deduplicator
+
+
+def make_article(link, vector):
+    return {'link': link, 'embeddings': vector,
+            'published': datetime.now(timezone.utc)}
+
+
+def test_assign_clusters_near_duplicates(monkeypatch):
+    monkeypatch.setattr(deduplicator, "load_story_articles", lambda since: [])
+    stories = Deduplicator()
+    stories.load()
+    rng = np.random.default_rng(0)
+    story_a, story_b = rng.standard_normal((2, 384))
+
+    first = [make_article("a1", story_a), make_article("b1", story_b)]
+    second = [make_article("a2", story_a + 0.1 * rng.standard_normal(384)),
+              make_article("a3", story_a + 0.1 * rng.standard_normal(384))]
+    stories.assign(first)
+    stories.assign(second)
+
+    assert first[0]['story_id'] != first[1]['story_id']
+    assert {art['story_id'] for art in second} == {first[0]['story_id']}
+    assert len(stories) == 4
+
+
+def test_assign_keeps_story_of_known_link(monkeypatch):
+    monkeypatch.setattr(deduplicator, "load_story_articles", lambda since: [])
+    stories = Deduplicator()
+    stories.load()
+    vector = np.ones(384)
+    stories.assign([make_article("a1", vector)])
+
+    # Same link with a rewritten title stays in its story
+    updated = make_article("a1", -vector)
+    stories.assign([updated])
+    assert len(stories) == 1
+    assert updated['story_id'] == stories._story_ids[0]
+
+
+def test_forgotten_articles_start_no_story(monkeypatch):
+    monkeypatch.setattr(deduplicator, "load_story_articles", lambda since: [])
+    stories = Deduplicator()
+    stories.load()
+    vector = np.ones(384)
+    unstored = [make_article("a1", vector)]
+    assert stories.assign(unstored) == ["a1"]
+    stories.forget(["a1"])
+
+    later = make_article("a2", vector)
+    stories.assign([later])
+    assert later['story_id'] != unstored[0]['story_id']
+    # The forgotten article is dropped at the next prune
+    stories.prune()
+    assert len(stories) == 1
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.aggregator.embedding_pool import EmbeddingPool
+
+
+class LengthModel:
+    """Encodes a title as (length, pid of the worker process)."""
+
+    def encode(self, sentences, **kwargs):
+        if "fail" in sentences:
+            raise ValueError("cannot encode")
+        return np.array([[len(s), os.getpid()] for s in sentences], dtype=np.float32)
+
+
+def load_length_model(model_name, backend, threads):
+    return LengthModel()
+
+
+def make_pool(workers=2):
+    return EmbeddingPool("fake", "torch", 2, workers=workers, threads=1,
+                         batch_size=4, timeout=60, loader=load_length_model)
+
+
+def test_titles_are_split_across_workers_in_order():
+    pool = make_pool()
+    try:
+        titles = ["a" * n for n in range(1, 12)]
+        vectors = pool.encode(titles)
+        assert vectors.dtype == np.float32
+        assert vectors[:, 0].tolist() == list(range(1, 12))
+        # Encoded in two other processes
+        pids = set(vectors[:, 1].tolist())
+        assert len(pids) == 2 and os.getpid() not in pids
+        assert pool.encode([]).shape == (0, 2)
+    finally:
+        pool.close()
+
+
+def test_errors_are_raised_and_dead_workers_replaced():
+    pool = make_pool(workers=1)
+    try:
+        with pytest.raises(RuntimeError, match="cannot encode"):
+            pool.encode(["ok", "fail"])
+        assert pool.encode(["abc"])[0, 0] == 3
+
+        pool._workers[0].process.kill()
+        pool._workers[0].process.join()
+        assert pool.encode(["abcd"])[0, 0] == 4
+    finally:
+        pool.close()
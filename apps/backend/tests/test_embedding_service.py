@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+
+from src.aggregator.embedding_service import EmbeddingService
+from src.aggregator.query_cache import QueryVectorCache
+
+
+class CountingModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, sentences, **kwargs):
+        self.batches.append(list(sentences))
+        return np.array([[len(s), 1.0] for s in sentences], dtype=np.float32)
+
+
+class FakeSBERT:
+    def __init__(self):
+        self.model = CountingModel()
+        self.device = "cpu"
+
+    def get_model_name(self):
+        return "fake"
+
+    def get_model_version(self):
+        return "fake@cpu"
+
+
+def test_concurrent_queries_share_a_batch():
+    sbert = FakeSBERT()
+
+    async def run():
+        service = EmbeddingService(sbert, batch_size=8, window=0.01)
+        try:
+            return await asyncio.gather(*(service.encode(q) for q in ["a", "bb", "a", "ccc"]))
+        finally:
+            service.close()
+
+    vectors = asyncio.run(run())
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [3.0, 1.0]]
+    # One model call, identical queries encoded once
+    assert sbert.model.batches == [["a", "bb", "ccc"]]
+
+
+def test_full_batches_do_not_wait_and_errors_reach_callers():
+    sbert = FakeSBERT()
+
+    async def run():
+        service = EmbeddingService(sbert, batch_size=2, window=10)
+        try:
+            vectors = await asyncio.wait_for(
+                asyncio.gather(*(service.encode(str(i)) for i in range(4))), 1)
+            sbert.model.encode = lambda sentences, **kwargs: 1 / 0
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(service.encode("x"), service.encode("y")), 1)
+            except ZeroDivisionError:
+                return vectors, True
+            return vectors, False
+        finally:
+            service.close()
+
+    vectors, raised = asyncio.run(run())
+    assert len(vectors) == 4 and raised
+    assert [len(batch) for batch in sbert.model.batches] == [2, 2]
+
+
+def test_repeated_queries_skip_the_model():
+    sbert = FakeSBERT()
+
+    async def run():
+        service = EmbeddingService(sbert, window=0)
+        try:
+            first = await service.encode("Rate  cuts")
+            return first, await service.encode(" rate cuts ")
+        finally:
+            service.close()
+
+    first, second = asyncio.run(run())
+    assert first == second
+    # The model sees the query as typed, the cache its normalized text
+    assert sbert.model.batches == [["Rate  cuts"]]
+
+
+def test_cache_evicts_least_recently_used_and_expired_vectors():
+    entry_bytes = QueryVectorCache._size(("m", "q0"), np.zeros(2, dtype=np.float32))
+    cache = QueryVectorCache(max_bytes=2 * entry_bytes, ttl=60)
+    cache.put("m", "q0", [0.0, 0.0])
+    cache.put("m", "q1", [1.0, 1.0])
+    assert cache.get("m", "q0") == [0.0, 0.0]
+    cache.put("m", "q2", [2.0, 2.0])
+    assert cache.get("m", "q1") is None
+    assert len(cache) == 2 and cache.bytes == 2 * entry_bytes
+    # Other model versions do not share vectors
+    assert cache.get("other", "q0") is None
+
+    cache.ttl = -1
+    assert cache.get("m", "q2") is None
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.aggregator.embedding_store import EmbeddingStore
+
+
+def vectors(n, dim=4, offset=0):
+    return np.arange(offset, offset + n * dim, dtype=np.float32).reshape(n, dim)
+
+
+def test_store_persists_and_is_seen_by_other_readers(tmp_path):
+    writer = EmbeddingStore("model@torch", root=str(tmp_path), max_entries=8)
+    reader = EmbeddingStore("model@torch", root=str(tmp_path), max_entries=8)
+    assert reader.get_many(["a"]) == [None]
+
+    assert writer.put_many(["a", "b", "a"], vectors(3)) == 2
+    found = reader.get_many(["a", "b", "c"])
+    np.testing.assert_array_equal(found[0], vectors(1)[0])
+    np.testing.assert_array_equal(found[1], vectors(2)[1])
+    assert found[2] is None
+    # Other model versions do not share vectors
+    assert EmbeddingStore("other", root=str(tmp_path)).get_many(["a"]) == [None]
+
+    encoded = []
+
+    def encode(titles):
+        encoded.extend(titles)
+        return vectors(len(titles), offset=100)
+
+    result = EmbeddingStore("model@torch", root=str(tmp_path)).embed(["b", "c"], encode)
+    assert encoded == ["c"]
+    np.testing.assert_array_equal(result[1], vectors(1, offset=100)[0])
+    assert len(reader) == 3
+
+
+def test_oldest_vectors_are_evicted_and_compaction_shrinks(tmp_path):
+    store = EmbeddingStore("model", root=str(tmp_path), max_entries=4)
+    titles = [f"t{i}" for i in range(6)]
+    store.put_many(titles, vectors(6))
+    reader = EmbeddingStore("model", root=str(tmp_path))
+    found = reader.get_many(titles)
+    assert [v is not None for v in found] == [False, False, True, True, True, True]
+    np.testing.assert_array_equal(found[5], vectors(6)[5])
+
+    store.max_entries = 2
+    assert store.compact() == 2
+    found = reader.get_many(titles)
+    assert [v is not None for v in found] == [False] * 4 + [True, True]
+    np.testing.assert_array_equal(found[4], vectors(6)[4])
@@ -0,0 +1,28 @@
+from src.aggregator import feed_archive
+from src.aggregator.feed_archive import FeedArchiveStore
+
+
+def test_save_compresses_bodies_and_load_restores_them(monkeypatch):
+    saved = []
+    monkeypatch.setattr(feed_archive, "save_archived_feeds",
+                        lambda rows: saved.extend(rows) or True)
+    monkeypatch.setattr(feed_archive, "delete_archived_feeds", lambda before: 0)
+    xml = "<rss><channel>" + "<item><title>Été</title></item>" * 50 + "</channel></rss>"
+
+    store = FeedArchiveStore(retention_days=30)
+    store.add("tech", "Verge", "https://example.com/rss", xml)
+    assert store.save()
+    assert store.save()  # nothing staged any more
+
+    assert len(saved) == 1
+    row = saved[0]
+    assert row["url"] == "https://example.com/rss" and len(row["content_hash"]) == 64
+    assert len(row["body"]) < len(xml)
+    monkeypatch.setattr(feed_archive, "load_archived_feed_body", lambda archive_id: row["body"])
+    assert store.load_body(1) == xml
+
+
+def test_disabled_archive_stages_nothing():
+    store = FeedArchiveStore(retention_days=0)
+    store.add("tech", "Verge", "https://example.com/rss", "<rss/>")
+    assert store._pending == []
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+from src.aggregator import feed_health
+from src.aggregator.feed_health import FeedHealth, FAILURE_THRESHOLD, QUARANTINE_FAILURES
+
+URL = "https://example.com/rss"
+
+
+def test_circuit_opens_probes_and_closes():
+    health = FeedHealth()
+    now = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    for _ in range(FAILURE_THRESHOLD):
+        assert health.allow(URL, now)
+        health.record_failure(URL, "HTTP 500", now)
+    assert health.circuit(URL) == feed_health.OPEN
+    assert not health.allow(URL, now + timedelta(seconds=60))
+
+    # Backoff elapsed: one half-open probe, whose failure doubles the backoff
+    probe_time = now + timedelta(seconds=feed_health.BASE_OPEN_SECONDS)
+    assert health.allow(URL, probe_time)
+    assert health.circuit(URL) == feed_health.HALF_OPEN
+    health.record_failure(URL, "HTTP 500", probe_time)
+    assert health.circuit(URL) == feed_health.OPEN
+    assert not health.allow(URL, probe_time + timedelta(seconds=feed_health.BASE_OPEN_SECONDS))
+
+    health.record_success(URL)
+    assert health.circuit(URL) == feed_health.CLOSED
+    assert health.allow(URL, probe_time)
+    assert health.unhealthy() == {}
+
+
+def test_dead_feed_is_quarantined():
+    health = FeedHealth()
+    now = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    for _ in range(QUARANTINE_FAILURES):
+        health.record_failure(URL, "HTTP 404", now)
+    assert health.circuit(URL) == feed_health.QUARANTINED
+    assert health.unhealthy()[URL]["last_error"] == "HTTP 404"
+    assert not health.allow(URL, now + timedelta(hours=12))
+    assert health.allow(URL, now + timedelta(seconds=feed_health.QUARANTINE_PROBE_SECONDS))
@@ -0,0 +1,53 @@
+from src.aggregator.feed_parser import FeedParser
+
+
+def slow_parse(dt_str):
+    return FeedParser.handle_time_str(FeedParser.correct_time_components(dt_str))
+
+
+def test_parse_published_learns_source_format():
+    FeedParser._date_formats.pop("Test Source", None)
+    first = "Mon, 06 Jan 2025 10:00:00 +0530"
+    assert FeedParser.parse_published("Test Source", first) == slow_parse(first)
+    assert FeedParser._date_formats["Test Source"] == "%a, %d %b %Y %H:%M:%S %z"
+
+    later = "Tue, 07 Jan 2025 18:45:12 +0530"
+    assert FeedParser.parse_published("Test Source", later) == slow_parse(later)
+
+
+def test_parse_published_literal_zones_match_dateutil():
+    for source, dt_str in [("Test GMT", "Mon, 06 Jan 2025 10:00:00 GMT"),
+                           ("Test IST", "Mon, 06 Jan 2025 10:00:00 GMT +5:30")]:
+        FeedParser._date_formats.pop(source, None)
+        expected = slow_parse(dt_str)
+        # First call learns the format, second one takes the fast path
+        FeedParser.parse_published(source, dt_str)
+        published = FeedParser.parse_published(source, dt_str)
+        assert published == expected
+        assert published.utcoffset() == expected.utcoffset()
+
+
+def test_parse_published_falls_back_on_invalid_time():
+    FeedParser._date_formats["Test Source"] = "%a, %d %b %Y %H:%M:%S %z"
+    invalid = "Mon, 06 Jan 2025 24:10:00 +0530"
+    assert FeedParser.parse_published("Test Source", invalid) == slow_parse(invalid)
+    # A single odd date does not drop the learned format
+    assert FeedParser._date_formats["Test Source"] == "%a, %d %b %Y %H:%M:%S %z"
+
+
+def test_parse_published_does_not_relearn_unknown_formats_every_entry(monkeypatch):
+    source = "Test Unknown Format"
+    FeedParser._date_formats.pop(source, None)
+    FeedParser._date_format_misses.pop(source, None)
+    attempts = []
+    learn = FeedParser.learn_date_format
+    monkeypatch.setattr(FeedParser, "learn_date_format",
+                        staticmethod(lambda *args: attempts.append(args) or learn(*args)))
+    monkeypatch.setattr(FeedParser, "RELEARN_DATE_FORMAT_AFTER", 3)
+    # Parsed by dateutil, matched by no candidate format
+    dt_str = "January 6th, 2025 10:00"
+    for _ in range(7):
+        assert FeedParser.parse_published(source, dt_str) == slow_parse(dt_str)
+    assert FeedParser._date_formats[source] is None
+    # Learned on the first entry, then retried on every third slow parse
+    assert len(attempts) == 3
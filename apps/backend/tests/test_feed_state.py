@@ -0,0 +1,140 @@
+from datetime import datetime, timezone
+
+from src.aggregator import feed_state as feed_state_module
+from src.aggregator import feeds as feeds_module
+from src.aggregator.feed_parser import FeedParser
+from src.aggregator.feed_state import FeedStateStore
+from src.aggregator.feeds import Feeds
+
+URL = "https://example.com/rss"
+XML = "<rss><channel><item><title>Storm hits coast</title></item></channel></rss>"
+
+
+class StubClient:
+    """Answers each fetch with the next response, recording the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.headers = []
+        self.errors = {}
+
+    async def fetch(self, url, headers=None):
+        self.headers.append(headers)
+        return self.responses.pop(0)
+
+
+def response(status: int, xml: str = None, etag: str = None, last_modified: str = None) -> dict:
+    return {'status': status, 'xml': xml, 'etag': etag, 'last_modified': last_modified,
+            'size': len(xml or "")}
+
+
+def stored_state(monkeypatch, **state) -> FeedStateStore:
+    monkeypatch.setattr(feed_state_module, "load_feed_states", lambda: {URL: state})
+    store = FeedStateStore()
+    store.load()
+    return store
+
+
+async def test_validators_are_sent_and_304_skips_the_feed(monkeypatch):
+    store = stored_state(monkeypatch, etag='"v1"', last_modified="Mon, 06 Jan 2025 00:00:00 GMT",
+                         content_hash="abc")
+    client = StubClient(response(304))
+    assert await FeedParser.fetch_feed("Publisher", URL, client, store) is None
+    assert client.headers == [{"If-None-Match": '"v1"',
+                               "If-Modified-Since": "Mon, 06 Jan 2025 00:00:00 GMT"}]
+    # Fetched, keeping the validators the 304 did not repeat
+    assert store.fetched(URL)
+    assert store._pending[URL]["etag"] == '"v1"'
+    assert store._pending[URL]["content_hash"] == "abc"
+    assert store._pending[URL]["last_status"] == 304
+
+
+async def test_unchanged_body_is_skipped(monkeypatch):
+    store = stored_state(monkeypatch, content_hash=FeedStateStore.hash_content(XML))
+    client = StubClient(response(200, XML, etag='"v2"'), response(200, XML + " "))
+    assert await FeedParser.fetch_feed("Publisher", URL, client, store) is None
+    assert store._pending[URL]["etag"] == '"v2"'
+    assert await FeedParser.fetch_feed("Publisher", URL, client, store) == XML + " "
+
+
+async def test_failed_fetches_stage_nothing(monkeypatch):
+    store = stored_state(monkeypatch, etag='"v1"')
+    client = StubClient(None, response(503))
+    assert await FeedParser.fetch_feed("Publisher", URL, client, store) is None
+    assert await FeedParser.fetch_feed("Publisher", URL, client, store) is None
+    assert not store.fetched(URL)
+
+
+class FakeHealth:
+    def record_success(self, url):
+        pass
+
+    def record_failure(self, url, error):
+        pass
+
+    def save(self):
+        pass
+
+
+class FakeArchive:
+    def add(self, *args):
+        pass
+
+    def discard(self):
+        pass
+
+    def save(self):
+        return True
+
+
+class FakeStories:
+    def assign(self, batch):
+        return []
+
+    def forget(self, links):
+        pass
+
+
+def make_feeds(store: FeedStateStore, client: StubClient) -> Feeds:
+    feeds = Feeds.__new__(Feeds)
+    feeds.model = None
+    feeds.model_name = "fake"
+    feeds.device = "cpu"
+    feeds.embedding_pool = None
+    feeds.embedding_store = None
+    feeds.feed_state = store
+    feeds.health = FakeHealth()
+    feeds.archive = FakeArchive()
+    feeds.http_client = client
+    feeds.known_articles = type("Known", (), {"is_known": lambda self, art: False,
+                                              "update": lambda self, batch: None})()
+    feeds.stories = FakeStories()
+    feeds._poll_report = {}
+
+    async def parse_feed(topic, publisher, xml):
+        return [{'link': "http://p/1", 'title': "Storm hits coast", 'source': publisher,
+                 'topic': topic, 'published': datetime(2026, 10, 1, tzinfo=timezone.utc)}]
+    feeds.parse_feed = parse_feed
+    return feeds
+
+
+async def test_validators_are_saved_only_once_the_articles_are_stored(monkeypatch):
+    saved = []
+    monkeypatch.setattr(feed_state_module, "save_feed_states",
+                        lambda states: saved.append(dict(states)) or True)
+    monkeypatch.setattr(FeedParser, "add_embeddings", lambda *args: None)
+    store = stored_state(monkeypatch)
+    feeds = {"news": {"Publisher": URL}}
+
+    # The batch failed: the feed is not remembered as seen
+    monkeypatch.setattr(feeds_module, "insert_articles", lambda batch, overwrite: False)
+    stats = await make_feeds(store, StubClient(response(200, XML, etag='"v1"'))).fetch_articles(feeds)
+    assert stats['failed_batches'] == 1
+    assert saved == [] and not store.fetched(URL)
+    assert store.request_headers(URL) == {}
+
+    monkeypatch.setattr(feeds_module, "insert_articles", lambda batch, overwrite: True)
+    stats = await make_feeds(store, StubClient(response(200, XML, etag='"v1"'))).fetch_articles(feeds)
+    assert stats['stored'] == 1
+    assert saved[0][URL]["etag"] == '"v1"'
+    assert store.request_headers(URL) == {"If-None-Match": '"v1"'}
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+from src.aggregator import feeds as feeds_module
+from src.aggregator.feed_parser import FeedParser
+from src.aggregator.feeds import Feeds
+
+
+class FakeStories:
+    def __init__(self):
+        self.forgotten = []
+
+    def assign(self, batch):
+        return [art['link'] for art in batch]
+
+    def forget(self, links):
+        self.forgotten.extend(links)
+
+
+def make_feeds(parsed: dict) -> Feeds:
+    """A Feeds whose parser returns the articles of each feed url, with no model or database."""
+    feeds = Feeds.__new__(Feeds)
+    feeds.model = None
+    feeds.model_name = "fake"
+    feeds.device = "cpu"
+    feeds.embedding_pool = None
+    feeds.embedding_store = None
+    feeds.stories = FakeStories()
+    feeds._poll_report = {}
+
+    async def parse_feed(topic, publisher, xml):
+        return parsed[xml]
+    feeds.parse_feed = parse_feed
+    return feeds
+
+
+def article(link: str, title: str, day: int) -> dict:
+    return {'link': link, 'title': title, 'source': 'Publisher', 'topic': 'news',
+            'published': datetime(2026, 10, day, tzinfo=timezone.utc)}
+
+
+async def test_refresh_dedups_title_and_source_across_batches(monkeypatch):
+    # The same story under another link in a second topic feed of the publisher
+    parsed = {"world": [article("http://p/world/1", "Storm hits coast", 2)],
+              "local": [article("http://p/local/1", "Storm hits coast", 1),
+                        article("http://p/local/2", "Council votes", 1)]}
+    stored = []
+    monkeypatch.setattr(feeds_module, "EMBED_BATCH_SIZE", 1)
+    monkeypatch.setattr(feeds_module, "insert_articles",
+                        lambda batch, overwrite: stored.extend(batch) or True)
+    monkeypatch.setattr(FeedParser, "add_embeddings", lambda *args: None)
+    feeds = make_feeds(parsed)
+    feeds.known_articles = type("Known", (), {"update": lambda self, batch: None})()
+
+    async def produce(put):
+        for url in ("world", "local"):
+            await put(("news", "Publisher", url, url))
+
+    stats = await feeds._run_pipeline(produce, 1, live=False, overwrite=True)
+    assert sorted(a['link'] for a in stored) == ["http://p/local/2", "http://p/world/1"]
+    assert stats['new'] == 2
+
+
+async def test_stories_of_unstored_batches_are_forgotten(monkeypatch):
+    parsed = {"world": [article("http://p/world/1", "Storm hits coast", 2)]}
+    monkeypatch.setattr(feeds_module, "insert_articles", lambda batch, overwrite: False)
+    monkeypatch.setattr(FeedParser, "add_embeddings", lambda *args: None)
+    feeds = make_feeds(parsed)
+
+    async def produce(put):
+        await put(("news", "Publisher", "world", "world"))
+
+    stats = await feeds._run_pipeline(produce, 1, live=False, overwrite=True)
+    assert stats['failed_batches'] == 1
+    assert feeds.stories.forgotten == ["http://p/world/1"]
@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from src.aggregator.hot_window import HotWindow, _Window
+from src.aggregator.search import search_candidates
+
+
+def make_window(hot: HotWindow, vectors: list, ages_days: list, generation: int = 1) -> _Window:
+    count = len(vectors)
+    ids = np.arange(1, count + 1, dtype=np.int64)
+    published = np.array([time.time() - age * 86400 for age in ages_days])
+    window = _Window("model", ids, published, np.asarray(vectors, dtype=np.float32), count,
+                     count, generation, time.monotonic())
+    hot._window = window
+    return window
+
+
+def test_nearest_ranks_by_similarity_within_the_window():
+    hot = HotWindow(days=7)
+    window = make_window(hot, [[1, 0], [0.8, 0.6], [0, 1], [1, 0]], [1, 2, 3, 8])
+    # The closest vector (id 4) left the window
+    assert sorted(hot._nearest(window, [1, 0], 2).tolist()) == [1, 2]
+    assert sorted(hot._nearest(window, [1, 0], 10).tolist()) == [1, 2, 3]
+
+
+async def test_search_falls_back_until_the_window_is_loaded(monkeypatch):
+    hot = HotWindow(days=7)
+    loads = []
+    monkeypatch.setattr(hot, "load_in_background", loads.append)
+    assert await hot.nearest([1, 0], 5, "model") is None
+    assert loads == ["model"]
+
+    make_window(hot, [[1, 0], [0, 1]], [1, 1])
+    assert await hot.nearest([0, 1], 1, "model") == [2]
+    # Vectors of another model are not comparable
+    assert await hot.nearest([0, 1], 1, "other") is None
+    assert HotWindow(days=0).enabled is False
+
+
+async def test_a_new_generation_updates_the_window(monkeypatch):
+    hot = HotWindow(days=7)
+    make_window(hot, [[1, 0]], [1])
+    generations = []
+    monkeypatch.setattr(hot, "update", generations.append)
+    await hot.nearest([1, 0], 1, "model", generation=1)
+    await hot.nearest([1, 0], 1, "model", generation=2)
+    assert generations == [2]
+
+
+def test_window_candidates_replace_the_index_scan():
+    candidates = search_candidates("storm", [0.1, 0.2, 0.3], k=50, nearest_ids=[3, 1, 2])
+    sql = str(candidates.compile(dialect=postgresql.dialect()))
+    assert "articles.id = ANY (" in sql
+    assert "<=>" not in sql
+    assert "articles.tsv @@ plainto_tsquery" in sql
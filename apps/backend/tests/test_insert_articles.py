@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from src.database import operations
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+
+    def commit(self):
+        self.statements.append("COMMIT")
+
+
+def insert(monkeypatch, overwrite: bool, db: CapturingSession = None) -> CapturingSession:
+    db = db if db is not None else CapturingSession()
+
+    @contextmanager
+    def context_db():
+        yield db
+    monkeypatch.setattr(operations, "context_db", context_db)
+    article = {"title": "Storm hits coast", "link": "http://p/1", "source": "Publisher",
+               "topic": "news", "published": datetime(2026, 10, 1, tzinfo=timezone.utc),
+               "embeddings": [0.1, 0.2, 0.3]}
+    assert operations.insert_articles([article], overwrite=overwrite)
+    return db
+
+
+def upsert_sql(monkeypatch, overwrite: bool) -> str:
+    return str(insert(monkeypatch, overwrite).statements[0].compile(dialect=postgresql.dialect()))
+
+
+def test_overwrite_keeps_the_summary_of_unchanged_titles(monkeypatch):
+    sql = upsert_sql(monkeypatch, overwrite=True)
+    assert ("summary = CASE WHEN (articles.title = excluded.title) "
+            "THEN articles.summary ELSE excluded.summary END") in sql
+
+
+def test_newer_articles_replace_the_summary(monkeypatch):
+    sql = upsert_sql(monkeypatch, overwrite=False)
+    assert "summary = excluded.summary" in sql
+    assert "WHERE excluded.published_date > articles.published_date" in sql
+
+
+def test_generation_advances_once_the_articles_are_committed(monkeypatch):
+    statements = [str(stmt) for stmt in insert(monkeypatch, overwrite=False).statements]
+    assert statements[1:] == ["COMMIT", "SELECT nextval('ingest_generation')", "COMMIT"]
+
+
+def test_stored_articles_are_not_failed_by_the_generation(monkeypatch):
+    class FailingSequence(CapturingSession):
+        def execute(self, stmt):
+            if "nextval" in str(stmt):
+                raise RuntimeError("connection lost")
+            super().execute(stmt)
+
+    db = insert(monkeypatch, overwrite=False, db=FailingSequence())
+    assert db.statements[1:] == ["COMMIT"]
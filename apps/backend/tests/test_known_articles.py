@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from src.aggregator import known_articles
+from src.aggregator.known_articles import KnownArticleIndex
+
+NOW = datetime.now(timezone.utc)
+
+
+def article(link: str, title: str, published: datetime) -> dict:
+    return {'link': link, 'title': title, 'published': published}
+
+
+def load_index(monkeypatch, rows: list) -> KnownArticleIndex:
+    monkeypatch.setattr(known_articles, "load_known_articles", lambda since: rows)
+    index = KnownArticleIndex()
+    index.load()
+    return index
+
+
+def test_stored_articles_are_skipped_until_they_change(monkeypatch):
+    published = NOW - timedelta(hours=1)
+    index = load_index(monkeypatch, [("http://p/1", "Storm hits coast", published)])
+
+    assert index.is_known(article("http://p/1", "Storm hits coast", published))
+    # A changed title or a later date is processed again, a new link too
+    assert not index.is_known(article("http://p/1", "Storm hits the coast", published))
+    assert not index.is_known(article("http://p/1", "Storm hits coast", NOW))
+    assert not index.is_known(article("http://p/2", "Storm hits coast", published))
+
+    index.update([article("http://p/1", "Storm hits the coast", published)])
+    assert index.is_known(article("http://p/1", "Storm hits the coast", published))
+    assert not index.is_known(article("http://p/1", "Storm hits coast", published))
+
+
+def test_index_covers_the_window_only(monkeypatch):
+    since = []
+    monkeypatch.setattr(known_articles, "load_known_articles",
+                        lambda start: since.append(start) or [])
+    index = KnownArticleIndex()
+    index.load()
+    window = timedelta(days=known_articles.KNOWN_ARTICLES_WINDOW_DAYS)
+    assert abs(NOW - window - since[0]) < timedelta(minutes=1)
+
+    old = NOW - window - timedelta(hours=1)
+    index.update([article("http://p/old", "Old story", old),
+                  article("http://p/new", "New story", NOW)])
+    # Forgotten once out of the window: stored again if a feed still carries it
+    assert len(index) == 1
+    assert not index.is_known(article("http://p/old", "Old story", old))
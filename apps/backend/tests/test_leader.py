@@ -0,0 +1,99 @@
+from src.aggregator import leader
+from src.aggregator.leader import LeaderElector
+
+
+class FakeLock:
+    """Advisory lock of the database: held by one connection at a time."""
+
+    def __init__(self):
+        self.holder = None
+
+
+class FakeConnection:
+    def __init__(self, lock: FakeLock):
+        self.lock = lock
+        self.dropped = False
+        self.closed = False
+        self.sql = []
+
+    def execute(self, stmt, params=None):
+        if self.dropped:
+            raise ConnectionError("server closed the connection unexpectedly")
+        self.sql.append(stmt.text)
+        if "pg_try_advisory_lock" in stmt.text:
+            acquired = self.lock.holder is None
+            if acquired:
+                self.lock.holder = self
+            return FakeResult(acquired)
+        if "pg_advisory_unlock" in stmt.text:
+            self.lock.holder = None
+        return FakeResult(1)
+
+    def commit(self):
+        pass
+
+    def invalidate(self):
+        # Postgres releases the session lock with the connection
+        if self.lock.holder is self:
+            self.lock.holder = None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeEngine:
+    def __init__(self):
+        self.lock = FakeLock()
+        self.connections = []
+
+    def connect(self):
+        conn = FakeConnection(self.lock)
+        self.connections.append(conn)
+        return conn
+
+
+def test_one_process_takes_the_lock_and_keeps_it(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(leader, "engine", engine)
+    first, second = LeaderElector(), LeaderElector()
+    assert first.elect() and first.is_leader
+    assert not second.elect() and not second.is_leader
+    # The follower does not keep its connection
+    assert engine.connections[1].closed
+
+    # The leader checks its connection, without asking for the lock again
+    assert first.elect()
+    assert engine.connections[0].sql[-1] == "SELECT 1"
+    assert len(engine.connections) == 2
+
+
+def test_leadership_moves_when_the_connection_drops(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(leader, "engine", engine)
+    first, second = LeaderElector(), LeaderElector()
+    first.elect()
+    engine.connections[0].dropped = True
+
+    assert not first.elect() and not first.is_leader
+    assert engine.connections[0].closed
+    assert second.elect()
+    # The former leader reconnects as a follower
+    assert not first.elect()
+
+
+def test_release_hands_over_the_lock(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(leader, "engine", engine)
+    first, second = LeaderElector(), LeaderElector()
+    first.elect()
+    first.release()
+    assert not first.is_leader
+    assert second.elect()
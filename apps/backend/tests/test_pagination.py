@@ -0,0 +1,118 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from src.database.models import Articles
+from src.database.queries import (
+    after_cursor,
+    build_article_select,
+    decode_cursor,
+    encode_cursor,
+    paginate_keyset_async,
+)
+from routers.content import fetch_article
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip():
+    published = datetime(2026, 10, 17, 8, 30, 15, 250, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(published, 42)) == (published, 42)
+    assert decode_cursor(encode_cursor(published, "a-uuid")) == (published, "a-uuid")
+
+
+@pytest.mark.parametrize("cursor", ["garbage!", "e30", encode_cursor(datetime.now(), 1)[:-4]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+async def test_cursor_id_must_match_the_id_column():
+    cursor = encode_cursor(datetime(2026, 10, 17, tzinfo=timezone.utc), "42")
+    assert decode_cursor(cursor)[1] == "42"
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, int)
+
+    # Rejected before reaching the database, as a bad request
+    db = FakeSession([])
+    with pytest.raises(HTTPException) as raised:
+        await fetch_article(db, 1, 1, 20, Articles.topic == "tech",
+                            (Articles.published_date, Articles.id), cursor=cursor)
+    assert raised.value.status_code == 400
+    assert db.sql == []
+
+
+def test_cursor_bound_is_an_index_range():
+    position = (datetime(2026, 10, 17, tzinfo=timezone.utc), 42)
+    stmt = build_article_select(1).where(Articles.topic == "tech").where(
+        after_cursor(Articles.published_date, Articles.id, position))
+    sql = compile_sql(stmt)
+    # The bound on the sort column alone lets (topic, published_date DESC) serve it
+    assert "WHERE articles.topic = " in sql
+    assert " AND articles.published_date <= " in sql
+    assert " AND (articles.published_date < " in sql
+    assert " OR articles.id < " in sql
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeSession:
+    """
+    Runs a statement on an in-memory table, just enough for a feed of
+    (published_date, id): the cursor bound and the limit are read back from
+    the SQL it compiles to.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = []
+
+    async def execute(self, stmt):
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        self.sql.append(sql)
+        rows = sorted(self.rows, key=lambda r: (r.cursor_sort, r.cursor_id), reverse=True)
+        bound = re.search(r"articles\.published_date < '([^']+)' OR articles\.id < (\d+)\)", sql)
+        if bound:
+            position = (datetime.fromisoformat(bound.group(1)), int(bound.group(2)))
+            rows = [r for r in rows if (r.cursor_sort, r.cursor_id) < position]
+        return FakeResult(rows[:int(re.search(r"LIMIT (\d+)", sql).group(1))])
+
+
+class Row:
+    def __init__(self, article_id, published):
+        self.id = self.cursor_id = article_id
+        self.published_date = self.cursor_sort = published
+
+
+async def test_pages_follow_cursors_to_the_end():
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    # Pairs of articles share a date: the id breaks the tie
+    db = FakeSession([Row(i, start + timedelta(hours=i // 2)) for i in range(1, 8)])
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = await paginate_keyset_async(
+            db, build_article_select(1), Articles.published_date, Articles.id, cursor, 3,
+            format_rows=lambda rows: [r.id for r in rows])
+        pages.append(page)
+        if cursor is None:
+            break
+
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+    # The second page starts after article 5, which shares its date with article 4
+    assert ("WHERE articles.published_date <= '2026-10-01 02:00:00+00:00' AND "
+            "(articles.published_date < '2026-10-01 02:00:00+00:00' OR articles.id < 5)") in db.sql[1]
+    # One row more than the page is read, to know whether there is a next one
+    assert all(sql.endswith("ORDER BY articles.published_date DESC, articles.id DESC \n LIMIT 4 OFFSET 0")
+               for sql in db.sql)
@@ -0,0 +1,56 @@
+import threading
+
+from src.monitoring import readiness
+from src.monitoring.readiness import LazyModel
+
+
+def test_model_loads_in_the_background():
+    release = threading.Event()
+
+    def factory():
+        release.wait(5)
+        return "model"
+
+    model = LazyModel("test-background", factory, required=True)
+    assert model.state == readiness.NOT_LOADED
+    assert model.get() is None
+    assert model.state == readiness.LOADING
+    assert not readiness.models_ready()
+
+    release.set()
+    assert model.wait(5) == "model"
+    assert model.get() == "model"
+    assert readiness.model_states()["test-background"]["state"] == readiness.READY
+    del readiness.MODELS["test-background"]
+
+
+def test_failed_load_is_retried_later(monkeypatch):
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model download failed")
+        return "model"
+
+    model = LazyModel("test-retry", factory)
+    assert model.wait(5) is None
+    assert model.state == readiness.FAILED and "download failed" in model.error
+    # Not retried within MODEL_RETRY_SECONDS
+    assert model.wait(5) is None and len(attempts) == 1
+
+    monkeypatch.setattr(readiness, "MODEL_RETRY_SECONDS", 0)
+    assert model.wait(5) == "model"
+    assert len(attempts) == 2
+    del readiness.MODELS["test-retry"]
+
+
+def test_only_the_probes_and_metrics_are_public():
+    from routers import monitoring
+    from src.users.services import get_current_active_user
+
+    authenticated = {route.path: any(dep.call is get_current_active_user
+                                     for dep in route.dependant.dependencies)
+                     for route in monitoring.router.routes}
+    assert authenticated == {"/metrics": False, "/feeds/health": True,
+                             "/healthz": False, "/readyz": False}
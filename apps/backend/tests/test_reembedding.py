@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from src.aggregator import reembed
+from src.database import reembedding
+from src.database.models import EmbeddingMigration
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+    """Session whose migration in progress is `current`, recording the DDL run and rows added."""
+
+    def __init__(self, current=None):
+        self.current = current
+        self.sql = []
+        self.added = []
+        self.deleted = []
+
+    def execute(self, stmt):
+        if hasattr(stmt, "text"):
+            self.sql.append(stmt.text)
+        return FakeResult(self.current)
+
+    def add(self, row):
+        self.added.append(row)
+
+    def delete(self, row):
+        self.deleted.append(row)
+
+    def commit(self):
+        for row in self.added:
+            row.id = 7
+
+
+def use_session(monkeypatch, db: FakeSession):
+    @contextmanager
+    def context_db():
+        yield db
+    monkeypatch.setattr(reembedding, "context_db", context_db)
+
+
+def test_start_resumes_the_migration_to_the_same_model(monkeypatch):
+    db = FakeSession(EmbeddingMigration(id=3, model="new", dimensions=768))
+    use_session(monkeypatch, db)
+    assert reembedding.start_reembedding("new", 768) == 3
+    assert db.sql == [] and db.added == []
+
+
+def test_start_refuses_another_model_without_restart(monkeypatch):
+    use_session(monkeypatch, FakeSession(EmbeddingMigration(id=3, model="new", dimensions=768)))
+    with pytest.raises(RuntimeError):
+        reembedding.start_reembedding("other", 768)
+
+
+def test_restart_drops_the_shadow_columns(monkeypatch):
+    current = EmbeddingMigration(id=3, model="new", dimensions=768)
+    db = FakeSession(current)
+    use_session(monkeypatch, db)
+    assert reembedding.start_reembedding("other", 1024, restart=True) == 7
+    assert db.deleted == [current]
+    assert "DROP COLUMN IF EXISTS embeddings_next" in db.sql[0]
+    assert "ADD COLUMN embeddings_next vector(1024)" in db.sql[1]
+    assert [(row.model, row.dimensions) for row in db.added] == [("other", 1024)]
+
+
+class FakeSBERT:
+    def get_model_name(self):
+        return "new"
+
+
+def test_reembed_resumes_after_the_last_saved_batch(monkeypatch):
+    # Articles 1..5, of which the interrupted run saved the first batch
+    shadow = {1: [1.0], 2: [2.0]}
+
+    def load_pending(after_id, limit):
+        pending = [(article_id, f"title {article_id}") for article_id in range(1, 6)
+                   if article_id not in shadow and article_id > after_id]
+        return pending[:limit]
+    encoded = []
+
+    def encode(titles):
+        encoded.extend(titles)
+        return np.ones((len(titles), 1))
+    monkeypatch.setattr(reembed, "load_pending_reembedding", load_pending)
+    monkeypatch.setattr(reembed, "save_reembedded",
+                        lambda model, rows: shadow.update(dict(rows)))
+    monkeypatch.setattr(reembed, "encoder", lambda sbert: encode)
+
+    assert reembed.reembed_pending(FakeSBERT(), batch_size=2) == 3
+    assert encoded == ["title 3", "title 4", "title 5"]
+    assert sorted(shadow) == [1, 2, 3, 4, 5]
+    # Nothing is left to embed
+    assert reembed.reembed_pending(FakeSBERT(), batch_size=2) == 0
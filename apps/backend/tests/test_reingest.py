@@ -0,0 +1,37 @@
+from src.aggregator import reingest as reingest_module
+
+
+class FakeStories:
+    def load(self):
+        pass
+
+
+class FakeFeeds:
+    def __init__(self, sbert):
+        self.sbert = sbert
+        self.stories = FakeStories()
+        self.closed = False
+
+    async def reingest_archive(self, since, until, topic, publisher):
+        return {"model": self.sbert.model_name}
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeSBERT:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+
+async def test_reingest_embeds_with_the_active_model(monkeypatch):
+    monkeypatch.setattr(reingest_module, "Feeds", FakeFeeds)
+    monkeypatch.setattr(reingest_module, "SBERT", FakeSBERT)
+    monkeypatch.setattr(reingest_module, "active_embedding_model", lambda: "cut-over-model")
+    stats = await reingest_module.reingest(reingest_module.parse_time("2026-10-01"))
+    assert stats == {"model": "cut-over-model"}
+
+    # Articles never re-embedded keep the configured model
+    monkeypatch.setattr(reingest_module, "active_embedding_model", lambda: None)
+    stats = await reingest_module.reingest(reingest_module.parse_time("2026-10-01"))
+    assert stats == {"model": reingest_module.SBERT_MODEL}
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+from src.aggregator.model import SBERT  # noqa: E402
+
+TITLES = [
+    "RBI keeps repo rate unchanged at 6.5% for the eighth time",
+    "India beat Australia by six wickets to win the series",
+    "Monsoon to arrive in Kerala three days early, says IMD",
+    "Apple unveils new iPad Pro with M4 chip",
+    "Sensex, Nifty close higher as IT stocks rally",
+    "What is the new tax regime and who should opt for it?",
+]
+
+
+@pytest.fixture(scope="module")
+def torch_vectors():
+    try:
+        sbert = SBERT("torch")
+    except Exception as e:
+        pytest.skip(f"Model unavailable: {e}")
+    return sbert.model.encode(TITLES, device=sbert.device)
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_vectors_match_torch(backend, torch_vectors):
+    sbert = SBERT(backend)
+    vectors = sbert.model.encode(TITLES, device=sbert.device)
+    cosine = np.sum(vectors * torch_vectors, axis=1) / (
+        np.linalg.norm(vectors, axis=1) * np.linalg.norm(torch_vectors, axis=1))
+    assert cosine.min() >= 0.99
@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.aggregator import scheduler
+from src.aggregator.scheduler import FeedScheduler
+
+URL = "https://example.com/rss"
+START = datetime(2025, 1, 6, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake time.time of the scheduler, advanced by the test."""
+    now = [START]
+    monkeypatch.setattr(scheduler.time, "time", lambda: now[0])
+    return now
+
+
+def make_scheduler(urls: list, health=None) -> FeedScheduler:
+    return FeedScheduler({"news": {f"publisher{i}": url for i, url in enumerate(urls)}}, health)
+
+
+def test_interval_follows_the_publishing_rate(clock):
+    feeds = make_scheduler([URL])
+    assert feeds.due_feeds(START) == {"news": {"publisher0": URL}}
+
+    # 4 articles over the first (default) interval
+    feeds.record(URL, 4, START)
+    rate = 4 / scheduler.DEFAULT_POLL_INTERVAL
+    assert feeds._feeds[URL]['rate'] == rate
+    interval = scheduler.TARGET_NEW_PER_POLL / rate
+    assert feeds.seconds_until_due(START) == interval
+    assert feeds.due_feeds(START + interval - 1) == {}
+
+    # The moving average weighs the latest poll by RATE_SMOOTHING
+    later = START + interval
+    feeds.record(URL, 1, later)
+    rate = scheduler.RATE_SMOOTHING * (1 / interval) + (1 - scheduler.RATE_SMOOTHING) * rate
+    assert feeds._feeds[URL]['rate'] == pytest.approx(rate)
+    assert feeds.seconds_until_due(later) == pytest.approx(scheduler.TARGET_NEW_PER_POLL / rate)
+
+
+def test_interval_is_clamped(clock):
+    feeds = make_scheduler([URL])
+    feeds.record(URL, 1000, START)
+    assert feeds.seconds_until_due(START) == scheduler.MIN_POLL_INTERVAL
+
+    quiet = make_scheduler([URL])
+    quiet.record(URL, 0, START)
+    # One article in a day
+    quiet.record(URL, 1, START + 86400)
+    assert quiet.seconds_until_due(START + 86400) == scheduler.MAX_POLL_INTERVAL
+
+
+def test_quiet_feeds_back_off(clock):
+    feeds = make_scheduler([URL])
+    now = START
+    intervals = []
+    for _ in range(3):
+        feeds.record(URL, 0, now)
+        intervals.append(feeds.seconds_until_due(now))
+        now += intervals[-1]
+    assert intervals == [scheduler.DEFAULT_POLL_INTERVAL * scheduler.QUIET_BACKOFF ** n
+                         for n in (1, 2, 3)]
+
+
+def test_failed_polls_keep_the_interval(clock):
+    feeds = make_scheduler([URL])
+    feeds.record(URL, None, START)
+    assert feeds.seconds_until_due(START) == scheduler.DEFAULT_POLL_INTERVAL
+    assert feeds._feeds[URL]['rate'] is None
+
+
+def test_tick_budget_polls_the_most_overdue_first(clock):
+    urls = [f"https://example.com/{i}" for i in range(scheduler.MAX_FEEDS_PER_TICK + 5)]
+    feeds = make_scheduler(urls)
+    # The last feeds are the most overdue
+    for i, url in enumerate(urls):
+        feeds._feeds[url]['next_due'] = START - i
+    due = feeds.due_feeds(START)["news"]
+    assert len(due) == scheduler.MAX_FEEDS_PER_TICK
+    assert set(due.values()) == set(urls[5:])
+
+
+class BlockingHealth:
+    def __init__(self, blocked: set):
+        self.blocked = blocked
+        self.asked = []
+
+    def allow(self, url, now):
+        self.asked.append((url, now))
+        return url not in self.blocked
+
+
+def test_feeds_blocked_by_the_circuit_breaker_use_no_budget(clock, monkeypatch):
+    monkeypatch.setattr(scheduler, "MAX_FEEDS_PER_TICK", 2)
+    urls = [f"https://example.com/{i}" for i in range(4)]
+    health = BlockingHealth({urls[0]})
+    feeds = make_scheduler(urls, health)
+    for i, url in enumerate(urls):
+        feeds._feeds[url]['next_due'] = START + i
+    assert set(feeds.due_feeds(START + 10)["news"].values()) == {urls[1], urls[2]}
+    assert health.asked[0] == (urls[0], datetime.fromtimestamp(START + 10, timezone.utc))
+
+
+def test_reconfiguration_keeps_known_feeds(clock):
+    feeds = make_scheduler([URL])
+    feeds.record(URL, 4, START)
+    clock[0] = START + 60
+    feeds.set_feeds({"world": {"Publisher": URL, "Other": "https://example.com/other"}})
+    assert feeds._feeds[URL]['rate'] == 4 / scheduler.DEFAULT_POLL_INTERVAL
+    # A new feed is due at once
+    assert feeds.due_feeds(START + 60) == {"world": {"Other": "https://example.com/other"}}
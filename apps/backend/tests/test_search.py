@@ -0,0 +1,73 @@
+from sqlalchemy.dialects import postgresql
+
+from src.aggregator import search as search_module
+from src.aggregator.hot_window import HotWindow
+from src.aggregator.search import SEARCH_CANDIDATES, _ranked_ids, search_candidates
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_candidates_union_both_indexes():
+    sql = compile_sql(search_candidates("storm warning", [0.1, 0.2, 0.3], k=50))
+    assert "UNION" in sql
+    # Nearest neighbours, served by the vector index
+    assert "ORDER BY articles.embeddings <=>" in sql
+    # Full-text matches, served by the GIN index
+    assert "articles.tsv @@ plainto_tsquery" in sql
+    assert sql.count("LIMIT") == 2
+
+
+class FakeEmbedder:
+    model_name = "model"
+
+    async def encode(self, query):
+        return [0.1, 0.2, 0.3]
+
+
+class FakeResult:
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return FakeResult()
+
+
+async def test_scores_are_computed_on_candidates_only():
+    db = CapturingSession()
+    await _ranked_ids("storm", FakeEmbedder(), db, skip=0, limit=20, min_score=0.18,
+                      ef_search=None, probes=None, recent=False)
+    ranking = db.statements[-1].compile(dialect=postgresql.dialect())
+    sql = str(ranking)
+    assert "JOIN (SELECT anon_1.id" in sql
+    assert ") AS candidates ON candidates.id = articles.id" in sql
+    # The candidates of each index, then the page
+    assert sql.count("LIMIT") == 3
+    assert " LIMIT " in sql.rpartition("ORDER BY")[2]
+    assert SEARCH_CANDIDATES in ranking.params.values()
+    assert 20 in ranking.params.values()
+
+
+async def test_relevance_searches_are_ordered_by_hybrid_score(monkeypatch):
+    # The agent's search tool with recent=False
+    monkeypatch.setattr(search_module, "hot_window", HotWindow(days=0))
+    orderings = {}
+    for recent in (True, False):
+        db = CapturingSession()
+        await _ranked_ids("storm", FakeEmbedder(), db, skip=0, limit=20, min_score=0.18,
+                          ef_search=None, probes=None, recent=recent)
+        orderings[recent] = compile_sql(db.statements[-1]).rpartition("ORDER BY")[2]
+    assert "exp(" in orderings[True]
+    assert "exp(" not in orderings[False]
+    assert "ts_rank_cd" in orderings[False] and "<=>" in orderings[False]
+    assert orderings[False].split(" LIMIT ")[0].strip().endswith("DESC, articles.id DESC")
@@ -0,0 +1,50 @@
+from src.aggregator import search as search_module
+from src.aggregator.search_cache import SearchSnapshotCache
+
+
+class FakeEmbedder:
+    model_name = "fake"
+    model_version = "fake@cpu"
+
+
+def test_new_searches_need_the_current_generation():
+    cache = SearchSnapshotCache(max_entries=2, ttl=60)
+    cache.put(("a",), 1, [3, 2, 1])
+    assert cache.get(("a",), generation=1).tolist() == [3, 2, 1]
+    # Stale for a new search, still served to its later pages
+    assert cache.get(("a",), generation=2) is None
+    assert cache.get(("a",)).tolist() == [3, 2, 1]
+
+    cache.put(("b",), 1, [])
+    cache.put(("c",), 1, [])
+    assert cache.get(("a",)) is None and len(cache) == 2
+
+
+async def test_later_pages_are_slices_of_the_first_ranking(monkeypatch):
+    state = {"generation": 1, "ranked": 0}
+
+    async def generation(db):
+        return state["generation"]
+
+    async def ranked_ids(query, embedder, db, skip, limit, *args):
+        state["ranked"] += 1
+        ranking = list(range(100 * state["generation"], 100 * state["generation"] + 25))
+        return ranking[skip:skip + limit]
+
+    monkeypatch.setattr(search_module, "get_ingest_generation", generation)
+    monkeypatch.setattr(search_module, "_ranked_ids", ranked_ids)
+    monkeypatch.setattr(search_module, "snapshots", SearchSnapshotCache())
+
+    def page(skip, query="Storm  warning"):
+        return search_module.search_ids(query, FakeEmbedder(), None, skip, 10)
+
+    assert await page(0) == list(range(100, 110))
+    assert await page(10, "storm warning") == list(range(110, 120))
+    assert await page(20) == list(range(120, 125))
+    assert state["ranked"] == 1
+
+    # Articles were ingested: later pages keep their ranking, a new search does not
+    state["generation"] = 2
+    assert await page(10) == list(range(110, 120))
+    assert await page(0) == list(range(200, 210))
+    assert state["ranked"] == 2
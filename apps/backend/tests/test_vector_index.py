@@ -0,0 +1,31 @@
+from src.database.vector_index import HNSW_EF_SEARCH, _parse_index, create_index_sql, search_settings
+
+
+def test_index_sql_per_type():
+    assert create_index_sql(index_type="hnsw", options={"m": 16, "ef_construction": 64}) == (
+        "CREATE INDEX IF NOT EXISTS idx_articles_embeddings ON articles USING hnsw "
+        "(embeddings vector_cosine_ops) WITH (m = 16, ef_construction = 64)")
+    assert create_index_sql("idx_next", "embeddings_next", index_type="ivfflat",
+                            options={"lists": 100}, concurrently=True) == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_next ON articles USING ivfflat "
+        "(embeddings_next vector_cosine_ops) WITH (lists = 100)")
+
+
+def test_existing_index_is_parsed_from_its_definition():
+    definition = ("CREATE INDEX idx_articles_embeddings ON public.articles USING hnsw "
+                  "(embeddings vector_cosine_ops) WITH (m='16', ef_construction='64')")
+    assert _parse_index(definition) == ("hnsw", {"m": 16, "ef_construction": 64})
+
+
+def test_search_settings_override_the_defaults():
+    settings = search_settings(ef_search=250)
+    assert settings["hnsw.ef_search"] == 250
+    assert settings["ivfflat.probes"] > 0
+
+
+def test_ef_search_covers_the_candidates_taken():
+    assert search_settings(k=1000)["hnsw.ef_search"] == 1000
+    assert search_settings(ef_search=250, k=50)["hnsw.ef_search"] == 250
+    assert search_settings(k=50)["hnsw.ef_search"] == HNSW_EF_SEARCH
+    # Deep pages take more candidates than pgvector allows
+    assert search_settings(k=5000)["hnsw.ef_search"] == 1000
@@ -20,6 +20,22 @@ BEGIN
 END
 $$;
 
+-- Advanced by every batch of stored articles, so cached search rankings
+-- know they predate new articles
+CREATE SEQUENCE IF NOT EXISTS ingest_generation;
+
+-- Columns added after the articles table was first created
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS story_id VARCHAR(36);
+-- Existing rows were embedded by the original model
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(100)
+    DEFAULT 'sentence-transformers/all-MiniLM-L6-v2';
+ALTER TABLE articles ALTER COLUMN embedding_model DROP DEFAULT;
+ALTER TABLE feed_state ADD COLUMN IF NOT EXISTS circuit VARCHAR(16) NOT NULL DEFAULT 'closed';
+ALTER TABLE feed_state ADD COLUMN IF NOT EXISTS failures INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE feed_state ADD COLUMN IF NOT EXISTS open_until TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feed_state ADD COLUMN IF NOT EXISTS failing_since TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feed_state ADD COLUMN IF NOT EXISTS last_error VARCHAR(512);
+
 -- Create indexes to optimize query performance
 CREATE INDEX IF NOT EXISTS idx_articles_tsv
     ON articles USING GIN (tsv);
@@ -33,9 +49,14 @@ CREATE INDEX IF NOT EXISTS idx_articles_topic_published_date
 CREATE INDEX IF NOT EXISTS idx_articles_published_date
     ON articles (published_date DESC);
 
-CREATE INDEX IF NOT EXISTS idx_articles_embeddings
-    ON articles USING ivfflat (embeddings vector_cosine_ops)
-    WITH (lists = 200);
+CREATE INDEX IF NOT EXISTS idx_articles_story_published_date
+    ON articles (story_id, published_date DESC);
+
+-- The vector index (idx_articles_embeddings) is created by
+-- src/database/vector_index.py, as configured
+
+CREATE INDEX IF NOT EXISTS idx_feed_archive_fetched_at
+    ON feed_archive (fetched_at DESC);
 
 CREATE INDEX IF NOT EXISTS idx_userbookmarks_user_article
     ON userbookmarks (user_id, article_id);